@@ -0,0 +1,69 @@
+"""Add deployment metric rollups
+
+Revision ID: 004_add_deployment_metric_rollups
+Revises: 003_add_admin_features
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "004_add_deployment_metric_rollups"
+down_revision = "003_add_admin_features"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Per-deployment request/latency history at 1m / 1h / 1d resolution
+    op.create_table(
+        "deployment_metric_rollups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("deployment_id", sa.Integer(), nullable=True),
+        sa.Column("resolution", sa.Integer(), nullable=True),
+        sa.Column("bucket_start", sa.DateTime(), nullable=True),
+        sa.Column("request_count", sa.Integer(), nullable=True),
+        sa.Column("error_count", sa.Integer(), nullable=True),
+        sa.Column("latency_sketch", sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["deployment_id"],
+            ["model_deployments.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("deployment_id", "resolution", "bucket_start"),
+    )
+    op.create_index(
+        op.f("ix_deployment_metric_rollups_id"),
+        "deployment_metric_rollups",
+        ["id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_deployment_metric_rollups_deployment_id"),
+        "deployment_metric_rollups",
+        ["deployment_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_deployment_metric_rollups_bucket_start"),
+        "deployment_metric_rollups",
+        ["bucket_start"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_deployment_metric_rollups_bucket_start"),
+        table_name="deployment_metric_rollups",
+    )
+    op.drop_index(
+        op.f("ix_deployment_metric_rollups_deployment_id"),
+        table_name="deployment_metric_rollups",
+    )
+    op.drop_index(
+        op.f("ix_deployment_metric_rollups_id"), table_name="deployment_metric_rollups"
+    )
+    op.drop_table("deployment_metric_rollups")
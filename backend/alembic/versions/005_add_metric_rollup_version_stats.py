@@ -0,0 +1,28 @@
+"""Add per-model-version stats to deployment metric rollups
+
+Revision ID: 005_add_metric_rollup_version_stats
+Revises: 004_add_deployment_metric_rollups
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "005_add_metric_rollup_version_stats"
+down_revision = "004_add_deployment_metric_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Request counts and latency sketches per serving model version
+    op.add_column(
+        "deployment_metric_rollups",
+        sa.Column("version_stats", sa.JSON(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("deployment_metric_rollups", "version_stats")
@@ -0,0 +1,46 @@
+"""Add content-addressed model blobs
+
+Revision ID: 006_add_model_blobs
+Revises: 005_add_metric_rollup_version_stats
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "006_add_model_blobs"
+down_revision = "005_add_metric_rollup_version_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "model_blobs",
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("sha256"),
+    )
+    # Versions uploaded before this stay NULL and keep their per-user paths.
+    # For SQLite, we skip the foreign key constraint as in 003.
+    op.add_column(
+        "model_versions", sa.Column("content_hash", sa.String(length=64), nullable=True)
+    )
+    op.create_index(
+        op.f("ix_model_versions_content_hash"), "model_versions", ["content_hash"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_model_versions_content_hash"), table_name="model_versions")
+    op.drop_column("model_versions", "content_hash")
+    op.drop_table("model_blobs")
@@ -0,0 +1,56 @@
+"""Add resumable upload sessions
+
+Revision ID: 007_add_upload_sessions
+Revises: 006_add_model_blobs
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "007_add_upload_sessions"
+down_revision = "006_add_model_blobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("model_id", sa.Integer(), nullable=True),
+        sa.Column("model_fields", sa.JSON(), nullable=True),
+        sa.Column("version_fields", sa.JSON(), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("chunk_size", sa.Integer(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=True,
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["model_id"], ["models.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_upload_sessions_expires_at"), "upload_sessions", ["expires_at"], unique=False
+    )
+    op.create_table(
+        "upload_chunks",
+        sa.Column("session_id", sa.String(length=32), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["session_id"], ["upload_sessions.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("session_id", "chunk_index"),
+    )
+
+
+def downgrade():
+    op.drop_table("upload_chunks")
+    op.drop_index(op.f("ix_upload_sessions_expires_at"), table_name="upload_sessions")
+    op.drop_table("upload_sessions")
@@ -0,0 +1,25 @@
+"""Add pre-compressed blob variants
+
+Revision ID: 008_add_blob_variants
+Revises: 007_add_upload_sessions
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "008_add_blob_variants"
+down_revision = "007_add_upload_sessions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL until the variant builder has compressed the blob
+    op.add_column("model_blobs", sa.Column("variants", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("model_blobs", "variants")
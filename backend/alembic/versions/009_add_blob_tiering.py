@@ -0,0 +1,36 @@
+"""Add hot/archive tiering of model blobs
+
+Revision ID: 009_add_blob_tiering
+Revises: 008_add_blob_variants
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "009_add_blob_tiering"
+down_revision = "008_add_blob_variants"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "model_blobs",
+        sa.Column("tier", sa.Enum("HOT", "ARCHIVED", name="storagetier"), nullable=True),
+    )
+    op.add_column(
+        "model_blobs", sa.Column("last_accessed_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index(op.f("ix_model_blobs_tier"), "model_blobs", ["tier"], unique=False)
+
+    # Every existing blob has its original bytes stored
+    op.execute("UPDATE model_blobs SET tier = 'HOT' WHERE tier IS NULL")
+
+
+def downgrade():
+    op.drop_index(op.f("ix_model_blobs_tier"), table_name="model_blobs")
+    op.drop_column("model_blobs", "last_accessed_at")
+    op.drop_column("model_blobs", "tier")
@@ -0,0 +1,26 @@
+"""Index model version storage paths
+
+Revision ID: 010_index_version_paths
+Revises: 009_add_blob_tiering
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "010_index_version_paths"
+down_revision = "009_add_blob_tiering"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Garbage collection looks stored files up by the path referencing them
+    op.create_index(
+        op.f("ix_model_versions_s3_path"), "model_versions", ["s3_path"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_model_versions_s3_path"), table_name="model_versions")
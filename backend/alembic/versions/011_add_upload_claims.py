@@ -0,0 +1,27 @@
+"""Add upload session completion claims
+
+Revision ID: 011_add_upload_claims
+Revises: 010_index_version_paths
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "011_add_upload_claims"
+down_revision = "010_index_version_paths"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Set by the request completing a session, so a concurrent one backs off
+    op.add_column(
+        "upload_sessions", sa.Column("completing_at", sa.DateTime(timezone=True), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column("upload_sessions", "completing_at")
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import List, Optional
+import time
 
 from app.api.deps import get_db, get_current_active_user
 from app.models.user import User
@@ -9,14 +12,25 @@ from app.schemas.deployment import (
     DeploymentCreate,
     DeploymentUpdate,
     DeploymentListResponse,
+    DeploymentChanges,
     DeploymentStatusResponse,
     DeploymentActionRequest,
     DeploymentActionResponse,
     DeploymentMetrics,
     DeploymentLog,
+    MetricsHistory,
+    ShadowReport,
 )
-from app.services.deployment import DeploymentService
+from app.services.changes import changes_since, changes_topic
+from app.services.deployment import DeploymentService, uses_local_runtime
+from app.services.events import event_hub
+from app.services.log_sink import log_topic, recent_logs
+from app.services.metrics import MetricsService, metrics_recorder
+from app.services.shadow import shadow_mirror
+from app.runtime.manager import runtime_manager
 from app.models.deployment import DeploymentStatus
+from app.core.config import settings
+from app.utils.sse import sse_response, stream_topic
 
 router = APIRouter()
 
@@ -30,6 +44,8 @@ def get_deployments(
     status: Optional[DeploymentStatus] = Query(None),
 ):
     """Get user's deployments with optional filtering"""
+    # Taken first, so changes committed while listing are replayed, not lost
+    cursor = event_hub.head(changes_topic(current_user.id))
     deployment_service = DeploymentService(db)
     deployments = deployment_service.get_deployments(
         owner_id=current_user.id, skip=skip, limit=limit, status=status
@@ -53,6 +69,34 @@ def get_deployments(
         total=len(deployment_list),
         page=skip // limit + 1,
         limit=limit,
+        cursor=cursor,
+    )
+
+
+@router.get("/changes", response_model=DeploymentChanges)
+def get_deployment_changes(
+    since: Optional[str] = Query(None, description="Cursor returned by the previous call"),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Deployments created, changed or deleted since a cursor"""
+    return changes_since(current_user.id, since)
+
+
+@router.get("/changes/stream")
+async def stream_deployment_changes(
+    request: Request,
+    since: Optional[str] = Query(None, description="Cursor of the last event received"),
+    last_event_id: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Push status and metric changes of the user's deployments as Server-Sent Events"""
+    # Don't hold a pooled connection for the life of the stream
+    db.close()
+    return sse_response(
+        stream_topic(
+            request, event_hub, changes_topic(current_user.id), "change", since or last_event_id
+        )
     )
 
 
@@ -120,7 +164,7 @@ def deployment_action(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Perform actions on deployment (start, stop, restart, scale)"""
+    """Perform actions on deployment (start, stop, restart, scale, rollout, rollback, shadow, stop_shadow)"""
     deployment_service = DeploymentService(db)
 
     deployment = deployment_service.get_deployment(deployment_id)
@@ -166,22 +210,98 @@ def deployment_action(
             )
 
         elif action == "scale":
-            # TODO: Implement scaling logic
+            replicas = action_request.parameters.get("replicas")
+            if not isinstance(replicas, int):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Scale action requires an integer 'replicas' parameter",
+                )
+            updated_deployment = deployment_service.scale_deployment(
+                deployment_id, replicas, current_user.id
+            )
+            return DeploymentActionResponse(
+                success=True,
+                message=f"Deployment scaled to {replicas} replicas",
+                deployment_id=deployment_id,
+                new_status=updated_deployment.status,
+            )
+
+        elif action == "rollout":
+            params = action_request.parameters
+            if not isinstance(params.get("model_version_id"), int):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Rollout action requires an integer 'model_version_id' parameter",
+                )
+            updated_deployment = deployment_service.rollout_version(
+                deployment_id,
+                params["model_version_id"],
+                current_user.id,
+                strategy=params.get("strategy", "blue_green"),
+                rollback_window=params.get("rollback_window"),
+                steps=params.get("steps"),
+                step_interval=params.get("step_interval"),
+            )
+            return DeploymentActionResponse(
+                success=True,
+                message="Rollout started",
+                deployment_id=deployment_id,
+                new_status=updated_deployment.status,
+            )
+
+        elif action == "shadow":
+            params = action_request.parameters
+            if not isinstance(params.get("model_version_id"), int):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Shadow action requires an integer 'model_version_id' parameter",
+                )
+            updated_deployment = deployment_service.shadow_version(
+                deployment_id,
+                params["model_version_id"],
+                current_user.id,
+                fraction=params.get("fraction"),
+                replicas=params.get("replicas", 1),
+            )
+            return DeploymentActionResponse(
+                success=True,
+                message="Shadow traffic starting",
+                deployment_id=deployment_id,
+                new_status=updated_deployment.status,
+            )
+
+        elif action == "stop_shadow":
+            updated_deployment = deployment_service.stop_shadow(
+                deployment_id, current_user.id
+            )
             return DeploymentActionResponse(
-                success=False,
-                message="Scaling not yet implemented",
+                success=True,
+                message="Shadow traffic stopped",
                 deployment_id=deployment_id,
+                new_status=updated_deployment.status,
+            )
+
+        elif action == "rollback":
+            updated_deployment = deployment_service.rollback_deployment(
+                deployment_id, current_user.id
+            )
+            return DeploymentActionResponse(
+                success=True,
+                message="Deployment rolled back",
+                deployment_id=deployment_id,
+                new_status=updated_deployment.status,
             )
 
         else:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid action: {action}. Supported actions: start, stop, restart, scale",
+                detail=f"Invalid action: {action}. Supported actions: start, stop, restart, scale, rollout, rollback, shadow, stop_shadow",
             )
 
     except Exception as e:
+        message = e.detail if isinstance(e, HTTPException) else str(e)
         return DeploymentActionResponse(
-            success=False, message=str(e), deployment_id=deployment_id
+            success=False, message=message, deployment_id=deployment_id
         )
 
 
@@ -201,6 +321,47 @@ def get_deployment_metrics(
     return deployment_service.get_deployment_metrics(deployment_id)
 
 
+@router.get("/{deployment_id}/metrics/history", response_model=MetricsHistory)
+def get_deployment_metrics_history(
+    deployment_id: int = Path(..., gt=0),
+    start: Optional[datetime] = Query(None, description="UTC; default end - 1h"),
+    end: Optional[datetime] = Query(None, description="UTC; default now"),
+    resolution: Optional[str] = Query(None, description="1m, 1h or 1d; default by range"),
+    model_version_id: Optional[int] = Query(None, gt=0, description="Only requests served by this version"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get request rate, error rate and latency percentiles over a time range"""
+    deployment_service = DeploymentService(db)
+
+    deployment = deployment_service.get_deployment(deployment_id)
+    if not deployment or deployment.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+
+    return MetricsService(db).get_history(
+        deployment_id, start, end, resolution, model_version_id
+    )
+
+
+@router.get("/{deployment_id}/shadow", response_model=ShadowReport)
+def get_shadow_report(
+    deployment_id: int = Path(..., gt=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Live comparison of the active version with the shadowed one"""
+    deployment_service = DeploymentService(db)
+
+    deployment = deployment_service.get_deployment(deployment_id)
+    if not deployment or deployment.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+
+    session = shadow_mirror.get(deployment_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="No shadow traffic is running")
+    return session.report()
+
+
 @router.get("/{deployment_id}/logs", response_model=List[DeploymentLog])
 def get_deployment_logs(
     deployment_id: int = Path(..., gt=0),
@@ -218,6 +379,33 @@ def get_deployment_logs(
     return deployment_service.get_deployment_logs(deployment_id, limit)
 
 
+@router.get("/{deployment_id}/logs/stream")
+async def stream_deployment_logs(
+    request: Request,
+    deployment_id: int = Path(..., gt=0),
+    since: Optional[str] = Query(None, description="Cursor of the last event received"),
+    last_event_id: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Tail deployment logs as Server-Sent Events"""
+    deployment_service = DeploymentService(db)
+
+    deployment = deployment_service.get_deployment(deployment_id)
+    if not deployment or deployment.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+    # Don't hold a pooled connection for the life of the stream
+    db.close()
+
+    topic = log_topic(deployment_id)
+    await run_in_threadpool(
+        event_hub.prime, topic, lambda: recent_logs(deployment_id, settings.EVENT_BUFFER_SIZE)
+    )
+    return sse_response(
+        stream_topic(request, event_hub, topic, "log", since or last_event_id)
+    )
+
+
 @router.post("/{deployment_id}/predict")
 async def predict(
     deployment_id: int = Path(..., gt=0),
@@ -232,20 +420,49 @@ async def predict(
     if not deployment:
         raise HTTPException(status_code=404, detail="Deployment not found")
 
-    if deployment.status != DeploymentStatus.RUNNING:
+    # UPDATING deployments keep serving from the active version during a rollout
+    if deployment.status not in (DeploymentStatus.RUNNING, DeploymentStatus.UPDATING):
         raise HTTPException(
             status_code=400,
             detail=f"Deployment is not running (status: {deployment.status})",
         )
 
-    # TODO: Implement actual prediction proxy
-    # This would forward the request to the deployed model endpoint
-    # For now, return a mock response
+    if not uses_local_runtime(deployment):
+        # Container deployments are not backed by the local runtime yet
+        return {
+            "deployment_id": deployment_id,
+            "model_name": deployment.model.name,
+            "prediction": "This is a mock prediction response",
+            "input": payload,
+            "status": "success",
+        }
+
+    # Replicas are resident after start (serverless ones cold-start inside
+    # predict); this only rebuilds the runtime if the API process restarted
+    # since the deployment went RUNNING.
+    started = time.perf_counter()
+    runtime = None
+    try:
+        runtime = runtime_manager.route(deployment_id)
+        if runtime is None or not (runtime.scale_to_zero or runtime.live_replicas()):
+            runtime = await run_in_threadpool(deployment_service.ensure_runtime, deployment)
+        result = await runtime.predict(payload)
+    except HTTPException as e:
+        metrics_recorder.record(
+            deployment_id,
+            (time.perf_counter() - started) * 1000.0,
+            error=e.status_code >= 500,
+            model_version_id=runtime.model_version_id if runtime else None,
+        )
+        raise
+    latency_ms = (time.perf_counter() - started) * 1000.0
+    metrics_recorder.record(deployment_id, latency_ms, model_version_id=runtime.model_version_id)
+    shadow_mirror.mirror(deployment_id, runtime, payload, result, latency_ms)
 
     return {
         "deployment_id": deployment_id,
         "model_name": deployment.model.name,
-        "prediction": "This is a mock prediction response",
-        "input": payload,
+        "model_version": runtime.version,
+        **result,
         "status": "success",
     }
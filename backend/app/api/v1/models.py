@@ -7,12 +7,11 @@ from fastapi import (
     Form,
     Query,
     Body,
+    Request,
 )
-from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 import json
-import os
 
 from app.api.deps import get_db, get_current_active_user, get_user_jwt_or_api_key
 from app.services.model import (
@@ -23,9 +22,21 @@ from app.services.model import (
     update_model,
     delete_model,
     get_model_version,
+    get_blob,
     update_version_metrics,
     increment_downloads,
 )
+from app.services.upload import (
+    abort_upload,
+    chunk_count,
+    chunk_length,
+    complete_upload,
+    create_upload_session,
+    get_upload_session,
+    missing_chunks,
+    write_chunk,
+)
+from app.models.model import UploadSession
 from app.models.user import User
 from app.schemas.model import (
     Model,
@@ -33,9 +44,18 @@ from app.schemas.model import (
     ModelUpdate,
     ModelVersion,
     ModelVersionCreate,
+    UploadSessionCreate,
+    UploadSessionStatus,
+)
+from app.utils.storage import (
+    artifact_exists,
+    artifact_path,
+    download_response,
+    save_uploaded_file,
+    starts_download,
+    storage,
 )
-from app.utils.storage import save_uploaded_file, get_download_url
-from app.utils.inference import get_model_file_path, load_model, run_inference
+from app.utils.inference import load_model, run_inference
 from app.core.config import settings
 
 router = APIRouter()
@@ -102,7 +122,7 @@ async def create_model_endpoint(
     )
 
     # Save the uploaded file
-    s3_path, size_mb = await save_uploaded_file(model_file, current_user.id)
+    s3_path, size_mb, content_hash = await save_uploaded_file(model_file)
 
     # Create the model with its first version
     return create_model_with_version(
@@ -112,6 +132,7 @@ async def create_model_endpoint(
         owner_id=current_user.id,
         s3_path=s3_path,
         size_mb=size_mb,
+        content_hash=content_hash,
     )
 
 
@@ -147,7 +168,7 @@ async def create_version_endpoint(
     )
 
     # Save the uploaded file
-    s3_path, size_mb = await save_uploaded_file(model_file, current_user.id)
+    s3_path, size_mb, content_hash = await save_uploaded_file(model_file)
 
     # Create the new version
     return create_model_version(
@@ -156,9 +177,105 @@ async def create_version_endpoint(
         version_in=version_in,
         s3_path=s3_path,
         size_mb=size_mb,
+        content_hash=content_hash,
+    )
+
+
+def _upload_status(db: Session, session: UploadSession) -> UploadSessionStatus:
+    missing = missing_chunks(db, session)
+    return UploadSessionStatus(
+        id=session.id,
+        model_id=session.model_id,
+        size_bytes=session.size_bytes,
+        chunk_size=session.chunk_size,
+        chunk_count=chunk_count(session),
+        received_bytes=session.size_bytes - sum(chunk_length(session, i) for i in missing),
+        missing_chunks=missing,
+        expires_at=session.expires_at,
     )
 
 
+def _own_upload(db: Session, upload_id: str, current_user: User) -> UploadSession:
+    session = get_upload_session(db, upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if session.owner_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return session
+
+
+@router.post("/uploads", response_model=UploadSessionStatus)
+def create_upload_endpoint(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    upload_in: UploadSessionCreate,
+):
+    """Start a resumable upload of a new model or of a new version of one"""
+    if upload_in.model_id is not None:
+        db_model = get_model(db, upload_in.model_id)
+        if db_model and db_model.owner_id != current_user.id and not current_user.is_superuser:
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    session = create_upload_session(
+        db=db,
+        owner_id=current_user.id,
+        size_bytes=upload_in.size_bytes,
+        version_in=upload_in.version,
+        model_id=upload_in.model_id,
+        model_in=upload_in.model,
+        chunk_size=upload_in.chunk_size,
+        sha256=upload_in.sha256,
+    )
+    return _upload_status(db, session)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionStatus)
+def read_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Progress of an upload; resume by sending its missing chunks"""
+    return _upload_status(db, _own_upload(db, upload_id, current_user))
+
+
+@router.put("/uploads/{upload_id}", status_code=204)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., description="Byte offset of the chunk, a multiple of chunk_size"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Write one chunk (the raw request body); chunks may be sent in parallel"""
+    session = _own_upload(db, upload_id, current_user)
+    await write_chunk(db, session, offset, request.stream())
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=ModelVersion)
+async def complete_upload_endpoint(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Verify and store the uploaded file, then create its model version"""
+    return await complete_upload(db, _own_upload(db, upload_id, current_user))
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+def abort_upload_endpoint(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Cancel an upload and discard its chunks"""
+    session = _own_upload(db, upload_id, current_user)
+    if session.completing_at is not None:
+        raise HTTPException(status_code=409, detail="Upload is being completed")
+    abort_upload(db, session)
+
+
 @router.get("/{model_id}/versions/{version}", response_model=ModelVersion)
 def read_model_version(
     model_id: int,
@@ -261,14 +378,21 @@ def read_user_models(
     return models
 
 
-@router.get("/{model_id}/download")
+@router.api_route("/{model_id}/download", methods=["GET", "HEAD"])
 def download_model(
     model_id: int,
+    request: Request,
     version: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_user_jwt_or_api_key),  # JWT or API key
 ):
-    """Download a model file. Accepts Bearer token or X-API-Key header."""
+    """
+    Download a model file. Accepts Bearer token or X-API-Key header.
+
+    Supports HEAD, Range (206) and If-None-Match / If-Range against the
+    version's content hash, so interrupted downloads can resume and
+    unchanged versions are not fetched again.
+    """
     db_model = get_model(db=db, model_id=model_id)
     if db_model is None:
         raise HTTPException(status_code=404, detail="Model not found")
@@ -281,27 +405,32 @@ def download_model(
             detail=f"Version {target_version} not found for model {model_id}",
         )
 
-    file_path = os.path.join(
-        settings.UPLOAD_DIR, db_version.s3_path.replace("models/", "")
-    )
-    if not os.path.exists(file_path):
+    if storage.remote and not artifact_exists(db_version.s3_path):
         raise HTTPException(status_code=404, detail="Model file not found on server")
 
-    increment_downloads(db, model_id)
-
     filename = f"{db_model.name.replace(' ', '_')}_v{target_version}.{db_version.format}"
-    return FileResponse(path=file_path, filename=filename, media_type="application/octet-stream")
+    # Content-addressed versions carry their hash as a strong ETag
+    response = download_response(
+        request, db_version.s3_path, filename, blob=get_blob(db, db_version.content_hash)
+    )
+    # Resumed ranges, revalidations and HEADs are not new downloads
+    if request.method == "GET" and starts_download(response):
+        increment_downloads(db, model_id)
+    return response
 
 
-@router.get("/{model_id}/versions/{version}/download")
+@router.api_route("/{model_id}/versions/{version}/download", methods=["GET", "HEAD"])
 def download_model_version(
     model_id: int,
     version: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_user_jwt_or_api_key),
 ):
     """Download a specific version. Accepts Bearer token or X-API-Key header."""
-    return download_model(model_id=model_id, version=version, db=db, current_user=current_user)
+    return download_model(
+        model_id=model_id, request=request, version=version, db=db, current_user=current_user
+    )
 
 
 @router.post("/{model_id}/predict")
@@ -332,8 +461,11 @@ def predict(
     if not db_version:
         raise HTTPException(status_code=404, detail=f"Version {target_version} not found")
 
-    # Resolve local file path
-    file_path = get_model_file_path(db_version.s3_path, settings.UPLOAD_DIR)
+    # Resolve local file path (fetched or promoted from the archive tier first)
+    try:
+        file_path = artifact_path(db_version.s3_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Model file not found on server")
 
     # Load and run the model
     model = load_model(file_path, db_version.format)
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from typing import Optional, List
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -48,9 +49,56 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: Optional[str] = os.getenv("AWS_SECRET_ACCESS_KEY")
     AWS_REGION: str = os.getenv("AWS_REGION", "us-east-1")
     S3_BUCKET: str = os.getenv("S3_BUCKET", "modelhub-models")
+    S3_ENDPOINT_URL: Optional[str] = os.getenv("S3_ENDPOINT_URL")  # S3-compatible store, e.g. MinIO
+    S3_MULTIPART_THRESHOLD: int = 16 * 1024 * 1024  # bytes; larger files transfer in parts
+    S3_PART_SIZE: int = 8 * 1024 * 1024  # bytes per multipart part / ranged GET
+    S3_MAX_CONCURRENCY: int = 8  # parts transferred in parallel
+    S3_URL_EXPIRY: int = 3600  # seconds a pre-signed download URL stays valid
 
     # File Storage
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")  # local or s3 (see utils/storage.py)
+    STORAGE_CACHE_DIR: str = os.getenv(
+        "STORAGE_CACHE_DIR", os.path.join(os.getenv("UPLOAD_DIR", "uploads"), "cache")
+    )  # local copies of remote artifacts
+    STORAGE_CACHE_MAX_BYTES: int = int(
+        os.getenv("STORAGE_CACHE_MAX_BYTES", 10 * 1024 * 1024 * 1024)
+    )  # LRU-evicted above this
+
+    # Resumable chunked uploads
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # default bytes per chunk
+    UPLOAD_MAX_CHUNK_SIZE: int = 64 * 1024 * 1024
+    UPLOAD_MAX_SIZE: int = 50 * 1024 * 1024 * 1024  # bytes per artifact
+    UPLOAD_SESSION_TTL: int = 24 * 3600  # seconds an unfinished upload is kept
+
+    # Pre-compressed download variants (see services/variants.py)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_ZSTD_LEVEL: int = 10  # needs the zstandard package
+    COMPRESSION_MAX_RATIO: float = 0.9  # larger variants aren't worth keeping
+    COMPRESSION_POLL_INTERVAL: float = 60.0  # seconds between scans for new blobs
+
+    # Hot/archive storage tiering (see services/tiering.py)
+    TIERING_ENABLED: bool = os.getenv("TIERING_ENABLED", "true").lower() == "true"
+    TIERING_INTERVAL: float = 300.0  # seconds between runs
+    TIERING_HOT_HIGH_BYTES: int = int(
+        os.getenv("TIERING_HOT_HIGH_BYTES", 50 * 1024 * 1024 * 1024)
+    )  # start archiving above this
+    TIERING_HOT_LOW_BYTES: int = int(
+        os.getenv("TIERING_HOT_LOW_BYTES", 40 * 1024 * 1024 * 1024)
+    )  # ... until under this
+    TIERING_MIN_IDLE: float = 7 * 24 * 3600  # seconds without access before a blob may go
+    TIERING_BATCH_SIZE: int = 100  # blobs archived per run at most
+
+    # Orphaned artifact garbage collection (see services/artifact_gc.py)
+    GC_ENABLED: bool = os.getenv("GC_ENABLED", "true").lower() == "true"
+    GC_INTERVAL: float = 600.0  # seconds between runs
+    GC_GRACE_PERIOD: float = float(
+        os.getenv("GC_GRACE_PERIOD", 24 * 3600)
+    )  # files modified more recently are never collected
+    GC_SCAN_LIMIT: int = 10000  # files examined per run; a full pass spans several runs
+    GC_BATCH_SIZE: int = 500  # files checked against the database per query
+    GC_MAX_DELETES_PER_SECOND: float = 20.0
 
     # Model Settings
     SUPPORTED_MODEL_FORMATS: List[str] = [
@@ -64,6 +112,84 @@ class Settings(BaseSettings):
     MAX_INFERENCE_TIME: int = 30  # seconds
     MAX_BATCH_SIZE: int = 32
 
+    # Local Serving Runtime (replica worker processes)
+    RUNTIME_SOCKET_DIR: str = os.getenv(
+        "RUNTIME_SOCKET_DIR", os.path.join(tempfile.gettempdir(), "modelhub-runtime")
+    )
+    RUNTIME_STARTUP_TIMEOUT: int = 60  # seconds for a replica to load its model
+    RUNTIME_MAX_CONNECTIONS: int = 8  # pooled keep-alive connections per replica
+    RUNTIME_EWMA_ALPHA: float = 0.3  # weight of the newest latency in routing scores
+    RUNTIME_LATENCY_WINDOW: int = 512  # recent latencies kept for the hedge delay
+    RUNTIME_HEDGE_REQUESTS: bool = False  # default; override per deployment_config
+    RUNTIME_HEDGE_MIN_SAMPLES: int = 50  # latencies needed before hedging starts
+    # Fork replicas from a per-version zygote that has the model preloaded
+    RUNTIME_USE_ZYGOTE: bool = os.getenv("RUNTIME_USE_ZYGOTE", "true").lower() == "true"
+    # Apply cpu_limit / memory_limit to replicas (rlimits + CPU affinity, or
+    # cgroups v2 under a delegated, writable RUNTIME_CGROUP_ROOT)
+    RUNTIME_ENFORCE_LIMITS: bool = True
+    RUNTIME_CGROUP_ROOT: Optional[str] = os.getenv("RUNTIME_CGROUP_ROOT")
+
+    # Deployment orchestrator (PENDING -> BUILDING -> DEPLOYING -> RUNNING)
+    DEPLOY_MAX_CONCURRENCY: int = 4  # deployments brought up at once
+    DEPLOY_POLL_INTERVAL: float = 5.0  # seconds between scans for PENDING rows
+    DEPLOY_STATUS_FLUSH_INTERVAL: float = 0.5  # seconds between batched status writes
+    # A BUILDING/DEPLOYING row whose process stopped renewing it for this
+    # long is requeued (the process renews every quarter of it)
+    DEPLOY_LEASE_TIMEOUT: float = 60.0
+
+    # Write-behind deployment log sink
+    LOG_SINK_BATCH_SIZE: int = 200  # events per bulk INSERT (also flushes early)
+    LOG_SINK_FLUSH_INTERVAL: float = 1.0  # seconds between flushes
+    LOG_SINK_MAX_QUEUE: int = 10000  # queued events before new ones are dropped
+
+    # In-process event hub and Server-Sent Events streams
+    EVENT_BUFFER_SIZE: int = 500  # events kept per topic for replay
+    EVENT_SUBSCRIBER_QUEUE: int = 1000  # undelivered events before a subscriber lags
+    EVENT_TOPIC_RETENTION: float = 3600.0  # seconds an idle topic without subscribers is kept
+    SSE_HEARTBEAT_INTERVAL: float = 15.0  # seconds between keep-alive comments
+
+    # Container daemon (shared client; container deployments fall back to
+    # local replicas while it is unreachable)
+    CONTAINER_CLIENT_TIMEOUT: int = 5  # seconds per daemon API call
+    CONTAINER_HEALTH_INTERVAL: float = 30.0  # seconds between daemon pings
+    CONTAINER_HEALTH_MAX_BACKOFF: float = 300.0  # longest retry delay while down
+
+    # Serverless (scale-to-zero) deployments
+    SERVERLESS_IDLE_TIMEOUT: int = 300  # seconds without requests before releasing replicas
+    SERVERLESS_MAX_BUFFERED_REQUESTS: int = 100  # requests held during a cold start
+
+    # Version rollouts
+    ROLLOUT_ROLLBACK_WINDOW: int = 600  # seconds the previous version stays resident
+    ROLLOUT_STEPS: List[int] = [10, 25, 50]  # % of traffic per gradual step before 100%
+    ROLLOUT_STEP_INTERVAL: int = 30  # seconds between gradual steps
+    ROLLOUT_WARMUP_REQUESTS: int = 3  # warm-up predictions per new replica
+    ROLLOUT_MAX_ERROR_RATE: float = 0.05  # abort a gradual rollout above this
+
+    # Shadow traffic (live predictions mirrored to a candidate version)
+    SHADOW_DEFAULT_FRACTION: float = 0.1  # share of predictions mirrored
+    SHADOW_MAX_INFLIGHT: int = 32  # outstanding mirrored requests before skipping
+    SHADOW_REPORT_INTERVAL: float = 30.0  # seconds between report writes
+    SHADOW_TOLERANCE: float = 1e-6  # relative tolerance for numeric outputs to agree
+
+    # Autoscaling of local replicas
+    AUTOSCALE_INTERVAL: int = 15  # seconds between samples
+    AUTOSCALE_TARGET_QUEUE_DEPTH: float = 4.0  # outstanding requests per replica
+    AUTOSCALE_UP_SAMPLES: int = 2  # consecutive high samples before scaling up
+    AUTOSCALE_DOWN_SAMPLES: int = 4  # consecutive low samples before scaling down
+    AUTOSCALE_UP_COOLDOWN: int = 30  # seconds
+    AUTOSCALE_DOWN_COOLDOWN: int = 120  # seconds
+
+    # In-memory replica telemetry (per-deployment ring buffers)
+    TELEMETRY_INTERVAL: float = 5.0  # seconds between /proc samples
+    TELEMETRY_WINDOW: int = 120  # samples kept per deployment
+
+    # Request/latency history (deployment_metric_rollups)
+    METRICS_FLUSH_INTERVAL: int = 30  # seconds between writes of closed minutes
+    METRICS_MINUTE_RETENTION_DAYS: int = 2
+    METRICS_HOUR_RETENTION_DAYS: int = 45
+    METRICS_DAY_RETENTION_DAYS: int = 730
+    METRICS_LATENCY_WINDOW: int = 60  # minutes behind the percentiles in /metrics
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Use DATABASE_URL if available (Railway standard), otherwise construct from components
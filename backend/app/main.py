@@ -1,13 +1,21 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 import os
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.api.v1.api import api_router
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_db
+from app.runtime.container import container_runtime
+from app.services.log_sink import deployment_log_sink
+from app.services.model import get_blob
+from app.services.artifact_gc import artifact_collector
+from app.services.tiering import tiering_job
+from app.services.variants import variant_builder
+from app.utils.storage import blob_key, download_response, is_sha256, storage
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -64,18 +72,35 @@ os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
 
 # Download endpoint
-@app.get(f"{settings.API_V1_STR}/downloads/models/{{user_id}}/{{filename}}")
+@app.api_route(
+    f"{settings.API_V1_STR}/downloads/models/{{user_id}}/{{filename}}", methods=["GET", "HEAD"]
+)
 async def download_file(
-    user_id: str, filename: str, current_user=Depends(get_current_active_user)
+    user_id: str, filename: str, request: Request, current_user=Depends(get_current_active_user)
 ):
-    file_path = os.path.join(settings.UPLOAD_DIR, user_id, filename)
+    if user_id in (os.curdir, os.pardir) or filename in (os.curdir, os.pardir):
+        raise HTTPException(status_code=404, detail="File not found")
+    return download_response(request, f"models/{user_id}/{filename}", filename)
+
 
-    if not os.path.exists(file_path):
+@app.api_route(
+    f"{settings.API_V1_STR}/downloads/blobs/{{prefix}}/{{shard}}/{{sha256}}", methods=["GET", "HEAD"]
+)
+async def download_blob(
+    prefix: str,
+    shard: str,
+    sha256: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_active_user),
+):
+    if not is_sha256(sha256) or f"{prefix}{shard}" != sha256[:4]:
+        raise HTTPException(status_code=404, detail="File not found")
+    blob = get_blob(db, sha256)
+    if blob is None:
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(
-        file_path, media_type="application/octet-stream", filename=filename
-    )
+    return download_response(request, blob_key(sha256), sha256, blob=blob)
 
 
 # Health check endpoint
@@ -85,6 +110,12 @@ async def health_check():
         "status": "healthy",
         "cors_origins": cors_origins + settings.BACKEND_CORS_ORIGINS,
         "port": os.getenv("PORT", "8000"),
+        "container_runtime": container_runtime.status(),
+        "storage": storage.stats(),
+        "compression": variant_builder.stats(),
+        "tiering": tiering_job.stats(),
+        "gc": artifact_collector.stats(),
+        "deployment_logs": deployment_log_sink.stats(),
     }
 
 
@@ -115,7 +146,7 @@ async def startup_event():
         from app.core.database import engine, Base
         from app.models.user import User, UserRole
         from app.models.model import Model, ModelVersion
-        from app.models.deployment import ModelDeployment, DeploymentLog
+        from app.models.deployment import ModelDeployment, DeploymentLog, DeploymentMetricRollup
         from app.models.analytics import PlatformAnalytics, UserActivity, ModelActivity
         from app.core.security import get_password_hash
         from sqlalchemy.orm import Session
@@ -187,6 +218,58 @@ async def startup_event():
         # Don't fail startup, just log the error
 
 
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start the log sink, orchestrator, autoscaler, telemetry, metrics flusher, shadow reports, variant builder, storage tiering, artifact GC and daemon health check"""
+    from app.runtime.autoscaler import autoscaler
+    from app.runtime.container import container_runtime
+    from app.runtime.telemetry import telemetry
+    from app.services.metrics import metrics_recorder
+    from app.services.log_sink import deployment_log_sink
+    from app.services.orchestrator import deployment_orchestrator
+    from app.services.shadow import shadow_mirror
+    from app.runtime.manager import runtime_manager
+
+    # Fails startup of a second API worker: replicas are per process
+    runtime_manager.claim_host()
+    deployment_log_sink.start()
+    container_runtime.start()
+    deployment_orchestrator.start()
+    autoscaler.start()
+    telemetry.start()
+    metrics_recorder.start()
+    shadow_mirror.start()
+    variant_builder.start()
+    tiering_job.start()
+    artifact_collector.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and local deployment replicas"""
+    from app.runtime.autoscaler import autoscaler
+    from app.runtime.container import container_runtime
+    from app.runtime.manager import runtime_manager
+    from app.runtime.telemetry import telemetry
+    from app.services.log_sink import deployment_log_sink
+    from app.services.metrics import metrics_recorder
+    from app.services.orchestrator import deployment_orchestrator
+    from app.services.shadow import shadow_mirror
+
+    await deployment_orchestrator.stop()
+    await autoscaler.stop()
+    await telemetry.stop()
+    await metrics_recorder.stop()
+    await shadow_mirror.stop()
+    await variant_builder.stop()
+    await tiering_job.stop()
+    await artifact_collector.stop()
+    await container_runtime.stop()
+    runtime_manager.shutdown()
+    # Last, so events logged while stopping the others are written too
+    await deployment_log_sink.stop()
+
+
 if __name__ == "__main__":
     import uvicorn
 
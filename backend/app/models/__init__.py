@@ -1,6 +1,6 @@
 # Import all models to ensure SQLAlchemy can resolve relationships
 from .user import User
 from .model import Model, ModelVersion
-from .deployment import ModelDeployment, DeploymentLog
+from .deployment import ModelDeployment, DeploymentLog, DeploymentMetricRollup
 
-__all__ = ["User", "Model", "ModelVersion", "ModelDeployment", "DeploymentLog"]
+__all__ = ["User", "Model", "ModelVersion", "ModelDeployment", "DeploymentLog", "DeploymentMetricRollup"]
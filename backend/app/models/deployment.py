@@ -9,6 +9,7 @@ from sqlalchemy import (
     Text,
     Boolean,
     Enum,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -108,3 +109,33 @@ class DeploymentLog(Base):
 
     def __repr__(self):
         return f"<DeploymentLog {self.log_level}: {self.message[:50]}>"
+
+
+class DeploymentMetricRollup(Base):
+    """
+    Request/latency aggregate for one deployment over one time bucket.
+    Each bucket is stored at 1-minute, 1-hour and 1-day resolution
+    (``resolution`` in seconds); finer rows expire sooner.
+    """
+
+    __tablename__ = "deployment_metric_rollups"
+    __table_args__ = (
+        UniqueConstraint("deployment_id", "resolution", "bucket_start"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    deployment_id = Column(Integer, ForeignKey("model_deployments.id"), index=True)
+    resolution = Column(Integer)  # 60, 3600 or 86400
+    bucket_start = Column(DateTime, index=True)  # UTC
+
+    request_count = Column(Integer, default=0)
+    error_count = Column(Integer, default=0)
+    latency_sketch = Column(JSON, default={})  # LatencySketch.to_dict()
+    # {model_version_id: {"requests", "errors", "latency_sketch"}}
+    version_stats = Column(JSON, default={})
+
+    def __repr__(self):
+        return (
+            f"<DeploymentMetricRollup {self.deployment_id} "
+            f"{self.resolution}s@{self.bucket_start}: {self.request_count} req>"
+        )
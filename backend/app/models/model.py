@@ -1,5 +1,7 @@
 from sqlalchemy import (
+    BigInteger,
     Column,
+    PrimaryKeyConstraint,
     Integer,
     String,
     Float,
@@ -28,13 +30,69 @@ class DeploymentStatus(enum.Enum):
     EMERGENCY_DISABLED = "emergency_disabled"
 
 
+class StorageTier(enum.Enum):
+    HOT = "hot"  # original bytes stored
+    ARCHIVED = "archived"  # only the compressed variants (see services/tiering.py)
+
+
+class ModelBlob(Base):
+    """A stored artifact, shared by every version with the same content"""
+
+    __tablename__ = "model_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # versions using it
+    variants = Column(JSON)  # {"zstd": bytes, "gzip": bytes}; None until built
+    tier = Column(Enum(StorageTier), default=StorageTier.HOT, index=True)
+    last_accessed_at = Column(DateTime(timezone=True))  # None: never since upload
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ModelBlob {self.sha256[:12]} refs={self.ref_count}>"
+
+
+class UploadSession(Base):
+    """A resumable upload in progress (see services/upload.py)"""
+
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex; also the part file's name
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    model_id = Column(Integer, ForeignKey("models.id"), nullable=True)  # None: new model
+    model_fields = Column(JSON)  # ModelCreate of a new model
+    version_fields = Column(JSON, nullable=False)  # ModelVersionCreate
+    size_bytes = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    sha256 = Column(String(64))  # expected digest, checked on completion
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    completing_at = Column(DateTime(timezone=True))  # claimed by a complete request
+
+    chunks = relationship("UploadChunk", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<UploadSession {self.id} {self.size_bytes} bytes>"
+
+
+class UploadChunk(Base):
+    """A chunk of an upload session that has been written"""
+
+    __tablename__ = "upload_chunks"
+    __table_args__ = (PrimaryKeyConstraint("session_id", "chunk_index"),)
+
+    session_id = Column(String(32), ForeignKey("upload_sessions.id", ondelete="CASCADE"))
+    chunk_index = Column(Integer)  # offset // chunk_size
+
+
 class ModelVersion(Base):
     __tablename__ = "model_versions"
 
     id = Column(Integer, primary_key=True, index=True)
     version = Column(String, index=True)
     changelog = Column(Text)
-    s3_path = Column(String)  # Path to model files in S3
+    s3_path = Column(String, index=True)  # Path to model files in S3
+    content_hash = Column(String(64), ForeignKey("model_blobs.sha256"), index=True)  # SHA-256
     size_mb = Column(Float)
     format = Column(String)  # saved_model, pt, pth, onnx, etc.
     model_metadata = Column(JSON)  # Additional version-specific metadata
@@ -0,0 +1,3 @@
+"""
+Local serving runtime for deployment replicas
+"""
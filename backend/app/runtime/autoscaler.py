@@ -0,0 +1,165 @@
+"""
+autoscaler.py — Background autoscaler for local deployment replicas.
+
+Every AUTOSCALE_INTERVAL seconds the controller samples each running
+runtime (replica CPU time from /proc and the proxy's outstanding
+requests), asks ScalingPolicy (see policy.py) for a replica count and
+applies it, logging each scaling decision to the deployment log along
+with any cpu_limit / memory_limit violations (see limits.py).
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.deployment import ModelDeployment, DeploymentStatus
+from app.runtime.manager import DeploymentRuntime, ReplicaStartError, runtime_manager
+from app.runtime.policy import ScalerState, ScalingPolicy, ScalingSample
+from app.runtime.procfs import read_cpu_seconds
+from app.services.deployment import DeploymentService
+
+logger = logging.getLogger(__name__)
+
+
+class AutoscalerController:
+    """Background task that samples runtimes and applies ScalingPolicy"""
+
+    def __init__(self, interval: float = settings.AUTOSCALE_INTERVAL):
+        self.interval = interval
+        self._states: Dict[int, ScalerState] = {}
+        self._cpu_marks: Dict[int, Tuple[float, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Autoscaler tick failed")
+
+    def sample(self, runtime: DeploymentRuntime, cpu_limit: float) -> ScalingSample:
+        """Measure CPU since the previous sample and current queue depth"""
+        now = time.monotonic()
+        live = runtime.live_replicas()
+        busy, measured = 0.0, 0
+        for replica in live:
+            cpu_seconds = read_cpu_seconds(replica.pid)
+            if cpu_seconds is None:
+                continue
+            mark = self._cpu_marks.get(replica.pid)
+            self._cpu_marks[replica.pid] = (cpu_seconds, now)
+            if mark and now > mark[1]:
+                cores = (cpu_seconds - mark[0]) / (now - mark[1])
+                replica.monitor.cpu_cores = cores
+                busy += cores
+                measured += 1
+
+        cpu_percent = None
+        if measured:
+            cpu_percent = 100.0 * busy / (measured * (cpu_limit or 1.0))
+        return ScalingSample(len(live), cpu_percent, runtime.queue_depth())
+
+    async def tick(self):
+        deployment_ids = runtime_manager.deployment_ids()
+        if not deployment_ids:
+            self._states.clear()
+            self._cpu_marks.clear()
+            return
+
+        db = SessionLocal()
+        try:
+            deployments = (
+                db.query(ModelDeployment)
+                .filter(
+                    ModelDeployment.id.in_(deployment_ids),
+                    ModelDeployment.status == DeploymentStatus.RUNNING,
+                )
+                .all()
+            )
+            for deployment in deployments:
+                runtime = runtime_manager.get(deployment.id)
+                if runtime is None:
+                    continue
+                await self._evaluate(db, deployment, runtime)
+        finally:
+            db.close()
+
+        live_pids = set()
+        for deployment_id in deployment_ids:
+            runtime = runtime_manager.get(deployment_id)
+            if runtime:
+                live_pids.update(r.pid for r in runtime.replicas)
+        self._cpu_marks = {p: m for p, m in self._cpu_marks.items() if p in live_pids}
+        self._states = {i: s for i, s in self._states.items() if i in deployment_ids}
+
+    async def _evaluate(self, db, deployment: ModelDeployment, runtime: DeploymentRuntime):
+        for event in runtime.check_limits():
+            message = event.pop("message")
+            DeploymentService(db)._log_deployment_event(
+                deployment.id, "WARNING", message, "limits", event
+            )
+
+        if runtime.scale_to_zero:
+            if not runtime.live_replicas():
+                return  # already scaled to zero; the next request cold-starts it
+            if runtime.is_idle():
+                await run_in_threadpool(runtime.scale_to, 0)
+                DeploymentService(db)._log_deployment_event(
+                    deployment.id,
+                    "INFO",
+                    f"Scaled to zero after {runtime.idle_timeout}s without requests",
+                    "scaler",
+                    {"idle_timeout": runtime.idle_timeout},
+                )
+                return
+
+        sample = self.sample(runtime, deployment.cpu_limit)
+        state = self._states.setdefault(deployment.id, ScalerState())
+        decision = ScalingPolicy.from_deployment(deployment).decide(
+            state, sample, time.monotonic()
+        )
+        if decision is None or decision.replicas == sample.replicas:
+            return
+
+        metadata = {
+            "from_replicas": sample.replicas,
+            "to_replicas": decision.replicas,
+            "cpu_percent": sample.cpu_percent,
+            "queue_depth": sample.queue_depth,
+            "reason": decision.reason,
+        }
+        service = DeploymentService(db)
+        try:
+            replicas = await run_in_threadpool(runtime.scale_to, decision.replicas)
+        except ReplicaStartError as e:
+            service._log_deployment_event(
+                deployment.id, "ERROR", f"Scaling failed: {e}", "scaler", metadata
+            )
+            return
+
+        direction = "up" if replicas > sample.replicas else "down"
+        service._log_deployment_event(
+            deployment.id,
+            "INFO",
+            f"Scaled {direction} from {sample.replicas} to {replicas} replicas: "
+            f"{decision.reason}",
+            "scaler",
+            metadata,
+        )
+
+
+autoscaler = AutoscalerController()
@@ -0,0 +1,142 @@
+"""
+container.py — Process-wide container daemon client.
+
+The Docker client is created once, on first use, and shared by every
+request instead of being built (and its daemon probed) each time a
+DeploymentService is constructed. A background task pings the daemon
+every CONTAINER_HEALTH_INTERVAL seconds: a lost daemon is marked
+unavailable and reconnected on a later check, with exponential backoff
+up to CONTAINER_HEALTH_MAX_BACKOFF.
+
+When no daemon is reachable (or the docker package is not installed),
+container deployments fall back to local replica processes served by
+the runtime manager.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+try:
+    import docker
+
+    DOCKER_AVAILABLE = True
+except ImportError:
+    DOCKER_AVAILABLE = False
+    docker = None
+
+logger = logging.getLogger(__name__)
+
+
+class ContainerRuntime:
+    """Lazily connected, health-checked Docker client shared per process"""
+
+    def __init__(
+        self,
+        health_interval: float = settings.CONTAINER_HEALTH_INTERVAL,
+        max_backoff: float = settings.CONTAINER_HEALTH_MAX_BACKOFF,
+    ):
+        self.health_interval = health_interval
+        self.max_backoff = max_backoff
+        self._client = None
+        self._connected = False
+        self._checked_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self):
+        """The shared docker client, or None when no daemon is reachable"""
+        if self._checked_at is None:
+            self.check()
+        return self._client if self._connected else None
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    def check(self) -> bool:
+        """Connect if needed and ping the daemon; never raises"""
+        with self._lock:
+            if not DOCKER_AVAILABLE:
+                if self._checked_at is None:
+                    logger.warning(
+                        "Docker module not available. Container deployments "
+                        "will run as local replicas."
+                    )
+                self._checked_at = time.monotonic()
+                self._last_error = "docker module not installed"
+                return False
+
+            try:
+                if self._client is None:
+                    self._client = docker.from_env(timeout=settings.CONTAINER_CLIENT_TIMEOUT)
+                self._client.ping()
+            except Exception as e:
+                if self._connected or self._checked_at is None:
+                    logger.warning(f"Docker daemon not available: {e}")
+                self._close()
+                self._connected = False
+                self._failures += 1
+                self._last_error = str(e)
+            else:
+                if not self._connected and self._checked_at is not None:
+                    logger.info("Docker daemon reachable again")
+                self._connected = True
+                self._failures = 0
+                self._last_error = None
+            self._checked_at = time.monotonic()
+            return self._connected
+
+    def _close(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "docker_installed": DOCKER_AVAILABLE,
+            "available": self._connected,
+            "last_error": self._last_error,
+            "consecutive_failures": self._failures,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        with self._lock:
+            self._close()
+            self._connected = False
+
+    async def _run(self):
+        if not DOCKER_AVAILABLE:
+            # Nothing to connect to until the process is restarted
+            await run_in_threadpool(self.check)
+            return
+        while True:
+            try:
+                await run_in_threadpool(self.check)
+            except Exception:
+                logger.exception("Docker health check failed")
+            delay = self.health_interval
+            if self._failures:
+                delay = min(self.health_interval * 2 ** (self._failures - 1), self.max_backoff)
+            await asyncio.sleep(delay)
+
+
+container_runtime = ContainerRuntime()
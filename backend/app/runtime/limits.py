@@ -0,0 +1,306 @@
+"""
+limits.py — Apply a deployment's cpu_limit / memory_limit to its replicas.
+
+Each replica gets a ResourceLimits built by the manager and applies it to
+itself at startup, before loading the model:
+
+  - cgroups v2 (when RUNTIME_CGROUP_ROOT points at a delegated, writable
+    cgroup with the cpu and memory controllers): the replica joins its own
+    child cgroup with ``cpu.max`` and ``memory.max`` set
+  - otherwise RLIMIT_DATA caps the replica's heap at memory_limit
+  - CPU affinity pins the replica to ceil(cpu_limit) of the least used CPUs
+  - numpy / BLAS / OpenMP thread pools (env vars, or threadpoolctl for
+    libraries a zygote already imported) and ONNX intra-op threads are
+    sized to floor(cpu_limit), so replicas do not oversubscribe cores
+
+Violations (allocations failing under the limit, OOM kills, CPU
+throttling, or CPU use above the limit where it cannot be enforced) are
+collected per replica for the autoscaler to record in DeploymentLog.
+"""
+import math
+import os
+import signal
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+CGROUP_PERIOD_US = 100000
+CPU_OVERUSE_MARGIN = 1.1  # tolerated ratio of measured CPU to cpu_limit
+
+
+class ResourceLimits:
+    """Limits for one replica process, passed to it as JSON"""
+
+    def __init__(
+        self,
+        cpu_limit: Optional[float] = None,
+        memory_limit: Optional[int] = None,
+        cpus: Optional[List[int]] = None,
+        cgroup: Optional[str] = None,
+    ):
+        self.cpu_limit = cpu_limit  # cores
+        self.memory_limit = memory_limit  # MB
+        self.cpus = cpus or []
+        self.cgroup = cgroup
+
+    @property
+    def threads(self) -> Optional[int]:
+        """Thread pool size that fits inside the CPU share"""
+        if not self.cpu_limit:
+            return None
+        return max(1, math.floor(self.cpu_limit))
+
+    def thread_env(self) -> Dict[str, str]:
+        if self.threads is None:
+            return {}
+        return {name: str(self.threads) for name in THREAD_ENV_VARS}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cpu_limit": self.cpu_limit,
+            "memory_limit": self.memory_limit,
+            "cpus": self.cpus,
+            "cgroup": self.cgroup,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ResourceLimits":
+        return cls(**(data or {}))
+
+    def apply(self):
+        """Constrain the calling process; call before loading the model"""
+        if self.cgroup:
+            with open(os.path.join(self.cgroup, "cgroup.procs"), "w") as f:
+                f.write(str(os.getpid()))
+
+        if self.cpus and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, self.cpus)
+
+        if self.threads is not None:
+            os.environ.update(self.thread_env())
+            try:
+                # Env vars only reach libraries loaded after this point; a
+                # zygote-forked replica has numpy/BLAS loaded already.
+                from threadpoolctl import threadpool_limits
+
+                threadpool_limits(limits=self.threads)
+            except ImportError:
+                pass
+
+        # Last, so the steps above are not themselves refused memory
+        if self.memory_limit and not self.cgroup:
+            import resource
+
+            limit = self.memory_limit * 2**20
+            used = _data_segment_bytes()
+            if used is not None and used >= limit:
+                # A forked replica inherits its zygote's heap; fail fast
+                # instead of serving with no headroom at all
+                raise MemoryError(
+                    f"Replica already uses {used // 2**20}MB, "
+                    f"above memory_limit={self.memory_limit}MB"
+                )
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+
+def _data_segment_bytes() -> Optional[int]:
+    """VmData of the calling process: what RLIMIT_DATA is checked against"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmData:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+class CpuAllocator:
+    """Spreads pinned replicas across the CPUs this process may use"""
+
+    def __init__(self):
+        self._usage = Counter()
+        self._lock = threading.Lock()
+
+    def allocate(self, count: int) -> List[int]:
+        if not hasattr(os, "sched_getaffinity"):
+            return []
+        available = sorted(os.sched_getaffinity(0))
+        with self._lock:
+            chosen = sorted(available, key=lambda cpu: (self._usage[cpu], cpu))[:count]
+            self._usage.update(chosen)
+        return sorted(chosen)
+
+    def release(self, cpus: List[int]):
+        with self._lock:
+            self._usage.subtract(cpus)
+
+
+cpu_allocator = CpuAllocator()
+
+
+def cgroup_root() -> Optional[str]:
+    """The delegated cgroup v2 directory replicas go under, if usable"""
+    root = settings.RUNTIME_CGROUP_ROOT
+    if not root:
+        return None
+    try:
+        with open(os.path.join(root, "cgroup.controllers")) as f:
+            controllers = set(f.read().split())
+    except OSError:
+        return None
+    if not {"cpu", "memory"} <= controllers or not os.access(root, os.W_OK):
+        return None
+    try:
+        with open(os.path.join(root, "cgroup.subtree_control"), "w") as f:
+            f.write("+cpu +memory")
+    except OSError:
+        return None  # e.g. the root itself still holds processes
+    return root
+
+
+def create_cgroup(name: str, cpu_limit: Optional[float], memory_limit: Optional[int]) -> Optional[str]:
+    """Create a replica cgroup with cpu.max / memory.max; None if unavailable"""
+    root = cgroup_root()
+    if root is None:
+        return None
+    path = os.path.join(root, name)
+    try:
+        os.makedirs(path, exist_ok=True)
+        if cpu_limit:
+            _write(path, "cpu.max", f"{int(cpu_limit * CGROUP_PERIOD_US)} {CGROUP_PERIOD_US}")
+        if memory_limit:
+            _write(path, "memory.max", str(memory_limit * 2**20))
+            if os.path.exists(os.path.join(path, "memory.swap.max")):
+                _write(path, "memory.swap.max", "0")
+    except OSError:
+        remove_cgroup(path)
+        return None
+    return path
+
+
+def remove_cgroup(path: str):
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass  # still populated or already gone
+
+
+def read_cgroup_counters(path: str) -> Dict[str, int]:
+    """oom_kill / max from memory.events and nr_throttled from cpu.stat"""
+    counters = {}
+    for filename in ("memory.events", "cpu.stat"):
+        try:
+            with open(os.path.join(path, filename)) as f:
+                for line in f:
+                    key, _, value = line.partition(" ")
+                    counters[key] = int(value)
+        except (OSError, ValueError):
+            continue
+    return counters
+
+
+def _write(path: str, filename: str, value: str):
+    with open(os.path.join(path, filename), "w") as f:
+        f.write(value)
+
+
+def build_limits(name: str, cpu_limit: Optional[float], memory_limit: Optional[int]) -> Optional[ResourceLimits]:
+    """Reserve CPUs (and a cgroup, where possible) for a new replica"""
+    if not settings.RUNTIME_ENFORCE_LIMITS:
+        return None
+    cpus = cpu_allocator.allocate(math.ceil(cpu_limit)) if cpu_limit else []
+    cgroup = create_cgroup(name, cpu_limit, memory_limit)
+    return ResourceLimits(cpu_limit, memory_limit, cpus, cgroup)
+
+
+def release_limits(limits: Optional[ResourceLimits]):
+    """Return a stopped replica's CPUs and remove its cgroup"""
+    if limits is None:
+        return
+    cpu_allocator.release(limits.cpus)
+    if limits.cgroup:
+        remove_cgroup(limits.cgroup)
+
+
+class LimitMonitor:
+    """Turns one replica's counters into limit-violation events"""
+
+    def __init__(self, limits: Optional[ResourceLimits]):
+        self.limits = limits
+        self.memory_errors = 0  # predictions that failed with MemoryError
+        self.cpu_cores: Optional[float] = None  # latest measured CPU use
+        self._marks: Dict[str, int] = {}
+        self._reported_memory_errors = 0
+        self._over_cpu = False
+        self._exit_reported = False
+
+    def events(self, pid: int, returncode: Optional[int]) -> List[Dict[str, Any]]:
+        """Violations observed since the previous call"""
+        limits = self.limits
+        if limits is None:
+            return []
+        events = []
+
+        def event(kind: str, message: str, **metadata):
+            events.append({"kind": kind, "pid": pid, "message": message, **metadata})
+
+        if limits.cgroup:
+            counters = read_cgroup_counters(limits.cgroup)
+            deltas = {k: counters.get(k, 0) - self._marks.get(k, 0) for k in ("oom_kill", "max", "nr_throttled")}
+            self._marks = counters
+            if deltas["oom_kill"] > 0:
+                event(
+                    "memory",
+                    f"Replica pid={pid} OOM-killed at memory_limit={limits.memory_limit}MB",
+                    oom_kills=deltas["oom_kill"],
+                )
+            elif deltas["max"] > 0:
+                event(
+                    "memory",
+                    f"Replica pid={pid} reached memory_limit={limits.memory_limit}MB "
+                    f"{deltas['max']} time(s)",
+                    memory_max_events=deltas["max"],
+                )
+            if deltas["nr_throttled"] > 0:
+                event(
+                    "cpu",
+                    f"Replica pid={pid} throttled in {deltas['nr_throttled']} period(s) "
+                    f"at cpu_limit={limits.cpu_limit}",
+                    throttled_periods=deltas["nr_throttled"],
+                )
+        elif self.cpu_cores is not None and limits.cpu_limit:
+            # Without cgroups a fractional CPU share cannot be enforced; report overuse
+            over = self.cpu_cores > limits.cpu_limit * CPU_OVERUSE_MARGIN
+            if over and not self._over_cpu:
+                event(
+                    "cpu",
+                    f"Replica pid={pid} using {self.cpu_cores:.2f} cores, "
+                    f"above cpu_limit={limits.cpu_limit}",
+                    cpu_cores=round(self.cpu_cores, 3),
+                )
+            self._over_cpu = over
+
+        new_errors = self.memory_errors - self._reported_memory_errors
+        if new_errors > 0:
+            self._reported_memory_errors = self.memory_errors
+            event(
+                "memory",
+                f"Replica pid={pid}: {new_errors} prediction(s) failed under "
+                f"memory_limit={limits.memory_limit}MB",
+                memory_errors=new_errors,
+            )
+
+        if returncode == -signal.SIGKILL and not self._exit_reported and not limits.cgroup:
+            self._exit_reported = True
+            event("memory", f"Replica pid={pid} was killed (SIGKILL), likely out of memory")
+        return events
@@ -0,0 +1,843 @@
+"""
+manager.py — Process-wide registry of local deployment replicas.
+
+RuntimeManager keeps one DeploymentRuntime per running deployment. A
+runtime starts ``min_replicas`` worker processes (see worker.py) that
+preload the pinned model version and listen on Unix domain sockets;
+the /deployments/{id}/predict route proxies to them over pooled
+keep-alive connections, so each deployment gets isolated, warm capacity.
+With RUNTIME_USE_ZYGOTE, replicas are forked from a per-version zygote
+(see zygote.py) instead of starting a fresh interpreter each time.
+
+Serverless runtimes start with no replicas: the first request triggers a
+cold start while it and any followers wait in a bounded buffer, and the
+autoscaler releases the replicas again after an idle timeout.
+
+The registry lives in one API process: replica counts, max_replicas and
+the CPU/memory budgets (limits.py) are only enforced within it. So a
+single API worker serves local replicas per RUNTIME_SOCKET_DIR; at startup
+it takes an exclusive lock there (``claim_host``), and a second worker
+started against the same directory (uvicorn --workers N > 1) fails to
+start instead of running its own copy of every deployment.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.deployment import DeploymentType
+from app.runtime.limits import LimitMonitor, ResourceLimits, build_limits, release_limits
+from app.runtime.zygote import ZygoteError, zygote_pool
+from app.utils.storage import artifact_path
+
+logger = logging.getLogger(__name__)
+
+# Directory containing the ``app`` package, so replicas can import it
+BACKEND_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+class ReplicaStartError(Exception):
+    """Raised when a replica process fails to become ready"""
+
+
+class Replica:
+    """A single worker process plus the pooled client used to reach it"""
+
+    def __init__(
+        self,
+        deployment_id: int,
+        model_version_id: int,
+        socket_path: str,
+        process: subprocess.Popen,  # or a zygote's ForkedProcess
+        limits: Optional[ResourceLimits] = None,
+    ):
+        self.deployment_id = deployment_id
+        self.model_version_id = model_version_id
+        self.socket_path = socket_path
+        self.process = process
+        self.limits = limits
+        self.monitor = LimitMonitor(limits)
+        self.started_at = time.time()
+        self.outstanding = 0  # requests proxied to this replica and not yet answered
+        self.requests = 0
+        self.errors = 0
+        self.hedged = 0  # duplicate requests sent here by hedging
+        self.hedge_wins = 0  # hedged duplicates that answered first
+        self.ewma_latency: Optional[float] = None  # seconds
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Keep-alive client bound to the replica socket, created on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                # Plain HTTP over a Unix socket: skip loading the CA bundle,
+                # which otherwise dominates a fresh replica's first request
+                transport=httpx.AsyncHTTPTransport(uds=self.socket_path, verify=False),
+                base_url="http://replica",
+                timeout=settings.MAX_INFERENCE_TIME,
+                limits=httpx.Limits(
+                    max_connections=settings.RUNTIME_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.RUNTIME_MAX_CONNECTIONS,
+                ),
+            )
+            self._client_loop = asyncio.get_running_loop()
+        return self._client
+
+    def record_latency(self, seconds: float):
+        alpha = settings.RUNTIME_EWMA_ALPHA
+        if self.ewma_latency is None:
+            self.ewma_latency = seconds
+        else:
+            self.ewma_latency = alpha * seconds + (1 - alpha) * self.ewma_latency
+
+    async def post(self, path: str, payload: Dict[str, Any]) -> httpx.Response:
+        return await self.client.post(path, json=payload)
+
+    def stop(self, timeout: float = 5.0):
+        """Terminate the process and release pooled connections"""
+        if self._client is not None and self._client_loop is not None:
+            client, loop = self._client, self._client_loop
+            self._client = None
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(lambda: loop.create_task(client.aclose()))
+
+        if self.is_alive():
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        release_limits(self.limits)
+        self.limits = None
+
+    def limit_events(self) -> List[Dict[str, Any]]:
+        return self.monitor.events(self.pid, self.process.poll())
+
+
+class DeploymentRuntime:
+    """Replica set serving one deployment's pinned model version"""
+
+    def __init__(
+        self,
+        deployment_id: int,
+        model_version_id: int,
+        model_path: str,
+        model_format: str,
+        environment_vars: Optional[Dict[str, str]] = None,
+        hedge_requests: bool = False,
+        version: Optional[str] = None,
+        artifact_key: Optional[str] = None,
+    ):
+        self.deployment_id = deployment_id
+        self.model_version_id = model_version_id
+        self.version = version
+        self.model_path = model_path
+        self.artifact_key = artifact_key  # storage key model_path was fetched from
+        self.model_format = model_format
+        self.environment_vars = environment_vars or {}
+        self.hedge_requests = hedge_requests
+        self.cpu_limit: Optional[float] = None
+        self.memory_limit: Optional[int] = None
+        self.replicas: List[Replica] = []
+        self._limit_events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=settings.RUNTIME_LATENCY_WINDOW)
+        self.warmup_input: Any = None
+
+        # Scale-to-zero (serverless) state
+        self.scale_to_zero = False
+        self.idle_timeout = settings.SERVERLESS_IDLE_TIMEOUT
+        self.last_request_at = time.monotonic()
+        self.cold_starts = deque(maxlen=100)  # recent cold-start durations, seconds
+        self._cold_start: Optional[asyncio.Future] = None
+        self._buffered = 0
+
+    def configure(self, deployment):
+        """Apply routing options from the deployment's deployment_config"""
+        config = deployment.deployment_config or {}
+        self.hedge_requests = bool(
+            config.get("hedge_requests", settings.RUNTIME_HEDGE_REQUESTS)
+        )
+        self.warmup_input = config.get("warmup_input")
+        self.scale_to_zero = deployment.deployment_type == DeploymentType.SERVERLESS
+        self.idle_timeout = config.get("idle_timeout", settings.SERVERLESS_IDLE_TIMEOUT)
+        # Applies to replicas started from now on
+        self.cpu_limit = deployment.cpu_limit
+        self.memory_limit = deployment.memory_limit
+
+    def spawn_replica(self) -> Replica:
+        """Start one worker process and block until its model is loaded"""
+        os.makedirs(settings.RUNTIME_SOCKET_DIR, exist_ok=True)
+        if self.artifact_key and not os.path.exists(self.model_path):
+            # Evicted from the artifact cache (or archived) since the runtime was built
+            try:
+                self.model_path = os.path.abspath(artifact_path(self.artifact_key))
+            except FileNotFoundError:
+                raise ReplicaStartError("Model file not found on server")
+        name = f"d{self.deployment_id}-{uuid.uuid4().hex[:12]}"
+        socket_path = os.path.join(settings.RUNTIME_SOCKET_DIR, f"{name}.sock")
+        limits = build_limits(name, self.cpu_limit, self.memory_limit)
+
+        process = None
+        try:
+            if settings.RUNTIME_USE_ZYGOTE:
+                try:
+                    process = zygote_pool.fork_replica(self, socket_path, limits)
+                except ZygoteError as e:
+                    logger.warning(
+                        f"Deployment {self.deployment_id}: zygote unavailable, "
+                        f"spawning a cold replica: {e}"
+                    )
+            if process is None:
+                process = self._spawn_process(socket_path, limits)
+        except OSError:
+            release_limits(limits)
+            raise
+        replica = Replica(
+            self.deployment_id, self.model_version_id, socket_path, process, limits
+        )
+
+        deadline = time.monotonic() + settings.RUNTIME_STARTUP_TIMEOUT
+        while not os.path.exists(socket_path):
+            if not replica.is_alive():
+                replica.stop()
+                raise ReplicaStartError(
+                    f"Replica exited during startup (code {process.poll()})"
+                )
+            if time.monotonic() > deadline:
+                replica.stop()
+                raise ReplicaStartError(
+                    f"Replica not ready after {settings.RUNTIME_STARTUP_TIMEOUT}s"
+                )
+            time.sleep(0.01)
+
+        logger.info(
+            f"Deployment {self.deployment_id}: replica pid={replica.pid} ready "
+            f"in {time.time() - replica.started_at:.2f}s"
+        )
+        return replica
+
+    def _spawn_process(
+        self, socket_path: str, limits: Optional[ResourceLimits] = None
+    ) -> subprocess.Popen:
+        """Cold path: a fresh interpreter that imports and loads everything itself"""
+        env = {**os.environ, **self.environment_vars}
+        if limits:
+            # Thread pools read these at import time, before the replica applies limits
+            env.update(limits.thread_env())
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (BACKEND_ROOT, env.get("PYTHONPATH")) if p
+        )
+        command = [
+            sys.executable,
+            "-m",
+            "app.runtime.worker",
+            "--socket",
+            socket_path,
+            "--model-path",
+            self.model_path,
+            "--format",
+            self.model_format,
+            "--model-version-id",
+            str(self.model_version_id),
+            "--parent-pid",
+            str(os.getpid()),
+        ]
+        if self.warmup_input is not None:
+            # Replica runs one prediction before exposing its socket
+            command += ["--warmup-input", json.dumps(self.warmup_input)]
+        if limits:
+            command += ["--limits", json.dumps(limits.to_dict())]
+        return subprocess.Popen(command, env=env)
+
+    def start(self, replicas: int):
+        """Bring the replica set up to ``replicas`` live processes"""
+        with self._lock:
+            self._prune()
+            while len(self.replicas) < replicas:
+                self.replicas.append(self.spawn_replica())
+
+    def _prune(self):
+        """Drop replicas that exited on their own, keeping their limit events"""
+        for replica in [r for r in self.replicas if not r.is_alive()]:
+            self._limit_events.extend(replica.limit_events())
+            self.replicas.remove(replica)
+            replica.stop()
+
+    def check_limits(self) -> List[Dict[str, Any]]:
+        """Limit violations across the replica set since the previous check"""
+        events, self._limit_events = self._limit_events, []
+        for replica in list(self.replicas):
+            events.extend(replica.limit_events())
+        return events
+
+    def scale_to(self, replicas: int) -> int:
+        """Add or retire replicas until ``replicas`` are live; returns the new count"""
+        retiring = []
+        with self._lock:
+            self._prune()
+            while len(self.replicas) < replicas:
+                self.replicas.append(self.spawn_replica())
+            while len(self.replicas) > replicas:
+                # Retire the least busy (and, on ties, youngest) replica
+                victim = min(self.replicas, key=lambda r: (r.outstanding, -r.started_at))
+                self.replicas.remove(victim)
+                retiring.append(victim)
+            count = len(self.replicas)
+
+        for replica in retiring:
+            self._retire(replica)
+        return count
+
+    def _retire(self, replica: Replica):
+        """Stop a replica that has left rotation once its in-flight requests finish"""
+
+        def drain():
+            deadline = time.monotonic() + settings.MAX_INFERENCE_TIME
+            while replica.outstanding and time.monotonic() < deadline:
+                time.sleep(0.05)
+            replica.stop()
+
+        threading.Thread(target=drain, daemon=True).start()
+
+    def warm_up(self, warmup_input: Any = None, requests: int = 0):
+        """
+        Health-check every replica and, given a sample input, run warm-up
+        predictions so lazy initialisation happens before real traffic.
+        """
+        live = self.live_replicas()
+        if not live:
+            raise ReplicaStartError("No live replicas to warm up")
+
+        for replica in live:
+            try:
+                with httpx.Client(
+                    transport=httpx.HTTPTransport(uds=replica.socket_path, verify=False),
+                    base_url="http://replica",
+                    timeout=settings.MAX_INFERENCE_TIME,
+                ) as client:
+                    health = client.get("/health")
+                    if (
+                        health.status_code != 200
+                        or health.json().get("model_version_id") != self.model_version_id
+                    ):
+                        raise ReplicaStartError(
+                            f"Replica pid={replica.pid} failed its health check"
+                        )
+                    if warmup_input is None:
+                        continue
+                    for _ in range(requests):
+                        response = client.post("/predict", json={"input": warmup_input})
+                        if response.status_code != 200:
+                            raise ReplicaStartError(
+                                "Warm-up prediction failed: "
+                                f"{response.json().get('detail', response.status_code)}"
+                            )
+            except httpx.TransportError as e:
+                raise ReplicaStartError(f"Replica pid={replica.pid} unreachable: {e}")
+
+    def error_rate(self) -> float:
+        """Fraction of proxied requests that failed, across live replicas"""
+        live = self.live_replicas()
+        requests = sum(r.requests + r.errors for r in live)
+        return sum(r.errors for r in live) / requests if requests else 0.0
+
+    def stop(self):
+        with self._lock:
+            replicas, self.replicas = self.replicas, []
+        for replica in replicas:
+            replica.stop()
+
+    def live_replicas(self) -> List[Replica]:
+        return [r for r in self.replicas if r.is_alive()]
+
+    def queue_depth(self) -> int:
+        """Requests currently outstanding across all replicas"""
+        return sum(r.outstanding for r in self.replicas)
+
+    def pick_replica(self, exclude: Optional[Replica] = None) -> Replica:
+        """
+        Least-outstanding-requests routing weighted by EWMA latency: the
+        replica with the lowest (outstanding + 1) * ewma_latency wins, so a
+        slow replica receives proportionally less traffic.
+        """
+        live = [r for r in self.live_replicas() if r is not exclude]
+        if not live:
+            raise HTTPException(
+                status_code=503, detail="No live replicas for this deployment"
+            )
+        # Replicas without latency history borrow the fleet average so new
+        # ones are neither starved nor flooded.
+        known = [r.ewma_latency for r in live if r.ewma_latency is not None]
+        default = sum(known) / len(known) if known else 1.0
+        random.shuffle(live)
+        return min(
+            live,
+            key=lambda r: (r.outstanding + 1)
+            * (r.ewma_latency if r.ewma_latency is not None else default),
+        )
+
+    def hedge_delay(self) -> Optional[float]:
+        """p95 of recent latencies, or None until enough have been observed"""
+        if len(self._latencies) < settings.RUNTIME_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    async def _send(self, replica: Replica, payload: Dict[str, Any]) -> httpx.Response:
+        """POST /predict to one replica, keeping its routing stats current"""
+        replica.outstanding += 1
+        started = time.monotonic()
+        try:
+            response = await replica.post("/predict", payload)
+        except httpx.TransportError:
+            replica.errors += 1
+            if replica.ewma_latency is not None:
+                replica.ewma_latency *= 2  # back off from a failing replica
+            raise
+        finally:
+            replica.outstanding -= 1
+
+        elapsed = time.monotonic() - started
+        if response.status_code >= 500:
+            replica.errors += 1
+            if response.status_code == 507:
+                replica.monitor.memory_errors += 1
+            return response
+        replica.requests += 1
+        replica.record_latency(elapsed)
+        self._latencies.append(elapsed)
+        return response
+
+    async def _send_hedged(self, replica: Replica, payload: Dict[str, Any]) -> httpx.Response:
+        """
+        Send to ``replica`` and, if it has not answered within the p95-derived
+        delay, duplicate the request to the next best replica; the first
+        successful response wins and the slower one is cancelled.
+        """
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(self._send(replica, payload))
+        if delay is None or len(self.live_replicas()) < 2:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        backup_replica = self.pick_replica(exclude=replica)
+        backup_replica.hedged += 1
+        backup = asyncio.ensure_future(self._send(backup_replica, payload))
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            backup_replica.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def ensure_warm(self):
+        """
+        Cold-start a scaled-to-zero runtime. Only one cold start runs at a
+        time; concurrent callers wait for it, up to
+        SERVERLESS_MAX_BUFFERED_REQUESTS, beyond which they get a 503.
+        """
+        if self.live_replicas():
+            return
+        if self._buffered >= settings.SERVERLESS_MAX_BUFFERED_REQUESTS:
+            raise HTTPException(
+                status_code=503, detail="Cold start in progress and request buffer is full"
+            )
+
+        self._buffered += 1
+        try:
+            if self._cold_start is None:
+                self._cold_start = asyncio.ensure_future(self._run_cold_start())
+            # Shielded so a disconnecting client does not cancel the shared start
+            await asyncio.shield(self._cold_start)
+        except ReplicaStartError as e:
+            raise HTTPException(status_code=503, detail=f"Cold start failed: {e}")
+        finally:
+            self._buffered -= 1
+
+    async def _run_cold_start(self):
+        started = time.monotonic()
+        try:
+            await run_in_threadpool(self.scale_to, 1)
+        finally:
+            self._cold_start = None
+        duration = time.monotonic() - started
+        self.cold_starts.append(duration)
+        logger.info(
+            f"Deployment {self.deployment_id}: cold start took {duration * 1000:.0f}ms "
+            f"({self._buffered} request(s) buffered)"
+        )
+
+    def is_idle(self) -> bool:
+        """True when a scale-to-zero runtime has been unused past its idle timeout"""
+        return (
+            self.scale_to_zero
+            and self._cold_start is None
+            and self.queue_depth() == 0
+            and time.monotonic() - self.last_request_at > self.idle_timeout
+        )
+
+    def cold_start_stats(self) -> Dict[str, Any]:
+        durations = list(self.cold_starts)
+        return {
+            "cold_starts": len(durations),
+            "last_cold_start_ms": durations[-1] * 1000.0 if durations else None,
+            "avg_cold_start_ms": (
+                sum(durations) / len(durations) * 1000.0 if durations else None
+            ),
+        }
+
+    async def predict(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Proxy a prediction to a replica, retrying once on connection failure"""
+        self.last_request_at = time.monotonic()
+        if self.scale_to_zero:
+            await self.ensure_warm()
+
+        last_error: Optional[Exception] = None
+        for _ in range(2):
+            replica = self.pick_replica()
+            try:
+                if self.hedge_requests:
+                    response = await self._send_hedged(replica, payload)
+                else:
+                    response = await self._send(replica, payload)
+            except httpx.TransportError as e:
+                last_error = e
+                logger.warning(
+                    f"Deployment {self.deployment_id}: replica pid={replica.pid} "
+                    f"unreachable: {e}"
+                )
+                continue
+
+            body = response.json()
+            if response.status_code != 200:
+                raise HTTPException(
+                    # 507 marks a replica memory-limit failure; clients see 503
+                    status_code=503 if response.status_code == 507 else response.status_code,
+                    detail=body.get("detail", "Prediction failed"),
+                )
+            return body
+
+        raise HTTPException(
+            status_code=503, detail=f"Deployment replicas unavailable: {last_error}"
+        )
+
+    def routing_stats(self) -> List[Dict[str, Any]]:
+        """Per-replica routing counters for the metrics endpoint"""
+        return [
+            {
+                "pid": r.pid,
+                "model_version_id": r.model_version_id,
+                "outstanding": r.outstanding,
+                "requests": r.requests,
+                "errors": r.errors,
+                "ewma_latency_ms": (
+                    r.ewma_latency * 1000.0 if r.ewma_latency is not None else None
+                ),
+                "hedged": r.hedged,
+                "hedge_wins": r.hedge_wins,
+            }
+            for r in self.live_replicas()
+        ]
+
+
+class RuntimeManager:
+    """
+    Registry of deployment runtimes shared by the whole API process.
+
+    Besides the active runtime, a deployment may have a rollout candidate
+    receiving a weighted share of traffic, a shadow runtime receiving
+    mirrored copies of requests, and the previously active runtime kept
+    resident for the rollback window.
+    """
+
+    def __init__(self):
+        self._runtimes: Dict[int, DeploymentRuntime] = {}
+        self._candidates: Dict[int, DeploymentRuntime] = {}
+        self._candidate_weights: Dict[int, float] = {}
+        self._previous: Dict[int, DeploymentRuntime] = {}
+        self._shadows: Dict[int, DeploymentRuntime] = {}
+        self._lock = threading.Lock()
+        self._host_lock = None  # open file holding the RUNTIME_SOCKET_DIR lock
+
+    def claim_host(self):
+        """
+        Become the only process serving local replicas from RUNTIME_SOCKET_DIR.
+
+        Raises RuntimeError when another API process already holds the lock.
+        """
+        if self._host_lock is not None:
+            return
+        os.makedirs(settings.RUNTIME_SOCKET_DIR, exist_ok=True)
+        lock_file = open(os.path.join(settings.RUNTIME_SOCKET_DIR, "manager.lock"), "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.seek(0)
+            owner = lock_file.read().strip() or "unknown"
+            lock_file.close()
+            raise RuntimeError(
+                f"Local replicas in {settings.RUNTIME_SOCKET_DIR} are already served by "
+                f"API process {owner}; run a single API worker per runtime directory "
+                f"(uvicorn --workers 1)"
+            )
+        lock_file.truncate(0)
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._host_lock = lock_file
+
+    def get(self, deployment_id: int) -> Optional[DeploymentRuntime]:
+        return self._runtimes.get(deployment_id)
+
+    def deployment_ids(self) -> List[int]:
+        return list(self._runtimes)
+
+    def route(self, deployment_id: int) -> Optional[DeploymentRuntime]:
+        """Runtime that should serve the next request (active or candidate)"""
+        candidate = self._candidates.get(deployment_id)
+        if candidate and candidate.live_replicas():
+            if random.random() < self._candidate_weights.get(deployment_id, 0.0):
+                return candidate
+        return self._runtimes.get(deployment_id)
+
+    def _build_runtime(self, deployment, model_version) -> DeploymentRuntime:
+        try:
+            # Fetched into the local cache (remote storage) or promoted (archived) first
+            model_path = os.path.abspath(artifact_path(model_version.s3_path))
+        except FileNotFoundError:
+            raise ReplicaStartError("Model file not found on server")
+
+        runtime = DeploymentRuntime(
+            deployment_id=deployment.id,
+            model_version_id=model_version.id,
+            model_path=model_path,
+            model_format=model_version.format,
+            environment_vars=deployment.environment_vars,
+            version=model_version.version,
+            artifact_key=model_version.s3_path,
+        )
+        runtime.configure(deployment)
+        return runtime
+
+    def start(self, deployment, model_version) -> DeploymentRuntime:
+        """
+        Start (or reuse) the runtime for a deployment and wait until
+        ``min_replicas`` replicas have preloaded the pinned model version.
+        """
+        new_runtime = self._build_runtime(deployment, model_version)
+
+        replaced = False
+        with self._lock:
+            runtime = self._runtimes.get(deployment.id)
+            if runtime and runtime.model_version_id != model_version.id:
+                self._runtimes.pop(deployment.id)
+                runtime.stop()
+                runtime, replaced = None, True
+            if runtime is None:
+                runtime = new_runtime
+                self._runtimes[deployment.id] = runtime
+            runtime.configure(deployment)
+        if replaced:
+            self._release_zygotes()
+
+        try:
+            # Scale-to-zero runtimes stay empty until their first request
+            runtime.start(0 if runtime.scale_to_zero else max(deployment.min_replicas or 1, 1))
+        except ReplicaStartError:
+            self.stop(deployment.id)
+            raise
+        return runtime
+
+    def prepare_candidate(
+        self, deployment, model_version, replicas: int
+    ) -> DeploymentRuntime:
+        """Start a rollout candidate alongside the active runtime, with no traffic"""
+        candidate = self._build_runtime(deployment, model_version)
+        with self._lock:
+            if deployment.id in self._candidates:
+                raise ReplicaStartError("A rollout is already in progress")
+            self._candidates[deployment.id] = candidate
+            self._candidate_weights[deployment.id] = 0.0
+
+        try:
+            candidate.start(replicas)
+        except ReplicaStartError:
+            self.abort_candidate(deployment.id)
+            raise
+        return candidate
+
+    def candidate(self, deployment_id: int) -> Optional[DeploymentRuntime]:
+        return self._candidates.get(deployment_id)
+
+    def set_candidate_weight(self, deployment_id: int, weight: float):
+        self._candidate_weights[deployment_id] = min(max(weight, 0.0), 1.0)
+
+    def abort_candidate(self, deployment_id: int):
+        with self._lock:
+            candidate = self._candidates.pop(deployment_id, None)
+            self._candidate_weights.pop(deployment_id, None)
+        if candidate:
+            candidate.stop()
+            self._release_zygotes()
+
+    def start_shadow(self, deployment, model_version, replicas: int) -> DeploymentRuntime:
+        """Start a runtime that only receives mirrored traffic (see shadow.py)"""
+        shadow = self._build_runtime(deployment, model_version)
+        with self._lock:
+            if deployment.id in self._shadows:
+                raise ReplicaStartError("Shadow traffic is already running")
+            self._shadows[deployment.id] = shadow
+
+        try:
+            shadow.start(replicas)
+        except ReplicaStartError:
+            self.stop_shadow(deployment.id)
+            raise
+        return shadow
+
+    def shadow(self, deployment_id: int) -> Optional[DeploymentRuntime]:
+        return self._shadows.get(deployment_id)
+
+    def stop_shadow(self, deployment_id: int):
+        with self._lock:
+            shadow = self._shadows.pop(deployment_id, None)
+        if shadow:
+            shadow.stop()
+            self._release_zygotes()
+
+    def promote(self, deployment_id: int, rollback_window: float) -> bool:
+        """
+        Atomically make the candidate the active runtime. The replaced
+        runtime stays resident for ``rollback_window`` seconds.
+        """
+        with self._lock:
+            candidate = self._candidates.pop(deployment_id, None)
+            self._candidate_weights.pop(deployment_id, None)
+            if candidate is None or deployment_id not in self._runtimes:
+                return False
+            previous = self._runtimes[deployment_id]
+            self._runtimes[deployment_id] = candidate
+            expired = self._previous.pop(deployment_id, None)
+            self._previous[deployment_id] = previous
+
+        if expired:
+            expired.stop()
+            self._release_zygotes()
+        timer = threading.Timer(
+            rollback_window, self._expire_previous, args=(deployment_id, previous)
+        )
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def previous(self, deployment_id: int) -> Optional[DeploymentRuntime]:
+        return self._previous.get(deployment_id)
+
+    def rollback(self, deployment_id: int) -> Optional[DeploymentRuntime]:
+        """Swap the resident previous runtime back in; returns it, or None"""
+        with self._lock:
+            previous = self._previous.get(deployment_id)
+            if previous is None or not previous.live_replicas():
+                return None
+            self._previous.pop(deployment_id)
+            current = self._runtimes.get(deployment_id)
+            self._runtimes[deployment_id] = previous
+
+        if current:
+            current.stop()
+            self._release_zygotes()
+        return previous
+
+    def _expire_previous(self, deployment_id: int, runtime: DeploymentRuntime):
+        with self._lock:
+            if self._previous.get(deployment_id) is not runtime:
+                return
+            self._previous.pop(deployment_id)
+        runtime.stop()
+        self._release_zygotes()
+        logger.info(
+            f"Deployment {deployment_id}: rollback window for model version "
+            f"{runtime.model_version_id} expired"
+        )
+
+    def stop(self, deployment_id: int):
+        with self._lock:
+            runtimes = [
+                self._runtimes.pop(deployment_id, None),
+                self._candidates.pop(deployment_id, None),
+                self._previous.pop(deployment_id, None),
+                self._shadows.pop(deployment_id, None),
+            ]
+            self._candidate_weights.pop(deployment_id, None)
+        for runtime in runtimes:
+            if runtime:
+                runtime.stop()
+        self._release_zygotes()
+
+    def _release_zygotes(self):
+        """Stop zygotes whose model version no runtime serves any more"""
+        with self._lock:
+            runtimes = [
+                *self._runtimes.values(),
+                *self._candidates.values(),
+                *self._previous.values(),
+                *self._shadows.values(),
+            ]
+        zygote_pool.release(r.model_version_id for r in runtimes)
+
+    def shutdown(self):
+        """Stop every replica (called on API shutdown)"""
+        for deployment_id in (
+            set(self._runtimes) | set(self._candidates) | set(self._previous) | set(self._shadows)
+        ):
+            self.stop(deployment_id)
+        zygote_pool.shutdown()
+        if self._host_lock is not None:
+            self._host_lock.close()  # releases the flock
+            self._host_lock = None
+
+
+runtime_manager = RuntimeManager()
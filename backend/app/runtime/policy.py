@@ -0,0 +1,134 @@
+"""
+policy.py — Replica scaling decisions, free of I/O.
+
+A deployment scales up when replica CPU (relative to ``cpu_limit``) is
+above ``scale_up_threshold`` or requests queue up beyond the target
+depth, and scales down one replica at a time once CPU is below
+``scale_down_threshold`` with a near-empty queue. Both directions need
+several consecutive samples (hysteresis) and respect a cooldown.
+
+The live autoscaler and the offline simulator share this module.
+"""
+import math
+from typing import Optional
+
+from app.core.config import settings
+
+
+class ScalingSample:
+    """One observation of a replica set"""
+
+    def __init__(
+        self, replicas: int, cpu_percent: Optional[float], queue_depth: float
+    ):
+        self.replicas = replicas
+        self.cpu_percent = cpu_percent  # mean per replica, % of cpu_limit
+        self.queue_depth = queue_depth  # outstanding requests across replicas
+
+
+class ScalingDecision:
+    def __init__(self, replicas: int, reason: str):
+        self.replicas = replicas
+        self.reason = reason
+
+
+class ScalerState:
+    """Hysteresis counters and cooldown clocks for one deployment"""
+
+    def __init__(self):
+        self.high_streak = 0
+        self.low_streak = 0
+        self.last_scale_up = -math.inf
+        self.last_scale_down = -math.inf
+
+
+class ScalingPolicy:
+    def __init__(
+        self,
+        min_replicas: int,
+        max_replicas: int,
+        scale_up_threshold: float,
+        scale_down_threshold: float,
+        enabled: bool = True,
+        target_queue_depth: float = settings.AUTOSCALE_TARGET_QUEUE_DEPTH,
+        up_samples: int = settings.AUTOSCALE_UP_SAMPLES,
+        down_samples: int = settings.AUTOSCALE_DOWN_SAMPLES,
+        up_cooldown: float = settings.AUTOSCALE_UP_COOLDOWN,
+        down_cooldown: float = settings.AUTOSCALE_DOWN_COOLDOWN,
+    ):
+        self.min_replicas = max(min_replicas, 1)
+        self.max_replicas = max(max_replicas, self.min_replicas)
+        self.scale_up_threshold = scale_up_threshold
+        self.scale_down_threshold = scale_down_threshold
+        self.enabled = enabled
+        self.target_queue_depth = target_queue_depth
+        self.up_samples = up_samples
+        self.down_samples = down_samples
+        self.up_cooldown = up_cooldown
+        self.down_cooldown = down_cooldown
+
+    @classmethod
+    def from_deployment(cls, deployment) -> "ScalingPolicy":
+        """Build the policy from a ModelDeployment's scaling columns"""
+        return cls(
+            min_replicas=deployment.min_replicas or 1,
+            max_replicas=deployment.max_replicas or 1,
+            scale_up_threshold=deployment.scale_up_threshold,
+            scale_down_threshold=deployment.scale_down_threshold,
+            enabled=bool(deployment.auto_scale_enabled),
+        )
+
+    def decide(
+        self, state: ScalerState, sample: ScalingSample, now: float
+    ) -> Optional[ScalingDecision]:
+        """Return a new replica count, or None to hold"""
+        replicas = sample.replicas
+        if replicas < self.min_replicas:
+            return ScalingDecision(self.min_replicas, "below min_replicas")
+        if replicas > self.max_replicas:
+            return ScalingDecision(self.max_replicas, "above max_replicas")
+        if not self.enabled:
+            return None
+
+        cpu = sample.cpu_percent
+        queue = sample.queue_depth / max(replicas, 1)
+        high = queue >= self.target_queue_depth or (
+            cpu is not None and cpu >= self.scale_up_threshold
+        )
+        # The gap between the up and down conditions is the hysteresis band
+        low = (
+            cpu is not None
+            and cpu <= self.scale_down_threshold
+            and queue <= self.target_queue_depth / 2
+        )
+        state.high_streak = state.high_streak + 1 if high else 0
+        state.low_streak = state.low_streak + 1 if low else 0
+        observed = f"cpu {cpu:.0f}%" if cpu is not None else "cpu n/a"
+        observed += f", queue {queue:.1f}/replica"
+
+        if high and state.high_streak >= self.up_samples:
+            if replicas >= self.max_replicas:
+                return None
+            if now - state.last_scale_up < self.up_cooldown:
+                return None
+            pressure = queue / self.target_queue_depth
+            if cpu is not None and self.scale_up_threshold > 0:
+                pressure = max(pressure, cpu / self.scale_up_threshold)
+            desired = min(
+                max(replicas + 1, math.ceil(replicas * pressure)), self.max_replicas
+            )
+            state.last_scale_up = now
+            state.high_streak = 0
+            return ScalingDecision(desired, f"load above threshold ({observed})")
+
+        if low and state.low_streak >= self.down_samples:
+            if replicas <= self.min_replicas:
+                return None
+            last_change = max(state.last_scale_up, state.last_scale_down)
+            if now - last_change < self.down_cooldown:
+                return None
+            state.last_scale_down = now
+            state.low_streak = 0
+            return ScalingDecision(replicas - 1, f"load below threshold ({observed})")
+
+        return None
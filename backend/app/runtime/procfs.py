@@ -0,0 +1,56 @@
+"""
+procfs.py — Per-process resource readings from /proc (Linux only).
+
+Readers return None when the process is gone or /proc is unavailable,
+so callers can treat missing samples as "no data" rather than errors.
+"""
+import os
+from typing import Dict, Optional
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def read_cpu_seconds(pid: int) -> Optional[float]:
+    """User + system CPU time consumed by a process, in seconds"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces; fields resume after its ')'
+    fields = stat[stat.rindex(b")") + 2 :].split()
+    utime, stime = int(fields[11]), int(fields[12])
+    return (utime + stime) / CLOCK_TICKS
+
+
+def read_rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process, in bytes"""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def read_memory_breakdown(pid: int) -> Optional[Dict[str, int]]:
+    """
+    RSS, PSS and USS of a process, in bytes. PSS splits shared pages
+    between the processes mapping them, so it shows what copy-on-write
+    sharing (e.g. zygote-forked replicas) actually saves.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "rb") as f:
+            for line in f:
+                name, _, value = line.partition(b":")
+                parts = value.split()
+                if parts and parts[-1] == b"kB":
+                    fields[name.decode()] = int(parts[0]) * 1024
+    except (OSError, ValueError):
+        return None
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
@@ -0,0 +1,282 @@
+"""
+simulator.py — Offline replay of traffic traces against ScalingPolicy.
+
+Replays a recorded request-rate trace through a discrete-event model of
+a deployment's replica set, driving the same ScalingPolicy the live
+autoscaler uses, and reports cost and latency for each threshold pair:
+
+  replica_seconds   : replica lifetime billed (including startup and drain)
+  p50_ms / p99_ms   : end-to-end latency (queueing + service)
+  slo_violations    : requests slower than --slo-ms
+
+Traces may be a locust ``*_stats_history.csv`` export (the "Aggregated"
+rows' Requests/s column) or a request log with one timestamp per line
+(epoch seconds or ISO 8601, optionally as the first CSV column).
+
+Usage:
+    python -m app.runtime.simulator trace.csv --median-ms 15 --p99-ms 60 \\
+        --up 60,70,80 --down 20,30 --slo-ms 200
+"""
+import argparse
+import bisect
+import csv
+import itertools
+import json
+import math
+import random
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from app.core.config import settings
+from app.runtime.policy import ScalerState, ScalingPolicy, ScalingSample
+
+
+class LatencyModel:
+    """Per-model service-time distribution, in seconds"""
+
+    def __init__(
+        self,
+        median_ms: float = 20.0,
+        p99_ms: Optional[float] = None,
+        samples_ms: Optional[Sequence[float]] = None,
+    ):
+        self.samples = sorted(s / 1000.0 for s in samples_ms) if samples_ms else None
+        self.mu = math.log(median_ms / 1000.0)
+        # Lognormal spread fitted so the 99th percentile lands on p99_ms
+        self.sigma = math.log(p99_ms / median_ms) / 2.326 if p99_ms else 0.0
+
+    @classmethod
+    def from_file(cls, path: str) -> "LatencyModel":
+        """Empirical model from a file with one latency (ms) per line"""
+        with open(path) as f:
+            samples = [float(line) for line in f if line.strip()]
+        return cls(samples_ms=samples)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.samples:
+            return self.samples[rng.randrange(len(self.samples))]
+        return math.exp(rng.gauss(self.mu, self.sigma))
+
+
+def _parse_timestamp(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def load_trace(path: str) -> List[float]:
+    """Return per-second request rates from a locust history or request log"""
+    with open(path, newline="") as f:
+        first = f.readline()
+        f.seek(0)
+        if "Requests/s" in first:
+            rates = {}
+            for row in csv.DictReader(f):
+                if row.get("Name", "Aggregated") == "Aggregated":
+                    rates[int(float(row["Timestamp"]))] = float(row["Requests/s"] or 0)
+            if not rates:
+                return []
+            start = min(rates)
+            # Locust samples every few seconds; hold each rate until the next row
+            trace, rate = [], 0.0
+            for second in range(start, max(rates) + 1):
+                rate = rates.get(second, rate)
+                trace.append(rate)
+            return trace
+
+        counts = Counter()
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            try:
+                counts[int(_parse_timestamp(row[0].strip()))] += 1
+            except ValueError:
+                continue  # header or malformed line
+        if not counts:
+            return []
+        start = min(counts)
+        return [float(counts.get(s, 0)) for s in range(start, max(counts) + 1)]
+
+
+class _SimReplica:
+    def __init__(self, started_at: float, ready_at: float):
+        self.started_at = started_at
+        self.ready_at = ready_at
+        self.stopped_at: Optional[float] = None
+        self.free_at = ready_at
+        self.intervals = deque()  # (start, finish) of assigned requests
+
+    def outstanding(self, now: float) -> int:
+        return sum(1 for _, finish in self.intervals if finish > now)
+
+    def busy_between(self, t0: float, t1: float) -> float:
+        """Busy time in [t0, t1]; forgets requests that finished before t1"""
+        busy = 0.0
+        while self.intervals and self.intervals[0][1] <= t1:
+            start, finish = self.intervals.popleft()
+            busy += max(0.0, min(finish, t1) - max(start, t0))
+        for start, finish in self.intervals:
+            if start >= t1:
+                break
+            busy += max(0.0, min(finish, t1) - max(start, t0))
+        return busy
+
+
+def simulate(
+    trace: Sequence[float],
+    latency: LatencyModel,
+    policy: ScalingPolicy,
+    slo_ms: float = 200.0,
+    interval: float = settings.AUTOSCALE_INTERVAL,
+    startup_seconds: float = 2.0,
+    cpu_limit: float = 1.0,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Replay one trace against one policy and summarise the outcome"""
+    rng = random.Random(seed)
+    state = ScalerState()
+    replicas = [_SimReplica(0.0, 0.0) for _ in range(policy.min_replicas)]
+    retired: List[_SimReplica] = []
+    latencies: List[float] = []
+    scale_events = 0
+    peak = len(replicas)
+    next_tick = interval
+
+    def tick(now: float):
+        nonlocal scale_events, peak
+        ready = [r for r in replicas if r.ready_at <= now]
+        if len(ready) < len(replicas):
+            return  # the live controller blocks while replicas start
+        busy = sum(r.busy_between(now - interval, now) for r in ready)
+        cpu = 100.0 * busy / (interval * len(ready) * cpu_limit) if ready else None
+        queue = sum(r.outstanding(now) for r in ready)
+        decision = policy.decide(state, ScalingSample(len(ready), cpu, queue), now)
+        if decision is None or decision.replicas == len(replicas):
+            return
+        scale_events += 1
+        while len(replicas) < decision.replicas:
+            replicas.append(_SimReplica(now, now + startup_seconds))
+        while len(replicas) > decision.replicas:
+            victim = min(replicas, key=lambda r: r.free_at)
+            replicas.remove(victim)
+            victim.stopped_at = max(now, victim.free_at)  # drains before stopping
+            retired.append(victim)
+        peak = max(peak, len(replicas))
+
+    for second, rate in enumerate(trace):
+        arrivals = sorted(second + rng.random() for _ in range(_poisson(rng, rate)))
+        for t in arrivals:
+            while next_tick <= t:
+                tick(next_tick)
+                next_tick += interval
+            ready = [r for r in replicas if r.ready_at <= t] or replicas
+            replica = min(ready, key=lambda r: max(r.free_at, t, r.ready_at))
+            start = max(replica.free_at, t, replica.ready_at)
+            finish = start + latency.sample(rng) / cpu_limit
+            replica.free_at = finish
+            replica.intervals.append((start, finish))
+            latencies.append(finish - t)
+        end = second + 1.0
+        while next_tick <= end:
+            tick(next_tick)
+            next_tick += interval
+
+    duration = float(len(trace))
+    replica_seconds = sum(
+        (r.stopped_at if r.stopped_at is not None else duration) - r.started_at
+        for r in replicas + retired
+    )
+    latencies.sort()
+    violations = len(latencies) - bisect.bisect_right(latencies, slo_ms / 1000.0)
+    return {
+        "scale_up_threshold": policy.scale_up_threshold,
+        "scale_down_threshold": policy.scale_down_threshold,
+        "requests": len(latencies),
+        "replica_seconds": round(replica_seconds, 1),
+        "peak_replicas": peak,
+        "scale_events": scale_events,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000.0, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000.0, 2),
+        "slo_violations": violations,
+        "slo_violation_pct": round(100.0 * violations / max(len(latencies), 1), 3),
+    }
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    if lam <= 0:
+        return 0
+    if lam > 30:
+        return max(0, int(round(rng.gauss(lam, math.sqrt(lam)))))
+    limit, k, p = math.exp(-lam), 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a traffic trace against autoscaling policies")
+    parser.add_argument("trace", help="locust stats_history CSV or request timestamp log")
+    parser.add_argument("--median-ms", type=float, default=20.0, help="median service time")
+    parser.add_argument("--p99-ms", type=float, default=None, help="p99 service time")
+    parser.add_argument("--latency-samples", help="file of measured latencies (ms), one per line")
+    parser.add_argument("--up", default="70", help="comma-separated scale_up_threshold values")
+    parser.add_argument("--down", default="30", help="comma-separated scale_down_threshold values")
+    parser.add_argument("--min-replicas", type=int, default=1)
+    parser.add_argument("--max-replicas", type=int, default=3)
+    parser.add_argument("--cpu-limit", type=float, default=1.0)
+    parser.add_argument("--startup-seconds", type=float, default=2.0)
+    parser.add_argument("--interval", type=float, default=settings.AUTOSCALE_INTERVAL)
+    parser.add_argument("--slo-ms", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace)
+    if not trace:
+        raise SystemExit(f"No requests found in {args.trace}")
+    if args.latency_samples:
+        latency = LatencyModel.from_file(args.latency_samples)
+    else:
+        latency = LatencyModel(args.median_ms, args.p99_ms)
+
+    results = []
+    ups = [float(v) for v in args.up.split(",")]
+    downs = [float(v) for v in args.down.split(",")]
+    for up, down in itertools.product(ups, downs):
+        if down >= up:
+            continue
+        policy = ScalingPolicy(args.min_replicas, args.max_replicas, up, down)
+        results.append(
+            simulate(
+                trace,
+                latency,
+                policy,
+                slo_ms=args.slo_ms,
+                interval=args.interval,
+                startup_seconds=args.startup_seconds,
+                cpu_limit=args.cpu_limit,
+                seed=args.seed,
+            )
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = list(results[0]) if results else []
+    print("  ".join(f"{c:>19}" for c in columns))
+    for row in sorted(results, key=lambda r: (r["slo_violations"], r["replica_seconds"])):
+        print("  ".join(f"{row[c]:>19}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
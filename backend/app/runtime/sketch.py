@@ -0,0 +1,106 @@
+"""
+sketch.py — Mergeable latency sketch with bounded relative error.
+
+Latencies are counted in logarithmic buckets: value v lands in bucket
+ceil(log_gamma(v)), with gamma = (1 + a) / (1 - a) for a relative
+accuracy ``a`` (1% by default). Adding a value is O(1), any quantile is
+within ``a`` of the true value, and two sketches merge exactly by adding
+their bucket counts, so per-minute sketches roll up into hours and days
+and sketches from separate processes combine without loss.
+"""
+import math
+from typing import Any, Dict, Optional
+
+RELATIVE_ACCURACY = 0.01
+MIN_VALUE = 1e-3  # ms; smaller values share the zero bucket
+
+
+class LatencySketch:
+    """Log-bucketed histogram of latencies in milliseconds"""
+
+    __slots__ = ("buckets", "zero_count", "count", "sum", "min", "max")
+
+    gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    _log_gamma = math.log(gamma)
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, count: int = 1):
+        if value < MIN_VALUE:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencySketch"):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile ``q`` (0..1), or None for an empty sketch"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return self.min
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Bucket midpoint, kept inside the observed range
+                value = 2 * self.gamma**index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        return {
+            "p50": self.quantile(0.50),
+            "p90": self.quantile(0.90),
+            "p99": self.quantile(0.99),
+            "p999": self.quantile(0.999),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe form (bucket keys as strings)"""
+        return {
+            "buckets": {str(i): c for i, c in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "LatencySketch":
+        sketch = cls()
+        if not data:
+            return sketch
+        sketch.buckets = {int(i): c for i, c in data.get("buckets", {}).items()}
+        sketch.zero_count = data.get("zero_count", 0)
+        sketch.count = data.get("count", 0)
+        sketch.sum = data.get("sum", 0.0)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        return sketch
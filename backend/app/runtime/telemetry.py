@@ -0,0 +1,130 @@
+"""
+telemetry.py — In-memory resource telemetry for local deployments.
+
+Every TELEMETRY_INTERVAL seconds the sampler reads each running
+runtime's replica CPU time and RSS from /proc and appends one point to
+that deployment's ring buffer (the last TELEMETRY_WINDOW points). The
+metrics endpoint serves current values and this short history straight
+from memory, so polling it never reaches the database.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.runtime.manager import DeploymentRuntime, runtime_manager
+from app.runtime.procfs import read_cpu_seconds, read_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryPoint:
+    """One sample of a deployment's replica set"""
+
+    __slots__ = ("timestamp", "replicas", "cpu_usage", "memory_usage", "queue_depth")
+
+    def __init__(
+        self,
+        timestamp: datetime,
+        replicas: int,
+        cpu_usage: Optional[float],
+        memory_usage: Optional[float],
+        queue_depth: int,
+    ):
+        self.timestamp = timestamp
+        self.replicas = replicas
+        self.cpu_usage = cpu_usage  # mean per replica, % of cpu_limit
+        self.memory_usage = memory_usage  # total RSS across replicas, MB
+        self.queue_depth = queue_depth
+
+
+class TelemetrySampler:
+    """Background task filling per-deployment ring buffers from /proc"""
+
+    def __init__(
+        self,
+        interval: float = settings.TELEMETRY_INTERVAL,
+        window: int = settings.TELEMETRY_WINDOW,
+    ):
+        self.interval = interval
+        self.window = window
+        self._series: Dict[int, Deque[TelemetryPoint]] = {}
+        self._cpu_marks: Dict[int, Tuple[float, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                self.sample_all()
+            except Exception:
+                logger.exception("Telemetry sample failed")
+            await asyncio.sleep(self.interval)
+
+    def sample_all(self):
+        deployment_ids = runtime_manager.deployment_ids()
+        live_pids = set()
+        for deployment_id in deployment_ids:
+            runtime = runtime_manager.get(deployment_id)
+            if runtime is None:
+                continue
+            point = self.sample(runtime)
+            self._series.setdefault(
+                deployment_id, deque(maxlen=self.window)
+            ).append(point)
+            live_pids.update(r.pid for r in runtime.replicas)
+
+        self._cpu_marks = {p: m for p, m in self._cpu_marks.items() if p in live_pids}
+        for deployment_id in set(self._series) - set(deployment_ids):
+            del self._series[deployment_id]
+
+    def sample(self, runtime: DeploymentRuntime) -> TelemetryPoint:
+        """Read CPU (since the previous sample) and RSS for each live replica"""
+        now = time.monotonic()
+        live = runtime.live_replicas()
+        busy, measured, rss_total, rss_seen = 0.0, 0, 0, False
+        for replica in live:
+            rss = read_rss_bytes(replica.pid)
+            if rss is not None:
+                rss_total += rss
+                rss_seen = True
+            cpu_seconds = read_cpu_seconds(replica.pid)
+            if cpu_seconds is None:
+                continue
+            mark = self._cpu_marks.get(replica.pid)
+            self._cpu_marks[replica.pid] = (cpu_seconds, now)
+            if mark and now > mark[1]:
+                busy += (cpu_seconds - mark[0]) / (now - mark[1])
+                measured += 1
+
+        cpu_usage = None
+        if measured:
+            cpu_usage = round(100.0 * busy / (measured * (runtime.cpu_limit or 1.0)), 2)
+        return TelemetryPoint(
+            timestamp=datetime.utcnow(),
+            replicas=len(live),
+            cpu_usage=cpu_usage,
+            memory_usage=round(rss_total / 2**20, 2) if rss_seen else None,
+            queue_depth=runtime.queue_depth(),
+        )
+
+    def latest(self, deployment_id: int) -> Optional[TelemetryPoint]:
+        series = self._series.get(deployment_id)
+        return series[-1] if series else None
+
+    def series(self, deployment_id: int) -> List[TelemetryPoint]:
+        return list(self._series.get(deployment_id, ()))
+
+
+telemetry = TelemetrySampler()
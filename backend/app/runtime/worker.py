@@ -0,0 +1,211 @@
+"""
+worker.py — Replica process serving one pinned model version.
+
+A replica loads its model once at startup and then answers HTTP/1.1
+requests on a Unix domain socket:
+
+  GET  /health   : readiness probe (the socket only appears once the model is loaded)
+  POST /predict  : {"input": [...]} -> run_inference() result
+
+The API process proxies deployment predictions to these sockets over
+keep-alive connections (see manager.py). Replicas never listen on TCP.
+
+Run as:
+    python -m app.runtime.worker --socket /tmp/r.sock --model-path m.joblib --format joblib
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from http import HTTPStatus
+from typing import Any, Dict, Tuple
+
+from fastapi import HTTPException
+
+from app.runtime.limits import ResourceLimits
+from app.utils.inference import load_model, run_inference
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+PARENT_CHECK_INTERVAL = 2.0  # seconds
+
+
+class ReplicaServer:
+    """Minimal keep-alive HTTP/1.1 server around a preloaded model"""
+
+    def __init__(self, model: Any, fmt: str, model_version_id: int):
+        self.model = model
+        self.fmt = fmt
+        self.model_version_id = model_version_id
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.memory_errors = 0
+
+    def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        """Route a parsed request to its handler"""
+        if method == "GET" and path == "/health":
+            return 200, {
+                "status": "ok",
+                "pid": os.getpid(),
+                "model_version_id": self.model_version_id,
+                "requests": self.requests,
+                "errors": self.errors,
+                "memory_errors": self.memory_errors,
+                "uptime": time.time() - self.started_at,
+            }
+
+        if method == "POST" and path == "/predict":
+            self.requests += 1
+            try:
+                payload = json.loads(body or b"{}")
+                raw_input = payload.get("input")
+                if raw_input is None:
+                    raise HTTPException(
+                        status_code=422, detail="Request body must have an 'input' key"
+                    )
+                return 200, run_inference(self.model, raw_input, self.fmt)
+            except HTTPException as e:
+                self.errors += 1
+                return e.status_code, {"detail": e.detail}
+            except MemoryError:
+                # Allocation refused by the replica's memory limit (limits.py)
+                self.errors += 1
+                self.memory_errors += 1
+                return 507, {"detail": "Replica exceeded its memory limit"}
+            except Exception as e:
+                self.errors += 1
+                return 500, {"detail": f"Inference failed: {e}"}
+
+        return 404, {"detail": "Not found"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", "0"))
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {"detail": "Request body too large"}
+                    keep_alive = False
+                else:
+                    try:
+                        body = await reader.readexactly(length) if length else b""
+                    except MemoryError:
+                        body = None
+                    if body is None:
+                        # The stream is mid-body, so answer and drop the connection
+                        self.errors += 1
+                        self.memory_errors += 1
+                        status, payload = 507, {"detail": "Replica exceeded its memory limit"}
+                        keep_alive = False
+                    else:
+                        status, payload = self.dispatch(method, target.split("?", 1)[0], body)
+                        keep_alive = headers.get("connection", "").lower() != "close"
+
+                data = json.dumps(payload).encode()
+                head = (
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                )
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass  # idle keep-alive connection cancelled at shutdown
+        finally:
+            writer.close()
+
+
+async def _watch_parent(parent_pid: int, stop: asyncio.Event):
+    """Exit when the API process that spawned us goes away"""
+    while not stop.is_set():
+        if os.getppid() != parent_pid:
+            stop.set()
+            return
+        await asyncio.sleep(PARENT_CHECK_INTERVAL)
+
+
+async def serve(
+    socket_path: str,
+    model: Any,
+    fmt: str,
+    model_version_id: int = 0,
+    parent_pid: int = 0,
+):
+    """Serve a loaded model on ``socket_path`` until SIGTERM or parent exit"""
+    server = ReplicaServer(model, fmt, model_version_id)
+
+    # Bind under a temporary name and rename once listening, so the socket
+    # path only becomes visible to the manager when the replica is warm.
+    tmp_path = f"{socket_path}.{os.getpid()}.tmp"
+    unix_server = await asyncio.start_unix_server(server.handle, path=tmp_path)
+    os.rename(tmp_path, socket_path)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    if parent_pid:
+        loop.create_task(_watch_parent(parent_pid, stop))
+
+    try:
+        async with unix_server:
+            await stop.wait()
+    finally:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ModelHub deployment replica")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--format", required=True)
+    parser.add_argument("--model-version-id", type=int, default=0)
+    parser.add_argument("--parent-pid", type=int, default=0)
+    parser.add_argument("--warmup-input", default=None, help="JSON input to predict once at startup")
+    parser.add_argument("--limits", default=None, help="JSON ResourceLimits to apply before loading")
+    args = parser.parse_args()
+
+    limits = ResourceLimits.from_dict(json.loads(args.limits) if args.limits else None)
+    limits.apply()
+    try:
+        model = load_model(args.model_path, args.format, threads=limits.threads)
+        if args.warmup_input:
+            # Pay first-call costs (lazy imports, thread pools) before going live
+            run_inference(model, json.loads(args.warmup_input), args.format)
+        asyncio.run(
+            serve(
+                args.socket,
+                model,
+                args.format,
+                args.model_version_id,
+                args.parent_pid,
+            )
+        )
+    except HTTPException as e:
+        # load_model reports missing files / formats as HTTP errors
+        raise SystemExit(f"Replica failed to load model: {e.detail}")
+
+
+if __name__ == "__main__":
+    main()
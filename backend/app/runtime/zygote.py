@@ -0,0 +1,387 @@
+"""
+zygote.py — Pre-loaded template process that forks deployment replicas.
+
+Spawning a replica from scratch pays for a fresh interpreter, the ML
+stack imports and the model load every time. A zygote pays those costs
+once per model version and then forks a child for each new replica:
+
+  - numpy / scikit-learn / onnxruntime are imported before any fork
+  - pickle / joblib models are loaded in the zygote, so children share
+    the model's memory pages copy-on-write
+  - ONNX sessions own native thread pools that do not survive fork(),
+    so for onnx the zygote only preloads the import and each child
+    creates its own session
+
+Children run the same ``serve()`` loop as a cold-spawned worker (see
+worker.py). The zygote is single-threaded and only ever forks from its
+blocking control loop, which keeps fork() safe.
+
+Control protocol (one JSON line per connection on the control socket):
+
+    -> {"socket": "/tmp/r.sock", "env": {...}, "warmup_input": [...], "limits": {...}}
+    <- {"pid": 1234}        or        {"error": "..."}
+
+Run as (normally started by ZygotePool):
+    python -m app.runtime.zygote --control /tmp/z.sock --model-path m.joblib --format joblib
+"""
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Formats whose loaded model objects can be shared across fork()
+FORK_SAFE_FORMATS = ("joblib", "pkl", "pickle")
+PRELOAD_MODULES = ("numpy", "sklearn", "joblib", "onnxruntime")
+PARENT_CHECK_INTERVAL = 2.0  # seconds
+CONTROL_TIMEOUT = 10.0  # seconds to wait for a fork reply
+
+
+class ZygoteError(Exception):
+    """Raised when a zygote cannot be started or fails to fork a replica"""
+
+
+class ForkedProcess:
+    """
+    Popen-like handle for a replica forked by a zygote.
+
+    The replica is the zygote's child, not ours, so liveness is probed
+    with signal 0; the zygote reaps it as soon as it exits.
+    """
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.returncode: Optional[int] = None
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, 0)
+            except ProcessLookupError:
+                self.returncode = -1  # the real exit status went to the zygote
+            except PermissionError:
+                pass
+        return self.returncode
+
+    def _signal(self, sig: int):
+        try:
+            os.kill(self.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def terminate(self):
+        self._signal(signal.SIGTERM)
+
+    def kill(self):
+        self._signal(signal.SIGKILL)
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(str(self.pid), timeout)
+            time.sleep(0.01)
+        return self.returncode
+
+
+# --- Zygote process ---------------------------------------------------------
+
+
+def _preload():
+    """Import the ML stack once so forked replicas inherit it"""
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+
+
+def _run_child(model: Any, args: argparse.Namespace, request: Dict[str, Any]):
+    """Body of a forked replica; never returns"""
+    from app.runtime.limits import ResourceLimits
+    from app.runtime.worker import serve
+    from app.utils.inference import load_model, run_inference
+
+    code = 0
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        # Only variables read lazily take effect: libraries the zygote
+        # already initialised keep the settings they were imported with.
+        os.environ.update(request.get("env") or {})
+        limits = ResourceLimits.from_dict(request.get("limits"))
+        limits.apply()
+        if model is None:
+            model = load_model(args.model_path, args.format, threads=limits.threads)
+        if request.get("warmup_input") is not None:
+            run_inference(model, request["warmup_input"], args.format)
+        asyncio.run(
+            serve(
+                request["socket"],
+                model,
+                args.format,
+                args.model_version_id,
+                parent_pid=os.getppid(),
+            )
+        )
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def run_zygote(args: argparse.Namespace):
+    from app.utils.inference import load_model
+
+    _preload()
+    model = None
+    if args.format.lower().strip(".") in FORK_SAFE_FORMATS:
+        model = load_model(args.model_path, args.format)
+
+    # Move everything loaded so far out of the collector's reach: children
+    # would otherwise dirty the shared pages by touching GC headers.
+    gc.collect()
+    gc.freeze()
+
+    children = set()
+
+    def reap(signum, frame):
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            children.discard(pid)
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGCHLD, reap)
+    signal.signal(signal.SIGTERM, terminate)
+
+    tmp_path = f"{args.control}.{os.getpid()}.tmp"
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(tmp_path)
+    listener.listen(64)
+    listener.settimeout(PARENT_CHECK_INTERVAL)
+    os.rename(tmp_path, args.control)
+
+    try:
+        while os.getppid() == args.parent_pid or not args.parent_pid:
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                conn.settimeout(CONTROL_TIMEOUT)
+                try:
+                    request = json.loads(conn.makefile("rb").readline())
+                except (OSError, ValueError) as e:
+                    conn.sendall(json.dumps({"error": f"Bad request: {e}"}).encode() + b"\n")
+                    continue
+
+                pid = os.fork()
+                if pid == 0:
+                    listener.close()
+                    conn.close()
+                    _run_child(model, args, request)
+                children.add(pid)
+                conn.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+    finally:
+        listener.close()
+        if os.path.exists(args.control):
+            os.unlink(args.control)
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ModelHub replica zygote")
+    parser.add_argument("--control", required=True)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--format", required=True)
+    parser.add_argument("--model-version-id", type=int, default=0)
+    parser.add_argument("--parent-pid", type=int, default=0)
+    args = parser.parse_args()
+
+    from fastapi import HTTPException
+
+    try:
+        run_zygote(args)
+    except HTTPException as e:
+        raise SystemExit(f"Zygote failed to load model: {e.detail}")
+
+
+# --- API-side handles -------------------------------------------------------
+
+
+class Zygote:
+    """Handle on one running zygote process"""
+
+    def __init__(self, model_version_id: int, model_path: str, model_format: str):
+        self.model_version_id = model_version_id
+        self.model_path = model_path
+        self.model_format = model_format
+        self.control_path = os.path.join(
+            settings.RUNTIME_SOCKET_DIR, f"z{model_version_id}-{os.getpid()}.sock"
+        )
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Launch the zygote and wait until its model is loaded"""
+        from app.runtime.manager import BACKEND_ROOT
+
+        os.makedirs(settings.RUNTIME_SOCKET_DIR, exist_ok=True)
+        if os.path.exists(self.control_path):
+            os.unlink(self.control_path)
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (BACKEND_ROOT, env.get("PYTHONPATH")) if p
+        )
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "app.runtime.zygote",
+                "--control",
+                self.control_path,
+                "--model-path",
+                self.model_path,
+                "--format",
+                self.model_format,
+                "--model-version-id",
+                str(self.model_version_id),
+                "--parent-pid",
+                str(os.getpid()),
+            ],
+            env=env,
+        )
+
+        deadline = time.monotonic() + settings.RUNTIME_STARTUP_TIMEOUT
+        while not os.path.exists(self.control_path):
+            if not self.is_alive():
+                raise ZygoteError(
+                    f"Zygote exited during startup (code {self.process.returncode})"
+                )
+            if time.monotonic() > deadline:
+                self.stop()
+                raise ZygoteError(
+                    f"Zygote not ready after {settings.RUNTIME_STARTUP_TIMEOUT}s"
+                )
+            time.sleep(0.01)
+
+    def fork_replica(
+        self,
+        socket_path: str,
+        env: Optional[Dict[str, str]] = None,
+        warmup_input: Any = None,
+        limits: Optional[Dict[str, Any]] = None,
+    ) -> ForkedProcess:
+        """Ask the zygote for a new replica listening on ``socket_path``"""
+        request = {
+            "socket": socket_path,
+            "env": env or {},
+            "warmup_input": warmup_input,
+            "limits": limits,
+        }
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.settimeout(CONTROL_TIMEOUT)
+                conn.connect(self.control_path)
+                conn.sendall(json.dumps(request).encode() + b"\n")
+                reply = json.loads(conn.makefile("rb").readline() or b"{}")
+        except (OSError, ValueError) as e:
+            raise ZygoteError(f"Zygote pid={self.pid} unreachable: {e}")
+        if "pid" not in reply:
+            raise ZygoteError(reply.get("error", "Zygote did not fork a replica"))
+        return ForkedProcess(reply["pid"])
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the zygote; its replicas are terminated with it"""
+        if self.is_alive():
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if os.path.exists(self.control_path):
+            os.unlink(self.control_path)
+
+
+class ZygotePool:
+    """Zygotes keyed by model version, started on first replica spawn"""
+
+    def __init__(self):
+        self._zygotes: Dict[Tuple[int, str, str], Zygote] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_version_id: int, model_path: str, model_format: str) -> Zygote:
+        """Running zygote for a model version, starting one if needed"""
+        key = (model_version_id, model_path, model_format)
+        with self._lock:
+            zygote = self._zygotes.get(key)
+            if zygote is None or not zygote.is_alive():
+                zygote = Zygote(model_version_id, model_path, model_format)
+                zygote.start()
+                self._zygotes[key] = zygote
+            return zygote
+
+    def fork_replica(self, runtime, socket_path: str, limits=None) -> ForkedProcess:
+        """Fork a replica of ``runtime``'s model version"""
+        zygote = self.get(runtime.model_version_id, runtime.model_path, runtime.model_format)
+        return zygote.fork_replica(
+            socket_path,
+            runtime.environment_vars,
+            runtime.warmup_input,
+            limits.to_dict() if limits else None,
+        )
+
+    def zygotes(self) -> Dict[int, Zygote]:
+        return {key[0]: z for key, z in self._zygotes.items()}
+
+    def release(self, model_version_ids):
+        """Stop zygotes for model versions no runtime uses any more"""
+        keep = set(model_version_ids)
+        with self._lock:
+            unused = [k for k in self._zygotes if k[0] not in keep]
+            zygotes = [self._zygotes.pop(k) for k in unused]
+        for zygote in zygotes:
+            zygote.stop()
+
+    def shutdown(self):
+        self.release(())
+
+
+zygote_pool = ZygotePool()
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ class DeploymentBase(BaseModel):
 
     # Configuration
     environment_vars: Dict[str, str] = Field(default_factory=dict)
+    deployment_config: Dict[str, Any] = Field(default_factory=dict)
     health_check_path: str = "/health"
 
     # Auto-scaling
@@ -43,11 +44,73 @@ class DeploymentUpdate(BaseModel):
     max_replicas: Optional[int] = None
     min_replicas: Optional[int] = None
     environment_vars: Optional[Dict[str, str]] = None
+    deployment_config: Optional[Dict[str, Any]] = None
     auto_scale_enabled: Optional[bool] = None
     scale_up_threshold: Optional[float] = None
     scale_down_threshold: Optional[float] = None
 
 
+class ReplicaRoutingStats(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    pid: int
+    model_version_id: int
+    outstanding: int
+    requests: int
+    errors: int
+    ewma_latency_ms: Optional[float] = None
+    hedged: int = 0
+    hedge_wins: int = 0
+
+
+class TelemetryPoint(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    timestamp: datetime
+    replicas: int
+    cpu_usage: Optional[float] = None
+    memory_usage: Optional[float] = None
+    queue_depth: int = 0
+
+
+class LatencyPercentiles(BaseModel):
+    requests: int = 0
+    errors: int = 0
+    error_rate: float = 0.0
+    mean_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+    p50_ms: Optional[float] = None
+    p90_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    p999_ms: Optional[float] = None
+
+
+class VersionLatency(LatencyPercentiles):
+    model_config = ConfigDict(protected_namespaces=())
+    model_version_id: int
+
+
+class DeploymentLatency(LatencyPercentiles):
+    window_minutes: int
+    versions: List[VersionLatency] = Field(default_factory=list)
+
+
+class ShadowReport(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    deployment_id: int
+    model_version_id: int  # version receiving mirrored traffic
+    baseline_model_version_id: int  # version serving the responses
+    fraction: float
+    started_at: datetime
+    updated_at: datetime
+    mirrored: int
+    skipped: int  # sampled but dropped at SHADOW_MAX_INFLIGHT
+    errors: int
+    agreements: int
+    agreement_rate: Optional[float] = None  # over mirrored requests without errors
+    baseline: LatencyPercentiles
+    candidate: LatencyPercentiles
+    latency_delta_ms: Dict[str, Optional[float]]  # candidate minus baseline
+
+
 class DeploymentMetrics(BaseModel):
     model_config = ConfigDict(protected_namespaces=())
     request_count: int
@@ -55,8 +118,42 @@ class DeploymentMetrics(BaseModel):
     last_request_at: Optional[datetime] = None
     last_health_check: Optional[datetime] = None
     current_replicas: int
-    cpu_usage: Optional[float] = None
-    memory_usage: Optional[float] = None
+    cpu_usage: Optional[float] = Field(None, description="Mean per replica, % of cpu_limit")
+    memory_usage: Optional[float] = Field(None, description="Total replica RSS in MB")
+    replicas: List[ReplicaRoutingStats] = Field(default_factory=list)
+    telemetry: List[TelemetryPoint] = Field(default_factory=list)
+    latency: Optional[DeploymentLatency] = Field(
+        None, description="Percentiles over the last window_minutes, per model version too"
+    )
+
+    # Scale-to-zero deployments
+    cold_starts: int = 0
+    last_cold_start_ms: Optional[float] = None
+    avg_cold_start_ms: Optional[float] = None
+
+
+class MetricsHistoryPoint(BaseModel):
+    timestamp: datetime
+    requests: int
+    errors: int
+    request_rate: float  # requests per second
+    error_rate: float
+    avg_latency_ms: Optional[float] = None
+    max_latency_ms: Optional[float] = None
+    p50_ms: Optional[float] = None
+    p90_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    p999_ms: Optional[float] = None
+
+
+class MetricsHistory(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    deployment_id: int
+    model_version_id: Optional[int] = None
+    resolution: str
+    start: datetime
+    end: datetime
+    points: List[MetricsHistoryPoint] = Field(default_factory=list)
 
 
 class Deployment(DeploymentBase):
@@ -135,6 +232,19 @@ class DeploymentListResponse(BaseModel):
     total: int
     page: int
     limit: int
+    cursor: Optional[str] = None  # for /deployments/changes?since=
+
+
+class DeploymentChange(BaseModel):
+    deployment_id: int
+    type: str  # created, updated or deleted
+    changes: Dict[str, Any] = {}  # changed columns and their new values
+
+
+class DeploymentChanges(BaseModel):
+    cursor: str  # pass as ``since`` on the next call
+    reset: bool = False  # cursor not resumable: reload the full list
+    changes: List[DeploymentChange]
 
 
 class DeploymentStatusResponse(BaseModel):
@@ -29,6 +29,7 @@ class ModelVersionInDBBase(ModelVersionBase):
     id: int
     model_id: int
     s3_path: str
+    content_hash: Optional[str] = None  # SHA-256 of the artifact; also its ETag
     size_mb: float
     created_at: datetime
 
@@ -84,3 +85,27 @@ class Model(ModelInDBBase):
 
 class ModelInDB(ModelInDBBase):
     pass
+
+
+class UploadSessionCreate(BaseModel):
+    """A resumable upload: of a new version of ``model_id``, or of a new ``model``"""
+
+    model_config = ConfigDict(protected_namespaces=())
+
+    size_bytes: int
+    chunk_size: Optional[int] = None  # default UPLOAD_CHUNK_SIZE
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-fA-F]{64}$")  # verified on completion
+    model_id: Optional[int] = None
+    model: Optional[ModelCreate] = None
+    version: ModelVersionCreate
+
+
+class UploadSessionStatus(BaseModel):
+    id: str
+    model_id: Optional[int] = None
+    size_bytes: int
+    chunk_size: int
+    chunk_count: int
+    received_bytes: int
+    missing_chunks: List[int]  # send these (offset = index * chunk_size), then complete
+    expires_at: datetime
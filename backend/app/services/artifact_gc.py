@@ -0,0 +1,252 @@
+"""
+artifact_gc.py — Removes stored files that no model version references.
+
+Deleting a model only releases its blobs (services/model.py), and failed
+or abandoned uploads leave files behind. The collector reconciles the
+storage tree with the database in passes:
+
+  - temporary files under blobs/tmp older than GC_GRACE_PERIOD are
+    removed, except the part files of live upload sessions (expired
+    sessions are purged first, see services/upload.py)
+  - every stored key is listed lazily (``storage.iter_keys``: an
+    os.scandir walk, or an S3 listing a page at a time) and checked in
+    batches of GC_BATCH_SIZE against ModelVersion.s3_path. A blob, or a
+    compressed variant of it, is an orphan when no version points at the
+    blob and no model_blobs row counts a reference to it; a legacy
+    "models/<user>/<file>" key when no version points at it. Other keys
+    are left alone.
+  - an orphan last modified within GC_GRACE_PERIOD is kept: it may be an
+    upload between being stored and its version being committed. Storing
+    existing content again refreshes the blob's modification time (see
+    StorageBackend.put_file), which restarts the period.
+
+Each run examines at most GC_SCAN_LIMIT keys and resumes the listing
+where the previous run stopped, so a pass over millions of files is
+spread over many runs. Just before an orphan is deleted, its references
+and modification time are checked again, since the listing may be a
+batch old by then. Deletes are paced to GC_MAX_DELETES_PER_SECOND. ``stats()``
+(in /health) reports the files and bytes reclaimed.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.model import ModelBlob, ModelVersion, UploadSession
+from app.services.upload import purge_expired_uploads
+from app.utils.compression import ENCODINGS
+from app.utils.storage import blob_hash, blob_key, storage, temp_dir
+
+logger = logging.getLogger(__name__)
+
+_LEGACY_KEY = re.compile(r"models/\d+/[^/]+")
+_UPLOAD_PART = re.compile(r"upload-([0-9a-f]{32})\.part")
+
+
+def _blob_of(key: str) -> Optional[str]:
+    """Hash of the blob a key stores, itself or as a compressed variant"""
+    for suffix in ENCODINGS.values():
+        if key.endswith(f".{suffix}"):
+            return blob_hash(key[: -len(suffix) - 1])
+    return blob_hash(key)
+
+
+class ArtifactCollector:
+    """Background task deleting unreferenced artifacts, incrementally"""
+
+    def __init__(
+        self,
+        interval: float = settings.GC_INTERVAL,
+        grace_period: float = settings.GC_GRACE_PERIOD,
+        scan_limit: int = settings.GC_SCAN_LIMIT,
+        batch_size: int = settings.GC_BATCH_SIZE,
+        max_deletes_per_second: float = settings.GC_MAX_DELETES_PER_SECOND,
+    ):
+        self.interval = interval
+        self.grace_period = grace_period
+        self.scan_limit = scan_limit
+        self.batch_size = batch_size
+        self.max_deletes_per_second = max_deletes_per_second
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = threading.Event()
+        self._keys: Optional[Iterator[Tuple[str, int, float]]] = None  # current pass
+        self._pass: Dict[str, Any] = {}
+        self.last_pass: Optional[Dict[str, Any]] = None
+        self.passes = 0
+        self.files_deleted = 0
+        self.bytes_reclaimed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "passes": self.passes,
+            "files_deleted": self.files_deleted,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "current_pass": dict(self._pass) if self._keys is not None else None,
+            "last_pass": self.last_pass,
+        }
+
+    def start(self):
+        if self._task is None and settings.GC_ENABLED:
+            self._stopping.clear()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop after the file being deleted; the next start begins a new pass"""
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._keys = None
+
+    async def _run(self):
+        while True:
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception:
+                logger.exception("Artifact garbage collection failed")
+                self._keys = None  # start over
+            await asyncio.sleep(self.interval)
+
+    def run_once(self):
+        """Examine up to ``scan_limit`` stored keys, continuing the current pass"""
+        if self._keys is None:
+            self._begin_pass()
+        keys, scanned = self._keys, 0
+        while scanned < self.scan_limit and not self._stopping.is_set():
+            batch = list(itertools.islice(keys, min(self.batch_size, self.scan_limit - scanned)))
+            if not batch:
+                self._end_pass()
+                return
+            scanned += len(batch)
+            self._pass["scanned"] += len(batch)
+            self._collect(batch)
+
+    def _begin_pass(self):
+        self._pass = {"started": time.time(), "scanned": 0, "files_deleted": 0, "bytes_reclaimed": 0}
+        db = SessionLocal()
+        try:
+            purge_expired_uploads(db)
+            self._sweep_temp(db)
+        finally:
+            db.close()
+        self._keys = storage.iter_keys()
+
+    def _end_pass(self):
+        self._keys = None
+        self.passes += 1
+        started = self._pass.pop("started")
+        self.last_pass = {**self._pass, "seconds": round(time.time() - started, 1)}
+        logger.info(
+            f"Artifact GC pass: {self.last_pass['scanned']} files scanned, "
+            f"{self.last_pass['files_deleted']} orphans deleted, "
+            f"{self.last_pass['bytes_reclaimed']} bytes reclaimed"
+        )
+
+    def _sweep_temp(self, db):
+        """Remove abandoned temporary files; in-flight ones are still being written"""
+        cutoff = time.time() - self.grace_period
+        try:
+            entries = os.scandir(temp_dir())
+        except FileNotFoundError:
+            return
+        with entries:
+            for entry in entries:
+                if self._stopping.is_set():
+                    return
+                try:
+                    stat_result = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                if not entry.is_file(follow_symlinks=False) or stat_result.st_mtime >= cutoff:
+                    continue
+                session = _UPLOAD_PART.fullmatch(entry.name)
+                if session and db.query(UploadSession.id).filter(
+                    UploadSession.id == session.group(1)
+                ).first():
+                    continue  # resumable until the session expires
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                self._reclaimed(stat_result.st_size)
+
+    def _collect(self, batch: List[Tuple[str, int, float]]):
+        cutoff = time.time() - self.grace_period
+        # Key -> the s3_path a version referencing it would have
+        candidates = {}
+        for key, size, mtime in batch:
+            if mtime >= cutoff:
+                continue
+            sha256 = _blob_of(key)
+            if sha256 is not None:
+                candidates[key] = (blob_key(sha256), sha256, size)
+            elif _LEGACY_KEY.fullmatch(key):
+                candidates[key] = (key, None, size)
+        if not candidates:
+            return
+
+        db = SessionLocal()
+        try:
+            paths = {path for path, _, _ in candidates.values()}
+            hashes = {sha256 for _, sha256, _ in candidates.values() if sha256}
+            live = {
+                path
+                for (path,) in db.query(ModelVersion.s3_path).filter(ModelVersion.s3_path.in_(paths))
+            }
+            if hashes:
+                counted = db.query(ModelBlob.sha256).filter(
+                    ModelBlob.sha256.in_(hashes), ModelBlob.ref_count > 0
+                )
+                live.update(blob_key(sha256) for (sha256,) in counted)
+
+            for key, (path, sha256, size) in candidates.items():
+                if path in live:
+                    continue
+                if self._stopping.is_set():
+                    return
+                if self._delete(db, key, path, sha256):
+                    self._reclaimed(size)
+                    self._stopping.wait(1.0 / self.max_deletes_per_second)
+        finally:
+            db.close()
+
+    def _delete(self, db, key: str, path: str, sha256: Optional[str]) -> bool:
+        # Checked again: paced deletes can act on a listing taken a while ago,
+        # and meanwhile the blob may have been stored again (modification time
+        # refreshed) or a version committed. A variant goes with its blob.
+        cutoff = time.time() - self.grace_period
+        for stored in {key, path}:
+            modified = storage.modified(stored)
+            if modified is not None and modified >= cutoff:
+                return False
+        if db.query(ModelVersion.id).filter(ModelVersion.s3_path == path).first():
+            return False
+        if sha256 is not None:
+            deleted = (
+                db.query(ModelBlob)
+                .filter(ModelBlob.sha256 == sha256, ModelBlob.ref_count == 0)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            if not deleted and db.query(ModelBlob.sha256).filter(ModelBlob.sha256 == sha256).first():
+                return False  # referenced again
+        storage.delete(key)
+        logger.info(f"Deleted orphaned artifact {key}")
+        return True
+
+    def _reclaimed(self, size: int):
+        self.files_deleted += 1
+        self.bytes_reclaimed += size
+        self._pass["files_deleted"] += 1
+        self._pass["bytes_reclaimed"] += size
+
+
+artifact_collector = ArtifactCollector()
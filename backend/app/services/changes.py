@@ -0,0 +1,123 @@
+"""
+changes.py — Per-owner feed of deployment changes.
+
+Session hooks record which ModelDeployment columns each flush changed and,
+once the transaction commits, publish one event per deployment to the
+owner's EventHub topic:
+
+    {"type": "created" | "updated" | "deleted", "deployment_id": 7,
+     "changes": {"status": "running", "request_count": 1523, ...}}
+
+Bulk UPDATE statements bypass the session hooks, so their callers
+(the orchestrator) publish their changes with ``publish_change``.
+
+The deployment list returns a cursor taken before it was read. Clients
+then either stream the feed (/deployments/changes/stream) or poll
+/deployments/changes?since=<cursor>, which merges the buffered events per
+deployment and returns only deployments that changed. As with every
+EventHub topic, a cursor from another process or older than the buffer
+(or none at all) comes back with ``reset``, meaning reload the full list.
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.deployment import ModelDeployment
+from app.services.events import event_hub
+
+# Maintained by the database (onupdate); not visible in attribute history
+UNTRACKED = {"updated_at"}
+
+
+def changes_topic(owner_id: int):
+    """EventHub topic carrying an owner's deployment changes"""
+    return ("deployments", owner_id)
+
+
+def publish_change(
+    owner_id: int,
+    deployment_id: int,
+    kind: str = "updated",
+    changes: Optional[Dict[str, Any]] = None,
+):
+    event_hub.publish(
+        changes_topic(owner_id),
+        {"type": kind, "deployment_id": deployment_id, "changes": changes or {}},
+    )
+
+
+def _columns(deployment: ModelDeployment, changed_only: bool) -> Dict[str, Any]:
+    state = inspect(deployment)
+    values = {}
+    for attr in state.mapper.column_attrs:
+        # Server defaults aren't loaded yet; reading them would query mid-flush
+        if attr.key in UNTRACKED or attr.key in state.unloaded:
+            continue
+        if changed_only and not state.attrs[attr.key].history.has_changes():
+            continue
+        values[attr.key] = getattr(deployment, attr.key)
+    return values
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    pending = session.info.setdefault("deployment_changes", {})
+    for kind, objects, changed_only in (
+        ("created", session.new, False),
+        ("updated", session.dirty, True),
+        ("deleted", session.deleted, None),
+    ):
+        for obj in objects:
+            if not isinstance(obj, ModelDeployment):
+                continue
+            if kind == "deleted":
+                pending[obj.id] = (obj.owner_id, "deleted", {})
+                continue
+            values = _columns(obj, changed_only)
+            if not values:
+                continue
+            previous = pending.get(obj.id)
+            if previous is not None and previous[1] != "deleted":
+                # Several flushes in one transaction: merge them
+                kind = previous[1] if previous[1] == "created" else kind
+                values = {**previous[2], **values}
+            pending[obj.id] = (obj.owner_id, kind, values)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session):
+    pending = session.info.pop("deployment_changes", None)
+    for deployment_id, (owner_id, kind, values) in (pending or {}).items():
+        publish_change(owner_id, deployment_id, kind, values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop("deployment_changes", None)
+
+
+def changes_since(owner_id: int, since: Optional[str]) -> Dict[str, Any]:
+    """Deployments changed after ``since``, one merged entry each"""
+    topic = changes_topic(owner_id)
+    # Taken first: a change published meanwhile is sent twice, never skipped
+    head = event_hub.head(topic)
+    events, complete = event_hub.replay(topic, since)
+    if since is None:
+        events, complete = [], False
+    merged: Dict[int, Dict[str, Any]] = {}
+    for _, data in events:
+        entry = merged.get(data["deployment_id"])
+        if entry is None or data["type"] != "updated":
+            merged[data["deployment_id"]] = {
+                "deployment_id": data["deployment_id"],
+                "type": data["type"],
+                "changes": dict(data["changes"]),
+            }
+        else:
+            entry["changes"].update(data["changes"])
+    return {
+        "cursor": events[-1][0] if events else head,
+        "reset": not complete,
+        "changes": list(merged.values()),
+    }
@@ -1,25 +1,33 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
+from typing import Callable, List, Optional, Dict, Any
 from datetime import datetime
 import asyncio
 import logging
+import os
+import threading
+import time
 from fastapi import HTTPException
 
-try:
-    import docker
-
-    DOCKER_AVAILABLE = True
-except ImportError:
-    DOCKER_AVAILABLE = False
-    docker = None
-
 from app.models.deployment import (
     ModelDeployment,
     DeploymentLog,
+    DeploymentMetricRollup,
     DeploymentStatus,
     DeploymentType,
 )
 from app.models.model import Model, ModelVersion
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.runtime.container import container_runtime
+from app.runtime.manager import DeploymentRuntime, ReplicaStartError, runtime_manager
+from app.runtime.telemetry import telemetry
+from app.services.changes import publish_change
+from app.services.events import event_hub
+from app.services.log_sink import deployment_log_sink, log_topic
+from app.services.metrics import metrics_recorder
+from app.services.shadow import shadow_mirror
+from app.utils.storage import artifact_exists
 from app.schemas.deployment import (
     DeploymentCreate,
     DeploymentUpdate,
@@ -29,20 +37,29 @@ from app.schemas.deployment import (
 
 logger = logging.getLogger(__name__)
 
+ROLLOUT_STRATEGIES = ("blue_green", "gradual")
+
+# Deployment types served by local replica processes (see app/runtime)
+LOCAL_RUNTIME_TYPES = (DeploymentType.ENDPOINT, DeploymentType.SERVERLESS)
+
+
+def uses_local_runtime(deployment: ModelDeployment) -> bool:
+    """Whether a deployment is served by local replicas"""
+    if deployment.deployment_type in LOCAL_RUNTIME_TYPES:
+        return True
+    # Container deployments run locally when no container daemon is
+    # reachable, and keep doing so once started that way
+    return runtime_manager.get(deployment.id) is not None or not container_runtime.available
+
 
 class DeploymentService:
     def __init__(self, db: Session):
         self.db = db
-        self.docker_client = None
-        if DOCKER_AVAILABLE:
-            try:
-                self.docker_client = docker.from_env()
-            except Exception as e:
-                logger.warning(f"Docker client not available: {e}")
-        else:
-            logger.warning(
-                "Docker module not available. Deployment functionality will be limited."
-            )
+
+    @property
+    def docker_client(self):
+        """Shared docker client, or None when no daemon is reachable"""
+        return container_runtime.client
 
     def get_deployment(self, deployment_id: int) -> Optional[ModelDeployment]:
         """Get deployment by ID"""
@@ -60,8 +77,13 @@ class DeploymentService:
         status: Optional[DeploymentStatus] = None,
     ) -> List[ModelDeployment]:
         """Get deployments for a user with optional filtering"""
-        query = self.db.query(ModelDeployment).filter(
-            ModelDeployment.owner_id == owner_id
+        query = (
+            self.db.query(ModelDeployment)
+            .options(
+                joinedload(ModelDeployment.model),
+                joinedload(ModelDeployment.model_version),
+            )
+            .filter(ModelDeployment.owner_id == owner_id)
         )
 
         if status:
@@ -148,12 +170,7 @@ class DeploymentService:
             "system",
         )
 
-        # Note: In a real implementation, you would trigger the deployment process here
-        # For now, we'll just set it to running status for testing
-        db_deployment.status = DeploymentStatus.RUNNING
-        db_deployment.endpoint_url = f"http://localhost:8001/predict/{db_deployment.id}"
-        self.db.commit()
-        self.db.refresh(db_deployment)
+        self._enqueue(db_deployment)
 
         return db_deployment
 
@@ -175,6 +192,10 @@ class DeploymentService:
         self.db.commit()
         self.db.refresh(deployment)
 
+        runtime = runtime_manager.get(deployment_id)
+        if runtime:
+            runtime.configure(deployment)
+
         self._log_deployment_event(
             deployment_id, "INFO", f"Deployment configuration updated", "system"
         )
@@ -188,11 +209,20 @@ class DeploymentService:
         if not deployment or deployment.owner_id != owner_id:
             raise HTTPException(status_code=404, detail="Deployment not found")
 
-        # Stop deployment if running
-        if deployment.status == DeploymentStatus.RUNNING:
-            self.stop_deployment(deployment_id, owner_id)
-
-        # Delete deployment record
+        # Replicas may be live in any state: mid-rollout (with a candidate),
+        # starting up, or serving shadow traffic
+        shadow_mirror.detach(deployment_id)
+        runtime_manager.stop(deployment_id)
+
+        # Delete deployment record, and the rows referencing it (their
+        # foreign keys don't cascade)
+        deployment_log_sink.discard(deployment_id)
+        metrics_recorder.discard(deployment_id)
+        event_hub.drop(log_topic(deployment_id))
+        for table in (DeploymentLog, DeploymentMetricRollup):
+            self.db.query(table).filter(table.deployment_id == deployment_id).delete(
+                synchronize_session=False
+            )
         self.db.delete(deployment)
         self.db.commit()
 
@@ -205,13 +235,23 @@ class DeploymentService:
         if not deployment or deployment.owner_id != owner_id:
             raise HTTPException(status_code=404, detail="Deployment not found")
 
-        if deployment.status == DeploymentStatus.RUNNING:
-            raise HTTPException(status_code=400, detail="Deployment is already running")
+        if deployment.status in (
+            DeploymentStatus.RUNNING,
+            DeploymentStatus.PENDING,
+            DeploymentStatus.BUILDING,
+            DeploymentStatus.DEPLOYING,
+        ):
+            raise HTTPException(
+                status_code=400, detail=f"Deployment is already {deployment.status.value}"
+            )
 
-        deployment.status = DeploymentStatus.RUNNING
-        deployment.endpoint_url = f"http://localhost:8001/predict/{deployment_id}"
+        deployment.status = DeploymentStatus.PENDING
+        deployment.error_message = None
         self.db.commit()
 
+        self._log_deployment_event(deployment_id, "INFO", "Deployment queued", "system")
+        self._enqueue(deployment)
+
         return deployment
 
     def stop_deployment(self, deployment_id: int, owner_id: int) -> ModelDeployment:
@@ -221,6 +261,9 @@ class DeploymentService:
         if not deployment or deployment.owner_id != owner_id:
             raise HTTPException(status_code=404, detail="Deployment not found")
 
+        shadow_mirror.detach(deployment_id)
+        runtime_manager.stop(deployment_id)
+
         # Update status
         deployment.status = DeploymentStatus.STOPPED
         deployment.endpoint_url = None
@@ -232,28 +275,476 @@ class DeploymentService:
 
         return deployment
 
+    def ensure_runtime(self, deployment: ModelDeployment) -> DeploymentRuntime:
+        """Return the local runtime for a running endpoint, restarting it if needed"""
+        runtime = runtime_manager.get(deployment.id)
+        if runtime and (runtime.scale_to_zero or runtime.live_replicas()):
+            return runtime
+
+        try:
+            runtime = runtime_manager.start(deployment, deployment.model_version)
+        except ReplicaStartError as e:
+            self._log_deployment_event(
+                deployment.id, "ERROR", f"Replica startup failed: {e}", "deployer"
+            )
+            raise HTTPException(status_code=503, detail=str(e))
+
+        self._log_deployment_event(
+            deployment.id,
+            "INFO",
+            f"Replicas restarted ({len(runtime.replicas)} running)",
+            "deployer",
+            {"pids": [r.pid for r in runtime.replicas]},
+        )
+        return runtime
+
+    def scale_deployment(
+        self, deployment_id: int, replicas: int, owner_id: int
+    ) -> ModelDeployment:
+        """Manually set the replica count of a running endpoint deployment"""
+        deployment = self.get_deployment(deployment_id)
+
+        if not deployment or deployment.owner_id != owner_id:
+            raise HTTPException(status_code=404, detail="Deployment not found")
+
+        if deployment.status != DeploymentStatus.RUNNING:
+            raise HTTPException(status_code=400, detail="Deployment is not running")
+
+        if not deployment.min_replicas <= replicas <= deployment.max_replicas:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Replicas must be between {deployment.min_replicas} "
+                f"and {deployment.max_replicas}",
+            )
+
+        runtime = runtime_manager.get(deployment_id)
+        if runtime is None:
+            raise HTTPException(
+                status_code=400, detail="Deployment has no local replicas to scale"
+            )
+
+        previous = len(runtime.live_replicas())
+        try:
+            current = runtime.scale_to(replicas)
+        except ReplicaStartError as e:
+            raise HTTPException(status_code=503, detail=f"Scaling failed: {e}")
+
+        self._log_deployment_event(
+            deployment_id,
+            "INFO",
+            f"Scaled from {previous} to {current} replicas by user",
+            "scaler",
+            {"from_replicas": previous, "to_replicas": current},
+        )
+        return deployment
+
+    def rollout_version(
+        self,
+        deployment_id: int,
+        model_version_id: int,
+        owner_id: int,
+        strategy: str = "blue_green",
+        rollback_window: Optional[int] = None,
+        steps: Optional[List[int]] = None,
+        step_interval: Optional[int] = None,
+    ) -> ModelDeployment:
+        """
+        Switch a running endpoint to another model version without downtime.
+
+        The new version is loaded and warmed on fresh replicas in the
+        background; traffic then moves atomically ("blue_green") or in
+        weighted steps ("gradual"). The previous version stays resident
+        for the rollback window.
+        """
+        deployment = self.get_deployment(deployment_id)
+
+        if not deployment or deployment.owner_id != owner_id:
+            raise HTTPException(status_code=404, detail="Deployment not found")
+
+        if (
+            deployment.status != DeploymentStatus.RUNNING
+            or runtime_manager.get(deployment_id) is None
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail="Rollouts require a running endpoint deployment",
+            )
+
+        if strategy not in ROLLOUT_STRATEGIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid strategy: {strategy}. Supported: {', '.join(ROLLOUT_STRATEGIES)}",
+            )
+
+        model_version = (
+            self.db.query(ModelVersion)
+            .filter(
+                ModelVersion.id == model_version_id,
+                ModelVersion.model_id == deployment.model_id,
+            )
+            .first()
+        )
+        if not model_version:
+            raise HTTPException(status_code=404, detail="Model version not found")
+
+        if model_version.id == deployment.model_version_id:
+            raise HTTPException(
+                status_code=400, detail="Deployment is already serving this version"
+            )
+
+        if runtime_manager.candidate(deployment_id):
+            raise HTTPException(status_code=409, detail="A rollout is already in progress")
+
+        # The comparison is against the version being replaced; keep its result
+        if shadow_mirror.detach(deployment_id):
+            self._log_deployment_event(
+                deployment_id, "INFO", "Shadow traffic ended by rollout", "shadow"
+            )
+
+        deployment.status = DeploymentStatus.UPDATING
+        self.db.commit()
+
+        self._log_deployment_event(
+            deployment_id,
+            "INFO",
+            f"Rollout to version {model_version.version} started ({strategy})",
+            "deployer",
+            {"model_version_id": model_version.id, "strategy": strategy},
+        )
+
+        threading.Thread(
+            target=_run_rollout,
+            args=(
+                deployment_id,
+                model_version.id,
+                strategy,
+                rollback_window if rollback_window is not None else settings.ROLLOUT_ROLLBACK_WINDOW,
+                steps or settings.ROLLOUT_STEPS,
+                step_interval if step_interval is not None else settings.ROLLOUT_STEP_INTERVAL,
+            ),
+            daemon=True,
+        ).start()
+
+        return deployment
+
+    def rollback_deployment(self, deployment_id: int, owner_id: int) -> ModelDeployment:
+        """Instantly switch back to the version kept resident by the last rollout"""
+        deployment = self.get_deployment(deployment_id)
+
+        if not deployment or deployment.owner_id != owner_id:
+            raise HTTPException(status_code=404, detail="Deployment not found")
+
+        if runtime_manager.candidate(deployment_id):
+            # Rollout still shifting traffic: drop the candidate instead
+            runtime_manager.abort_candidate(deployment_id)
+            self._log_deployment_event(
+                deployment_id, "WARNING", "Rollout cancelled by user", "deployer"
+            )
+            return deployment
+
+        restored = runtime_manager.rollback(deployment_id)
+        if restored is None:
+            raise HTTPException(
+                status_code=400,
+                detail="No previous version is resident (rollback window expired)",
+            )
+
+        previous_version_id = deployment.model_version_id
+        deployment.model_version_id = restored.model_version_id
+        deployment.status = DeploymentStatus.RUNNING
+        self.db.commit()
+
+        self._log_deployment_event(
+            deployment_id,
+            "WARNING",
+            f"Rolled back to version {restored.version}",
+            "deployer",
+            {
+                "from_model_version_id": previous_version_id,
+                "to_model_version_id": restored.model_version_id,
+            },
+        )
+        return deployment
+
+    def shadow_version(
+        self,
+        deployment_id: int,
+        model_version_id: int,
+        owner_id: int,
+        fraction: Optional[float] = None,
+        replicas: int = 1,
+    ) -> ModelDeployment:
+        """
+        Mirror a share of live predictions to another model version.
+
+        The version is loaded on its own replicas in the background; once
+        warm, ``fraction`` of the requests the active version serves are
+        copied to it off the response path and compared (see shadow.py).
+        """
+        deployment = self.get_deployment(deployment_id)
+
+        if not deployment or deployment.owner_id != owner_id:
+            raise HTTPException(status_code=404, detail="Deployment not found")
+
+        if (
+            deployment.status != DeploymentStatus.RUNNING
+            or runtime_manager.get(deployment_id) is None
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail="Shadow traffic requires a running endpoint deployment",
+            )
+
+        fraction = settings.SHADOW_DEFAULT_FRACTION if fraction is None else fraction
+        if not 0 < fraction <= 1:
+            raise HTTPException(status_code=400, detail="Fraction must be in (0, 1]")
+
+        model_version = (
+            self.db.query(ModelVersion)
+            .filter(
+                ModelVersion.id == model_version_id,
+                ModelVersion.model_id == deployment.model_id,
+            )
+            .first()
+        )
+        if not model_version:
+            raise HTTPException(status_code=404, detail="Model version not found")
+
+        if model_version.id == deployment.model_version_id:
+            raise HTTPException(
+                status_code=400, detail="Deployment is already serving this version"
+            )
+
+        if runtime_manager.shadow(deployment_id):
+            raise HTTPException(status_code=409, detail="Shadow traffic is already running")
+
+        self._log_deployment_event(
+            deployment_id,
+            "INFO",
+            f"Starting shadow traffic ({fraction:.0%}) to version {model_version.version}",
+            "shadow",
+            {"model_version_id": model_version.id, "fraction": fraction},
+        )
+
+        threading.Thread(
+            target=_run_shadow,
+            args=(deployment_id, model_version.id, fraction, max(replicas, 1)),
+            daemon=True,
+        ).start()
+
+        return deployment
+
+    def stop_shadow(self, deployment_id: int, owner_id: int) -> ModelDeployment:
+        """End shadow traffic and write the final comparison report"""
+        deployment = self.get_deployment(deployment_id)
+
+        if not deployment or deployment.owner_id != owner_id:
+            raise HTTPException(status_code=404, detail="Deployment not found")
+
+        if runtime_manager.shadow(deployment_id) is None:
+            raise HTTPException(status_code=400, detail="No shadow traffic is running")
+
+        report = shadow_mirror.detach(deployment_id)
+        self._log_deployment_event(
+            deployment_id,
+            "INFO",
+            "Shadow traffic stopped by user",
+            "shadow",
+            {k: report[k] for k in ("mirrored", "errors", "agreement_rate")} if report else {},
+        )
+        return deployment
+
+    def _start_shadow(
+        self, deployment_id: int, model_version_id: int, fraction: float, replicas: int
+    ):
+        """Start and warm the shadow replicas, then begin mirroring (runs off-request)"""
+        deployment = self.get_deployment(deployment_id)
+        model_version = self.db.get(ModelVersion, model_version_id)
+        if not deployment or not model_version:
+            return
+
+        config = deployment.deployment_config or {}
+        runtime = None
+        try:
+            runtime = runtime_manager.start_shadow(deployment, model_version, replicas)
+            runtime.warm_up(config.get("warmup_input"), settings.ROLLOUT_WARMUP_REQUESTS)
+        except ReplicaStartError as e:
+            if runtime is not None and runtime_manager.shadow(deployment_id) is runtime:
+                runtime_manager.stop_shadow(deployment_id)
+            self._log_deployment_event(
+                deployment_id, "ERROR", f"Shadow traffic failed to start: {e}", "shadow"
+            )
+            return
+
+        if runtime_manager.shadow(deployment_id) is not runtime:
+            return  # stopped while warming up
+        shadow_mirror.attach(deployment_id, deployment.model_version_id, runtime, fraction)
+        self._log_deployment_event(
+            deployment_id,
+            "INFO",
+            f"Mirroring {fraction:.0%} of traffic to version {model_version.version}",
+            "shadow",
+            {"pids": [r.pid for r in runtime.replicas]},
+        )
+
+    def _execute_rollout(
+        self,
+        deployment_id: int,
+        model_version_id: int,
+        strategy: str,
+        rollback_window: int,
+        steps: List[int],
+        step_interval: int,
+    ):
+        """Warm the candidate, shift traffic and promote it (runs off-request)"""
+        deployment = self.get_deployment(deployment_id)
+        model_version = self.db.get(ModelVersion, model_version_id)
+        active = runtime_manager.get(deployment_id)
+        if not deployment or not model_version or active is None:
+            return
+
+        def abort(message: str):
+            runtime_manager.abort_candidate(deployment_id)
+            if not self._finish_rollout(deployment_id):
+                return  # stopped or deleted underneath: nothing to go back to
+            self._log_deployment_event(
+                deployment_id, "ERROR", f"Rollout aborted: {message}", "deployer"
+            )
+
+        replicas = max(len(active.live_replicas()), deployment.min_replicas or 1)
+        config = deployment.deployment_config or {}
+        try:
+            candidate = runtime_manager.prepare_candidate(
+                deployment, model_version, replicas
+            )
+            candidate.warm_up(
+                config.get("warmup_input"), settings.ROLLOUT_WARMUP_REQUESTS
+            )
+        except ReplicaStartError as e:
+            abort(str(e))
+            return
+
+        self._log_deployment_event(
+            deployment_id,
+            "INFO",
+            f"Version {model_version.version} warm on {replicas} replica(s)",
+            "deployer",
+            {"pids": [r.pid for r in candidate.replicas]},
+        )
+
+        if strategy == "gradual":
+            for percent in steps:
+                if (
+                    runtime_manager.candidate(deployment_id) is not candidate
+                    or not self._rollout_in_progress(deployment_id)
+                ):
+                    abort("candidate was removed")
+                    return
+                runtime_manager.set_candidate_weight(deployment_id, percent / 100.0)
+                self._log_deployment_event(
+                    deployment_id,
+                    "INFO",
+                    f"Shifted {percent}% of traffic to version {model_version.version}",
+                    "deployer",
+                )
+                time.sleep(step_interval)
+                if candidate.error_rate() > settings.ROLLOUT_MAX_ERROR_RATE:
+                    abort(f"error rate {candidate.error_rate():.1%} on the new version")
+                    return
+
+        if not self._rollout_in_progress(deployment_id) or not runtime_manager.promote(
+            deployment_id, rollback_window
+        ):
+            abort("deployment stopped or rollout cancelled")
+            return
+
+        previous_version = deployment.model_version
+        if not self._finish_rollout(deployment_id, model_version_id=model_version.id):
+            # Stopped or deleted right after the check: don't leave the
+            # promoted replicas running without an owner
+            runtime_manager.stop(deployment_id)
+            return
+
+        self._log_deployment_event(
+            deployment_id,
+            "INFO",
+            f"Now serving version {model_version.version}; version "
+            f"{previous_version.version if previous_version else '?'} stays resident "
+            f"for {rollback_window}s for instant rollback",
+            "deployer",
+            {"model_version_id": model_version.id, "rollback_window": rollback_window},
+        )
+
+    def _rollout_in_progress(self, deployment_id: int) -> bool:
+        """Whether the deployment still exists and is UPDATING (read fresh)"""
+        status = (
+            self.db.query(ModelDeployment.status)
+            .filter(ModelDeployment.id == deployment_id)
+            .scalar()
+        )
+        return status == DeploymentStatus.UPDATING
+
+    def _finish_rollout(self, deployment_id: int, **values) -> bool:
+        """
+        Set an UPDATING deployment back to RUNNING; a deployment stopped or
+        deleted during the rollout is left as it is. Returns whether it was set.
+        """
+        values = {"status": DeploymentStatus.RUNNING, **values}
+        result = self.db.execute(
+            update(ModelDeployment)
+            .where(
+                ModelDeployment.id == deployment_id,
+                ModelDeployment.status == DeploymentStatus.UPDATING,
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        owner_id = None
+        if result.rowcount > 0:
+            owner_id = (
+                self.db.query(ModelDeployment.owner_id)
+                .filter(ModelDeployment.id == deployment_id)
+                .scalar()
+            )
+        self.db.commit()
+        if owner_id is None:
+            return False
+        # Bulk UPDATEs bypass the change-feed session hooks (see changes.py)
+        publish_change(owner_id, deployment_id, changes=values)
+        return True
+
     def get_deployment_metrics(self, deployment_id: int) -> DeploymentMetrics:
         """Get deployment metrics"""
-        deployment = self.get_deployment(deployment_id)
+        # Identity-map lookup: the route has usually loaded it already
+        deployment = self.db.get(ModelDeployment, deployment_id)
 
         if not deployment:
             raise HTTPException(status_code=404, detail="Deployment not found")
 
-        # TODO: Integrate with actual monitoring system
+        # Resource usage and latency percentiles are served from memory
+        runtime = runtime_manager.get(deployment_id)
+        latest = telemetry.latest(deployment_id)
+
         return DeploymentMetrics(
             request_count=deployment.request_count,
             avg_response_time=deployment.avg_response_time,
             last_request_at=deployment.last_request_at,
             last_health_check=deployment.last_health_check,
-            current_replicas=deployment.min_replicas,  # Placeholder
-            cpu_usage=None,  # Would come from monitoring
-            memory_usage=None,  # Would come from monitoring
+            current_replicas=len(runtime.live_replicas()) if runtime else 0,
+            cpu_usage=latest.cpu_usage if latest else None,
+            memory_usage=latest.memory_usage if latest else None,
+            replicas=runtime.routing_stats() if runtime else [],
+            telemetry=telemetry.series(deployment_id),
+            latency=metrics_recorder.latency_summary(deployment_id),
+            **(runtime.cold_start_stats() if runtime else {}),
         )
 
     def get_deployment_logs(
         self, deployment_id: int, limit: int = 100
     ) -> List[DeploymentLog]:
         """Get deployment logs"""
+        if deployment_log_sink.pending(deployment_id):
+            deployment_log_sink.flush()
         return (
             self.db.query(DeploymentLog)
             .filter(DeploymentLog.deployment_id == deployment_id)
@@ -262,18 +753,26 @@ class DeploymentService:
             .all()
         )
 
-    async def _deploy_model(self, deployment_id: int):
-        """Internal method to handle model deployment process"""
+    def _enqueue(self, deployment: ModelDeployment):
+        """Hand a PENDING deployment to the background orchestrator"""
+        from app.services.orchestrator import deployment_orchestrator
+
+        deployment_orchestrator.enqueue(deployment.id)
+
+    async def _deploy_model(self, deployment_id: int, report: Callable[..., None]):
+        """
+        Run the BUILDING -> DEPLOYING -> RUNNING pipeline for a deployment
+        claimed by the orchestrator; transitions are written through ``report``
+        """
         deployment = self.get_deployment(deployment_id)
         if not deployment:
             return
 
         try:
-            deployment.status = DeploymentStatus.BUILDING
-            self.db.commit()
-
-            self._log_deployment_event(
-                deployment_id, "INFO", "Starting model deployment process", "deployer"
+            report(
+                deployment_id,
+                DeploymentStatus.BUILDING,
+                "Starting model deployment process",
             )
 
             # Get model and version info
@@ -286,11 +785,29 @@ class DeploymentService:
             if not model_version:
                 raise Exception("Model version not found")
 
+            if not await asyncio.to_thread(artifact_exists, model_version.s3_path):
+                raise Exception("Model file not found on server")
+
             # Generate deployment configuration
             config = self._generate_deployment_config(deployment, model_version)
 
+            report(
+                deployment_id,
+                DeploymentStatus.DEPLOYING,
+                f"Deploying model version {model_version.version}",
+                log_metadata={"deployment_type": deployment.deployment_type.value},
+            )
+
             # Deploy based on type
             if deployment.deployment_type == DeploymentType.CONTAINER:
+                if container_runtime.client is None:
+                    report(
+                        deployment_id,
+                        DeploymentStatus.DEPLOYING,
+                        "No container daemon available; running as local replicas",
+                        "WARNING",
+                        container_runtime.status(),
+                    )
                 endpoint_url = await self._deploy_container(
                     deployment, model_version, config
                 )
@@ -303,29 +820,31 @@ class DeploymentService:
                     deployment, model_version, config
                 )
 
-            # Update deployment with success
-            deployment.status = DeploymentStatus.RUNNING
-            deployment.endpoint_url = endpoint_url
-            deployment.deployed_at = datetime.utcnow()
-            self.db.commit()
-
-            self._log_deployment_event(
+            runtime = runtime_manager.get(deployment_id)
+            report(
                 deployment_id,
-                "INFO",
+                DeploymentStatus.RUNNING,
                 f"Deployment successful. Endpoint: {endpoint_url}",
-                "deployer",
+                log_metadata={"pids": [r.pid for r in runtime.replicas] if runtime else []},
+                endpoint_url=endpoint_url,
+                error_message=None,
+                deployed_at=datetime.utcnow(),
             )
 
         except Exception as e:
-            # Update deployment with error
-            deployment.status = DeploymentStatus.FAILED
-            deployment.error_message = str(e)
-            self.db.commit()
-
-            self._log_deployment_event(
-                deployment_id, "ERROR", f"Deployment failed: {str(e)}", "deployer"
+            report(
+                deployment_id,
+                DeploymentStatus.FAILED,
+                f"Deployment failed: {str(e)}",
+                "ERROR",
+                error_message=str(e),
+                endpoint_url=None,
             )
 
+    def _endpoint_url(self, deployment_id: int) -> str:
+        """Public URL of the predict proxy for a deployment"""
+        return f"{settings.API_V1_STR}/deployments/{deployment_id}/predict"
+
     def _generate_deployment_config(
         self, deployment: ModelDeployment, model_version: ModelVersion
     ) -> Dict[str, Any]:
@@ -352,6 +871,11 @@ class DeploymentService:
         # This is a simplified implementation
         # In production, this would interact with Kubernetes or Docker Swarm
 
+        if container_runtime.client is None:
+            # No daemon: serve from local replicas instead
+            await asyncio.to_thread(runtime_manager.start, deployment, model_version)
+            return self._endpoint_url(deployment.id)
+
         deployment_name = f"model-{deployment.id}"
 
         # For now, simulate deployment with a mock endpoint
@@ -371,10 +895,10 @@ class DeploymentService:
         model_version: ModelVersion,
         config: Dict[str, Any],
     ) -> str:
-        """Deploy model as serverless function"""
-        # This would integrate with AWS Lambda, Google Cloud Functions, etc.
-        await asyncio.sleep(1)  # Simulate deployment time
-        return f"https://serverless.modelhub.com/v1/deployments/{deployment.id}/predict"
+        """Deploy model as a scale-to-zero local runtime"""
+        # Registers the runtime without replicas; the first request cold-starts it
+        await asyncio.to_thread(runtime_manager.start, deployment, model_version)
+        return self._endpoint_url(deployment.id)
 
     async def _deploy_endpoint(
         self,
@@ -382,10 +906,9 @@ class DeploymentService:
         model_version: ModelVersion,
         config: Dict[str, Any],
     ) -> str:
-        """Deploy model as dedicated endpoint"""
-        # This would integrate with cloud ML platforms like SageMaker, Vertex AI, etc.
-        await asyncio.sleep(3)  # Simulate deployment time
-        return f"https://endpoint.modelhub.com/v1/deployments/{deployment.id}/predict"
+        """Deploy model as dedicated endpoint backed by warm local replicas"""
+        await asyncio.to_thread(runtime_manager.start, deployment, model_version)
+        return self._endpoint_url(deployment.id)
 
     def _log_deployment_event(
         self,
@@ -395,13 +918,34 @@ class DeploymentService:
         component: str,
         log_metadata: Dict[str, Any] = None,
     ):
-        """Log deployment event"""
-        log_entry = DeploymentLog(
-            deployment_id=deployment_id,
-            log_level=level,
-            message=message,
-            component=component,
-            log_metadata=log_metadata or {},
-        )
-        self.db.add(log_entry)
-        self.db.commit()
+        """Log deployment event (written behind by the log sink)"""
+        deployment_log_sink.emit(deployment_id, level, message, component, log_metadata)
+
+
+def _run_rollout(deployment_id: int, *args):
+    """Thread entry point: run a rollout with its own database session"""
+    db = SessionLocal()
+    try:
+        DeploymentService(db)._execute_rollout(deployment_id, *args)
+    except Exception:
+        logger.exception(f"Rollout of deployment {deployment_id} failed")
+        runtime_manager.abort_candidate(deployment_id)
+        try:
+            db.rollback()
+            DeploymentService(db)._finish_rollout(deployment_id)
+        except Exception:
+            logger.exception(f"Ending the failed rollout of deployment {deployment_id} failed")
+    finally:
+        db.close()
+
+
+def _run_shadow(deployment_id: int, *args):
+    """Thread entry point: start shadow traffic with its own database session"""
+    db = SessionLocal()
+    try:
+        DeploymentService(db)._start_shadow(deployment_id, *args)
+    except Exception:
+        logger.exception(f"Shadow traffic for deployment {deployment_id} failed")
+        runtime_manager.stop_shadow(deployment_id)
+    finally:
+        db.close()
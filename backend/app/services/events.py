@@ -0,0 +1,226 @@
+"""
+events.py — In-process event hub with replayable, cursor-addressed topics.
+
+Each topic (e.g. ``("logs", deployment_id)``) keeps its last
+EVENT_BUFFER_SIZE events in a ring buffer. Every event gets a cursor
+``<epoch>-<seq>``, where seq increases per topic and epoch identifies
+this process. A subscriber passes the last cursor it saw (``since``) and
+first receives the buffered events after it, then live ones. A cursor
+from another process, or one older than the buffer, cannot be resumed
+exactly; the subscriber is told so (``complete=False``) and gets the
+whole buffer.
+
+Publishing is thread-safe and never blocks. The event is appended once
+and pushed to every subscriber's bounded queue on that subscriber's
+event loop. A subscriber whose queue overflows is marked lagged and
+should resubscribe from its last cursor. Dropping a topic closes its
+subscriptions.
+
+A topic without subscribers that nobody published to, subscribed to or
+replayed for EVENT_TOPIC_RETENTION is expired, so topics of users and
+deployments long gone do not keep their buffers forever. A topic created
+again starts its seq above every cursor this process has issued, so a
+cursor from before the expiry is reported as not resumable.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+Event = Tuple[str, Any]  # (cursor, data)
+
+
+class Subscription:
+    """One consumer's queue of live events on a topic"""
+
+    def __init__(self, topic: Hashable, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.topic = topic
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize)
+        self.lagged = False
+        self.closed = False
+
+    def _deliver(self, event: Event):
+        if self.lagged or self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    def _close(self):
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)  # wake a waiting get()
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next live event, or None on timeout, lag or close"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class _Topic:
+    __slots__ = ("buffer", "subscribers", "start", "seq", "primed", "touched")
+
+    def __init__(self, size: int, start: int):
+        self.buffer: Deque[Tuple[int, Any]] = deque(maxlen=size)
+        self.subscribers: Set[Subscription] = set()
+        self.start = start  # cursors below it predate this topic
+        self.seq = start
+        self.primed = False
+        self.touched = time.monotonic()
+
+
+class EventHub:
+    """Ring-buffered topics with cursor replay and fan-out to subscribers"""
+
+    def __init__(
+        self,
+        buffer_size: int = settings.EVENT_BUFFER_SIZE,
+        subscriber_queue: int = settings.EVENT_SUBSCRIBER_QUEUE,
+        retention: float = settings.EVENT_TOPIC_RETENTION,
+    ):
+        self.buffer_size = buffer_size
+        self.subscriber_queue = subscriber_queue
+        self.retention = retention
+        self.epoch = uuid.uuid4().hex[:8]
+        self._topics: Dict[Hashable, _Topic] = {}
+        self._issued = 0  # highest seq issued on any topic
+        self._expired_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def cursor(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def _seq(self, cursor: Optional[str]) -> Optional[int]:
+        """Sequence number of a cursor from this process, else None"""
+        if not cursor:
+            return None
+        epoch, _, seq = cursor.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _topic(self, topic: Hashable) -> _Topic:
+        now = time.monotonic()
+        if now - self._expired_at >= self.retention / 4:
+            self._expire(now)
+        state = self._topics.get(topic)
+        if state is None:
+            state = self._topics[topic] = _Topic(self.buffer_size, self._issued)
+        state.touched = now
+        return state
+
+    def _expire(self, now: float):
+        """Forget idle topics nobody is subscribed to (called under the lock)"""
+        self._expired_at = now
+        idle = [
+            topic
+            for topic, state in self._topics.items()
+            if not state.subscribers and now - state.touched >= self.retention
+        ]
+        for topic in idle:
+            del self._topics[topic]
+
+    def _append(self, state: _Topic, data: Any):
+        state.seq += 1
+        state.buffer.append((state.seq, data))
+        self._issued = max(self._issued, state.seq)
+
+    def publish(self, topic: Hashable, data: Any) -> str:
+        """Append an event and fan it out; returns its cursor"""
+        with self._lock:
+            state = self._topic(topic)
+            self._append(state, data)
+            event = (self.cursor(state.seq), data)
+            subscribers = list(state.subscribers)
+        for subscription in subscribers:
+            if not subscription.loop.is_closed():
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+        return event[0]
+
+    def head(self, topic: Hashable) -> str:
+        """Cursor of the latest event on a topic (``<epoch>-0`` if none yet)"""
+        with self._lock:
+            return self.cursor(self._topic(topic).seq)
+
+    def prime(self, topic: Hashable, load: Callable[[], List[Any]]):
+        """Seed an empty topic once, e.g. with recent rows from the database"""
+        with self._lock:
+            state = self._topic(topic)
+            if state.primed or state.buffer:
+                state.primed = True
+                return
+            state.primed = True
+        events = load()
+        with self._lock:
+            if state.buffer:
+                return  # live events arrived meanwhile; they are newer
+            for data in events[-self.buffer_size:]:
+                self._append(state, data)
+
+    def replay(self, topic: Hashable, since: Optional[str] = None) -> Tuple[List[Event], bool]:
+        """
+        Buffered events after ``since`` (all of them without a cursor), and
+        whether that is everything published after it.
+        """
+        with self._lock:
+            return self._replay(self._topic(topic), since)
+
+    def _replay(self, state: _Topic, since: Optional[str]) -> Tuple[List[Event], bool]:
+        seq = self._seq(since)
+        if (
+            seq is None
+            or seq < state.start
+            or (state.buffer and seq < state.buffer[0][0] - 1)
+            or seq > state.seq
+        ):
+            complete = since is None
+            seq = 0
+        else:
+            complete = True
+        return [(self.cursor(s), d) for s, d in state.buffer if s > seq], complete
+
+    async def subscribe(
+        self, topic: Hashable, since: Optional[str] = None
+    ) -> Tuple[Subscription, List[Event], bool]:
+        """Register a subscriber; returns it with the backlog to send first"""
+        subscription = Subscription(
+            topic, asyncio.get_running_loop(), self.subscriber_queue
+        )
+        with self._lock:
+            state = self._topic(topic)
+            backlog, complete = self._replay(state, since)
+            state.subscribers.add(subscription)
+        return subscription, backlog, complete
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            state = self._topics.get(subscription.topic)
+            if state is not None:
+                state.subscribers.discard(subscription)
+                state.touched = time.monotonic()  # retained for a reconnect
+
+    def subscriber_count(self, topic: Hashable) -> int:
+        state = self._topics.get(topic)
+        return len(state.subscribers) if state else 0
+
+    def drop(self, topic: Hashable):
+        """Forget a topic (e.g. its deployment was deleted)"""
+        with self._lock:
+            state = self._topics.pop(topic, None)
+            subscribers = list(state.subscribers) if state else []
+        for subscription in subscribers:
+            if not subscription.loop.is_closed():
+                subscription.loop.call_soon_threadsafe(subscription._close)
+
+
+event_hub = EventHub()
@@ -0,0 +1,221 @@
+"""
+log_sink.py — Write-behind sink for DeploymentLog rows.
+
+``emit`` only appends the event (stamped with its own time) to a
+bounded in-memory queue, so logging never costs the caller a commit.
+The event is also published right away to the deployment's EventHub
+topic, which feeds live log tails. A background task writes the queue
+with one bulk INSERT when it reaches LOG_SINK_BATCH_SIZE events or every
+LOG_SINK_FLUSH_INTERVAL seconds, whichever comes first. Everything still
+queued is written on shutdown.
+
+When the queue holds LOG_SINK_MAX_QUEUE events (e.g. the database is
+down), new events are dropped and counted. Reads of a deployment's logs
+flush first, so callers see their own events. Without a running event
+loop (scripts, one-off sessions) every emit is written immediately.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.deployment import DeploymentLog, ModelDeployment
+from app.services.events import event_hub
+
+logger = logging.getLogger(__name__)
+
+
+def log_topic(deployment_id: int):
+    """EventHub topic carrying a deployment's log events"""
+    return ("logs", deployment_id)
+
+
+def publish_log(event: Dict[str, Any]):
+    """Push a log event to live tails (see /deployments/{id}/logs/stream)"""
+    event_hub.publish(log_topic(event["deployment_id"]), event)
+
+
+def recent_logs(deployment_id: int, limit: int) -> List[Dict[str, Any]]:
+    """Latest persisted log events of a deployment, oldest first"""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(DeploymentLog)
+            .filter(DeploymentLog.deployment_id == deployment_id)
+            .order_by(DeploymentLog.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "deployment_id": row.deployment_id,
+                "log_level": row.log_level,
+                "message": row.message,
+                "component": row.component,
+                "log_metadata": row.log_metadata or {},
+                "created_at": row.created_at,
+            }
+            for row in reversed(rows)
+        ]
+    finally:
+        db.close()
+
+
+class DeploymentLogSink:
+    """Bounded queue of log events flushed to deployment_logs in batches"""
+
+    def __init__(
+        self,
+        batch_size: int = settings.LOG_SINK_BATCH_SIZE,
+        flush_interval: float = settings.LOG_SINK_FLUSH_INTERVAL,
+        max_queue: int = settings.LOG_SINK_MAX_QUEUE,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        # Serialises flushes so rows are written in emit order
+        self._flush_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def emit(
+        self,
+        deployment_id: int,
+        level: str,
+        message: str,
+        component: str,
+        log_metadata: Optional[Dict[str, Any]] = None,
+    ):
+        """Queue one log event; never blocks on the database"""
+        event = {
+            "deployment_id": deployment_id,
+            "log_level": level,
+            "message": message,
+            "component": component,
+            "log_metadata": log_metadata or {},
+            "created_at": datetime.utcnow(),
+        }
+        publish_log(event)
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._queue.append(event)
+            depth = len(self._queue)
+
+        if self._task is None:
+            self.flush()
+        elif depth >= self.batch_size:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def pending(self, deployment_id: int) -> bool:
+        with self._lock:
+            return any(e["deployment_id"] == deployment_id for e in self._queue)
+
+    def discard(self, deployment_id: int):
+        """Drop queued events of a deployment that is being deleted"""
+        with self._lock:
+            kept = [e for e in self._queue if e["deployment_id"] != deployment_id]
+            self._queue = deque(kept)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the flush loop and write everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await run_in_threadpool(self.flush)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                logger.exception("Deployment log flush failed")
+
+    def flush(self):
+        """Write all queued events in batches of ``batch_size``"""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [
+                        self._queue.popleft()
+                        for _ in range(min(self.batch_size, len(self._queue)))
+                    ]
+                if not batch:
+                    return
+                try:
+                    self._write(batch)
+                except Exception:
+                    self.failed_flushes += 1
+                    self._requeue(batch)
+                    raise
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            try:
+                db.execute(insert(DeploymentLog), batch)
+                db.commit()
+            except IntegrityError:
+                # A deployment was deleted meanwhile; keep events of live ones
+                db.rollback()
+                ids = {e["deployment_id"] for e in batch}
+                live = {
+                    i
+                    for (i,) in db.query(ModelDeployment.id).filter(ModelDeployment.id.in_(ids))
+                }
+                kept = [e for e in batch if e["deployment_id"] in live]
+                self.dropped += len(batch) - len(kept)
+                if kept:
+                    db.execute(insert(DeploymentLog), kept)
+                    db.commit()
+                batch = kept
+            self.written += len(batch)
+            self.flushes += 1
+        finally:
+            db.close()
+
+    def _requeue(self, batch: List[Dict[str, Any]]):
+        """Put a failed batch back at the head of the queue, as far as it fits"""
+        with self._lock:
+            room = max(self.max_queue - len(self._queue), 0)
+            self.dropped += max(len(batch) - room, 0)
+            self._queue.extendleft(reversed(batch[:room]))
+
+
+deployment_log_sink = DeploymentLogSink()
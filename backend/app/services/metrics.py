@@ -0,0 +1,442 @@
+"""
+metrics.py — Request and latency history for deployments.
+
+The predict route records every request into an in-process per-minute
+bucket (count, errors, LatencySketch, plus the same per serving model
+version) at O(1) cost. Every
+METRICS_FLUSH_INTERVAL seconds the closed minutes are written to
+``deployment_metric_rollups``. Each minute is merged into its 1m, 1h and
+1d rows in the same write, so the coarser series are always up to date
+and need no separate rollup job. Minute rows expire after a couple of
+days, hourly rows after weeks and daily rows after years.
+
+Buckets merge by addition, so several API processes flushing the same
+minute end up with the combined counts. After each flush the recorder
+reloads the last METRICS_LATENCY_WINDOW minutes of rows, so the metrics
+endpoint can report fleet-wide p50/p90/p99/p999 without a query.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.deployment import DeploymentMetricRollup, ModelDeployment
+from app.runtime.sketch import LatencySketch
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+
+def _retention(resolution: int) -> timedelta:
+    days = {
+        60: settings.METRICS_MINUTE_RETENTION_DAYS,
+        3600: settings.METRICS_HOUR_RETENTION_DAYS,
+        86400: settings.METRICS_DAY_RETENTION_DAYS,
+    }[resolution]
+    return timedelta(days=days)
+
+
+def _align(moment: datetime, resolution: int) -> datetime:
+    """Start of the bucket containing ``moment``"""
+    epoch = datetime(1970, 1, 1)
+    seconds = int((moment - epoch).total_seconds())
+    return epoch + timedelta(seconds=seconds - seconds % resolution)
+
+
+class MetricsBucket:
+    """
+    Requests, errors and latencies for one deployment over one bucket,
+    with the same counters broken down by serving model version.
+    """
+
+    __slots__ = ("requests", "errors", "sketch", "last_request_at", "versions")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.sketch = LatencySketch()
+        self.last_request_at: Optional[datetime] = None
+        self.versions: Dict[int, "MetricsBucket"] = {}
+
+    def add(
+        self,
+        latency_ms: float,
+        error: bool = False,
+        model_version_id: Optional[int] = None,
+        at: Optional[datetime] = None,
+    ):
+        self.requests += 1
+        self.errors += error
+        self.sketch.add(latency_ms)
+        self.last_request_at = at or self.last_request_at
+        if model_version_id is not None:
+            version = self.versions.get(model_version_id)
+            if version is None:
+                version = self.versions[model_version_id] = MetricsBucket()
+            version.add(latency_ms, error)
+
+    def merge(self, other: "MetricsBucket"):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.sketch.merge(other.sketch)
+        if other.last_request_at and (
+            self.last_request_at is None or other.last_request_at > self.last_request_at
+        ):
+            self.last_request_at = other.last_request_at
+        for model_version_id, version in other.versions.items():
+            self.versions.setdefault(model_version_id, MetricsBucket()).merge(version)
+
+    def summary(self) -> Dict:
+        """Counts plus mean and p50/p90/p99/p999 latency (ms)"""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests else 0.0,
+            "mean_ms": self.sketch.mean,
+            "max_ms": self.sketch.max,
+            **{f"{k}_ms": v for k, v in self.sketch.percentiles().items()},
+        }
+
+    @classmethod
+    def from_row(cls, row: DeploymentMetricRollup) -> "MetricsBucket":
+        bucket = cls()
+        bucket.requests = row.request_count or 0
+        bucket.errors = row.error_count or 0
+        bucket.sketch = LatencySketch.from_dict(row.latency_sketch)
+        for model_version_id, stats in (row.version_stats or {}).items():
+            version = bucket.versions[int(model_version_id)] = cls()
+            version.requests = stats.get("requests", 0)
+            version.errors = stats.get("errors", 0)
+            version.sketch = LatencySketch.from_dict(stats.get("latency_sketch"))
+        return bucket
+
+    def version_stats(self) -> Dict[str, Dict]:
+        """JSON form of the per-version breakdown for the rollup row"""
+        return {
+            str(model_version_id): {
+                "requests": version.requests,
+                "errors": version.errors,
+                "latency_sketch": version.sketch.to_dict(),
+            }
+            for model_version_id, version in self.versions.items()
+        }
+
+
+class MetricsRecorder:
+    """In-process minute buckets, flushed to the rollup table in the background"""
+
+    def __init__(self, flush_interval: float = settings.METRICS_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._buckets: Dict[Tuple[int, datetime], MetricsBucket] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Latency over the last METRICS_LATENCY_WINDOW minutes as persisted by
+        # every process, refreshed after each flush: {deployment_id: {minute: bucket}}
+        self._window: Dict[int, Dict[datetime, MetricsBucket]] = {}
+
+    def record(
+        self,
+        deployment_id: int,
+        latency_ms: float,
+        error: bool = False,
+        model_version_id: Optional[int] = None,
+    ):
+        now = datetime.utcnow()
+        key = (deployment_id, _align(now, 60))
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = MetricsBucket()
+            bucket.add(latency_ms, error, model_version_id, now)
+
+    def discard(self, deployment_id: int):
+        """Drop unwritten buckets and the window of a deployment being deleted"""
+        with self._lock:
+            for key in [k for k in self._buckets if k[0] == deployment_id]:
+                del self._buckets[key]
+        self._window.pop(deployment_id, None)
+
+    def pending(self, deployment_id: int) -> Dict[datetime, MetricsBucket]:
+        """Minute buckets not yet written to the database"""
+        with self._lock:
+            return {
+                minute: bucket
+                for (d, minute), bucket in self._buckets.items()
+                if d == deployment_id
+            }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Cancel the flush loop and write everything, including the open minute"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await run_in_threadpool(self.flush, True)
+
+    async def _run(self):
+        while True:
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                logger.exception("Metrics flush failed")
+            await asyncio.sleep(self.flush_interval)
+
+    def flush(self, include_open: bool = False):
+        """
+        Write closed (or, at shutdown, all) minute buckets to the database,
+        then reload the latency window from what all processes have written.
+        """
+        current = _align(datetime.utcnow(), 60)
+        with self._lock:
+            keys = [k for k in self._buckets if include_open or k[1] < current]
+            taken = {k: self._buckets.pop(k) for k in keys}
+
+        db = SessionLocal()
+        try:
+            service = MetricsService(db)
+            if taken:
+                try:
+                    service.write_buckets(taken)
+                except Exception:
+                    # Put the data back so the next flush retries it
+                    with self._lock:
+                        for key, bucket in taken.items():
+                            existing = self._buckets.get(key)
+                            if existing is None:
+                                self._buckets[key] = bucket
+                            else:
+                                existing.merge(bucket)
+                    raise
+            self._window = service.recent_minutes(
+                timedelta(minutes=settings.METRICS_LATENCY_WINDOW)
+            )
+        finally:
+            db.close()
+
+    def latency_summary(self, deployment_id: int) -> Dict:
+        """
+        Request counts and latency percentiles over the latency window, for
+        the deployment and per model version, served from memory: persisted
+        minutes (all processes, as of the last flush) plus this process's
+        unflushed minutes.
+        """
+        cutoff = _align(datetime.utcnow(), 60) - timedelta(
+            minutes=settings.METRICS_LATENCY_WINDOW
+        )
+        minutes = dict(self._window.get(deployment_id, {}))
+        total = MetricsBucket()
+        for minute, bucket in minutes.items():
+            if minute >= cutoff:
+                total.merge(bucket)
+        for minute, bucket in self.pending(deployment_id).items():
+            if minute >= cutoff:
+                total.merge(bucket)
+        return {
+            **total.summary(),
+            "window_minutes": settings.METRICS_LATENCY_WINDOW,
+            "versions": [
+                {"model_version_id": model_version_id, **version.summary()}
+                for model_version_id, version in sorted(total.versions.items())
+            ],
+        }
+
+
+class MetricsService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def write_buckets(self, buckets: Dict[Tuple[int, datetime], MetricsBucket]):
+        """Merge minute buckets into their 1m/1h/1d rows and prune expired rows"""
+        try:
+            self._write_buckets(buckets)
+        except IntegrityError:
+            # Another process inserted one of the same rows first (merge into
+            # it), or a deployment was deleted meanwhile (skipped on retry)
+            self.db.rollback()
+            self._write_buckets(buckets)
+
+    def _write_buckets(self, buckets: Dict[Tuple[int, datetime], MetricsBucket]):
+        # Buckets of deployments deleted since they were recorded are dropped:
+        # their rows would violate the foreign key, failing every later flush
+        ids = {deployment_id for deployment_id, _ in buckets}
+        live = {
+            i for (i,) in self.db.query(ModelDeployment.id).filter(ModelDeployment.id.in_(ids))
+        }
+        per_deployment: Dict[int, MetricsBucket] = {}
+        for (deployment_id, minute), bucket in buckets.items():
+            if deployment_id not in live:
+                continue
+            for resolution in RESOLUTIONS.values():
+                self._merge_row(deployment_id, resolution, _align(minute, resolution), bucket)
+            per_deployment.setdefault(deployment_id, MetricsBucket()).merge(bucket)
+
+        # Keep the snapshot columns on ModelDeployment current
+        for deployment_id, total in per_deployment.items():
+            deployment = self.db.get(ModelDeployment, deployment_id)
+            if deployment is None or not total.requests:
+                continue
+            previous = deployment.request_count or 0
+            previous_avg = deployment.avg_response_time or 0.0
+            deployment.request_count = previous + total.requests
+            deployment.avg_response_time = (
+                previous_avg * previous + total.sketch.sum
+            ) / deployment.request_count
+            if total.last_request_at and (
+                deployment.last_request_at is None
+                or total.last_request_at > deployment.last_request_at.replace(tzinfo=None)
+            ):
+                deployment.last_request_at = total.last_request_at
+
+        now = datetime.utcnow()
+        for resolution in RESOLUTIONS.values():
+            self.db.query(DeploymentMetricRollup).filter(
+                DeploymentMetricRollup.resolution == resolution,
+                DeploymentMetricRollup.bucket_start < now - _retention(resolution),
+            ).delete(synchronize_session=False)
+        self.db.commit()
+
+    def _merge_row(
+        self, deployment_id: int, resolution: int, start: datetime, bucket: MetricsBucket
+    ):
+        row = (
+            self.db.query(DeploymentMetricRollup)
+            .filter(
+                DeploymentMetricRollup.deployment_id == deployment_id,
+                DeploymentMetricRollup.resolution == resolution,
+                DeploymentMetricRollup.bucket_start == start,
+            )
+            # Row lock, so concurrent flushes from other processes add up
+            # instead of overwriting each other's read-modify-write
+            .with_for_update()
+            .first()
+        )
+        if row is None:
+            row = DeploymentMetricRollup(
+                deployment_id=deployment_id,
+                resolution=resolution,
+                bucket_start=start,
+                request_count=0,
+                error_count=0,
+            )
+            self.db.add(row)
+        merged = MetricsBucket.from_row(row)
+        merged.merge(bucket)
+        row.request_count = merged.requests
+        row.error_count = merged.errors
+        row.latency_sketch = merged.sketch.to_dict()
+        row.version_stats = merged.version_stats()
+        # Flush so a later minute in this batch finds the row just added
+        self.db.flush()
+
+    def get_history(
+        self,
+        deployment_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        resolution: Optional[str] = None,
+        model_version_id: Optional[int] = None,
+    ) -> Dict:
+        """
+        Request rate, error rate and latency percentiles over [start, end),
+        optionally only for requests served by one model version.
+        """
+        end = (end or datetime.utcnow()).replace(tzinfo=None)
+        start = (start or end - timedelta(hours=1)).replace(tzinfo=None)
+        if start >= end:
+            raise HTTPException(status_code=400, detail="start must be before end")
+
+        if resolution is None:
+            span = end - start
+            resolution = "1m" if span <= timedelta(hours=6) else (
+                "1h" if span <= timedelta(days=14) else "1d"
+            )
+        if resolution not in RESOLUTIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid resolution. Must be one of: {', '.join(RESOLUTIONS)}",
+            )
+        seconds = RESOLUTIONS[resolution]
+        first = _align(start, seconds)
+
+        buckets: Dict[datetime, MetricsBucket] = {}
+        rows = (
+            self.db.query(DeploymentMetricRollup)
+            .filter(
+                DeploymentMetricRollup.deployment_id == deployment_id,
+                DeploymentMetricRollup.resolution == seconds,
+                DeploymentMetricRollup.bucket_start >= first,
+                DeploymentMetricRollup.bucket_start < end,
+            )
+            .order_by(DeploymentMetricRollup.bucket_start)
+            .all()
+        )
+        for row in rows:
+            buckets[row.bucket_start] = MetricsBucket.from_row(row)
+
+        # Include minutes this process has not flushed yet
+        for minute, pending in metrics_recorder.pending(deployment_id).items():
+            if first <= minute < end:
+                buckets.setdefault(_align(minute, seconds), MetricsBucket()).merge(pending)
+
+        points = []
+        for bucket_start in sorted(buckets):
+            bucket = buckets[bucket_start]
+            if model_version_id is not None:
+                bucket = bucket.versions.get(model_version_id)
+                if bucket is None:
+                    continue
+            summary = bucket.summary()
+            points.append(
+                {
+                    "timestamp": bucket_start,
+                    "requests": bucket.requests,
+                    "errors": bucket.errors,
+                    "request_rate": bucket.requests / seconds,
+                    "error_rate": summary["error_rate"],
+                    "avg_latency_ms": summary["mean_ms"],
+                    "max_latency_ms": summary["max_ms"],
+                    "p50_ms": summary["p50_ms"],
+                    "p90_ms": summary["p90_ms"],
+                    "p99_ms": summary["p99_ms"],
+                    "p999_ms": summary["p999_ms"],
+                }
+            )
+        return {
+            "deployment_id": deployment_id,
+            "model_version_id": model_version_id,
+            "resolution": resolution,
+            "start": first,
+            "end": end,
+            "points": points,
+        }
+
+    def recent_minutes(self, window: timedelta) -> Dict[int, Dict[datetime, MetricsBucket]]:
+        """Minute rows of every deployment within ``window``, by deployment"""
+        since = _align(datetime.utcnow(), 60) - window
+        rows = (
+            self.db.query(DeploymentMetricRollup)
+            .filter(
+                DeploymentMetricRollup.resolution == 60,
+                DeploymentMetricRollup.bucket_start >= since,
+            )
+            .all()
+        )
+        minutes: Dict[int, Dict[datetime, MetricsBucket]] = {}
+        for row in rows:
+            minutes.setdefault(row.deployment_id, {})[row.bucket_start] = MetricsBucket.from_row(row)
+        return minutes
+
+
+metrics_recorder = MetricsRecorder()
@@ -1,6 +1,7 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from app.models.model import Model, ModelVersion
+from app.models.model import Model, ModelBlob, ModelVersion
 from app.schemas.model import (
     ModelCreate,
     ModelUpdate,
@@ -8,6 +9,7 @@ from app.schemas.model import (
     ModelVersionUpdate,
 )
 from fastapi import HTTPException
+from app.services.variants import variant_builder
 import datetime
 
 
@@ -60,6 +62,7 @@ def create_model_with_version(
     owner_id: int,
     s3_path: str,
     size_mb: float,
+    content_hash: Optional[str] = None,
 ) -> Model:
     """Create a new model with its first version"""
     # Check if model with same name exists
@@ -90,11 +93,15 @@ def create_model_with_version(
         **version_data,
         model_id=db_model.id,
         s3_path=s3_path,
+        content_hash=content_hash,
         size_mb=size_mb,
     )
+    if content_hash:
+        acquire_blob(db, content_hash, size_mb)
     db.add(db_version)
     db.commit()
     db.refresh(db_version)
+    variant_builder.notify()
 
     return db_model
 
@@ -105,6 +112,7 @@ def create_model_version(
     version_in: ModelVersionCreate,
     s3_path: str,
     size_mb: float,
+    content_hash: Optional[str] = None,
 ) -> ModelVersion:
     """Create a new version for an existing model"""
     # Check if model exists
@@ -126,8 +134,11 @@ def create_model_version(
         **version_data,
         model_id=model_id,
         s3_path=s3_path,
+        content_hash=content_hash,
         size_mb=size_mb,
     )
+    if content_hash:
+        acquire_blob(db, content_hash, size_mb)
     db.add(db_version)
 
     # Update model's current version
@@ -136,6 +147,7 @@ def create_model_version(
 
     db.commit()
     db.refresh(db_version)
+    variant_builder.notify()
     return db_version
 
 
@@ -177,11 +189,49 @@ def delete_model(db: Session, model_id: int) -> Model:
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
 
+    for version in db_model.versions:
+        if version.content_hash:
+            release_blob(db, version.content_hash)
     db.delete(db_model)  # This will cascade delete all versions
     db.commit()
     return db_model
 
 
+def get_blob(db: Session, sha256: Optional[str]) -> Optional[ModelBlob]:
+    """The stored blob with this content hash"""
+    if not sha256:
+        return None
+    return db.query(ModelBlob).filter(ModelBlob.sha256 == sha256).first()
+
+
+def acquire_blob(db: Session, sha256: str, size_mb: float) -> ModelBlob:
+    """Count one more version referencing a stored blob (caller commits)"""
+    blob = db.query(ModelBlob).filter(ModelBlob.sha256 == sha256).with_for_update().first()
+    if blob is None:
+        try:
+            with db.begin_nested():
+                blob = ModelBlob(
+                    sha256=sha256, size_bytes=round(size_mb * 1024 * 1024), ref_count=0
+                )
+                db.add(blob)
+        except IntegrityError:
+            # Same content uploaded concurrently; count against that row
+            blob = db.query(ModelBlob).filter(ModelBlob.sha256 == sha256).with_for_update().one()
+    blob.ref_count += 1
+    return blob
+
+
+def release_blob(db: Session, sha256: str):
+    """
+    Count one version fewer referencing a blob (caller commits). Blobs
+    left without references stay stored, so a re-upload is still
+    deduplicated, until garbage collection removes them.
+    """
+    blob = db.query(ModelBlob).filter(ModelBlob.sha256 == sha256).with_for_update().first()
+    if blob is not None and blob.ref_count > 0:
+        blob.ref_count -= 1
+
+
 def increment_downloads(db: Session, model_id: int) -> Model:
     """Increment download count for a model"""
     db_model = get_model(db, model_id)
@@ -0,0 +1,362 @@
+"""
+orchestrator.py — Background pipeline that brings deployments up.
+
+Creating or starting a deployment only marks it PENDING and wakes the
+orchestrator, so the request returns immediately. The orchestrator claims
+PENDING rows (oldest first, at most DEPLOY_MAX_CONCURRENCY in flight) and
+runs DeploymentService._deploy_model on each:
+
+    PENDING -> BUILDING -> DEPLOYING -> RUNNING   (or FAILED)
+
+The PENDING rows are the queue, so nothing is lost on restart. A claim
+is a lease: the claiming process renews ``updated_at`` of its in-flight
+rows every quarter of DEPLOY_LEASE_TIMEOUT. Every process periodically
+sends BUILDING or DEPLOYING rows whose lease has lapsed (their process
+died or restarted) back to PENDING, to be deployed again. Rows another
+live worker is still deploying keep their lease and are left alone.
+
+Status transitions and their log entries are buffered and written
+together every DEPLOY_STATUS_FLUSH_INTERVAL seconds. Each write only
+applies while the row is still in flight. If a deployment was stopped or
+deleted mid-pipeline, its transitions are dropped and any replicas the
+pipeline started are stopped.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, update
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.deployment import DeploymentLog, DeploymentStatus, ModelDeployment
+from app.runtime.manager import runtime_manager
+from app.services.changes import UNTRACKED, publish_change
+from app.services.deployment import DeploymentService
+from app.services.log_sink import publish_log
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT = (DeploymentStatus.BUILDING, DeploymentStatus.DEPLOYING)
+
+
+def _owners(db, deployment_ids) -> Dict[int, int]:
+    """Owner of each deployment, for publishing changes made by bulk UPDATEs"""
+    if not deployment_ids:
+        return {}
+    return dict(
+        db.query(ModelDeployment.id, ModelDeployment.owner_id)
+        .filter(ModelDeployment.id.in_(deployment_ids))
+        .all()
+    )
+
+
+class StatusWriter:
+    """Buffers status transitions and log entries for one batched write"""
+
+    def __init__(self):
+        self._changes: Dict[int, Dict[str, Any]] = {}
+        self._logs: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def report(
+        self,
+        deployment_id: int,
+        status: DeploymentStatus,
+        message: str,
+        level: str = "INFO",
+        log_metadata: Optional[Dict[str, Any]] = None,
+        **fields,
+    ):
+        """Queue a transition (plus any column values) and its log entry"""
+        with self._lock:
+            change = self._changes.setdefault(deployment_id, {})
+            change.update(fields, status=status, updated_at=datetime.utcnow())
+            event = {
+                "deployment_id": deployment_id,
+                "log_level": level,
+                "message": message,
+                "component": "deployer",
+                "log_metadata": log_metadata or {},
+                "created_at": datetime.utcnow(),
+            }
+            self._logs.append(event)
+        publish_log(event)
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def flush(self) -> List[int]:
+        """Write buffered transitions; returns deployments no longer in flight"""
+        with self._lock:
+            changes, self._changes = self._changes, {}
+            logs, self._logs = self._logs, []
+        if not changes:
+            return []
+
+        db = SessionLocal()
+        lost = []
+        try:
+            for deployment_id, values in changes.items():
+                result = db.execute(
+                    update(ModelDeployment)
+                    .where(
+                        ModelDeployment.id == deployment_id,
+                        ModelDeployment.status.in_(IN_FLIGHT),
+                    )
+                    .values(**values)
+                )
+                if result.rowcount == 0:
+                    lost.append(deployment_id)
+            db.bulk_insert_mappings(
+                DeploymentLog, [log for log in logs if log["deployment_id"] not in lost]
+            )
+            owners = _owners(db, [d for d in changes if d not in lost])
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                # Keep newer transitions queued since; retry the rest
+                for deployment_id, values in changes.items():
+                    self._changes[deployment_id] = {**values, **self._changes.get(deployment_id, {})}
+                self._logs[:0] = logs
+            raise
+        finally:
+            db.close()
+        for deployment_id, owner_id in owners.items():
+            values = changes[deployment_id]
+            publish_change(
+                owner_id, deployment_id, changes={k: v for k, v in values.items() if k not in UNTRACKED}
+            )
+        return lost
+
+
+class DeploymentOrchestrator:
+    """Claims PENDING deployments and deploys them with bounded parallelism"""
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.DEPLOY_MAX_CONCURRENCY,
+        poll_interval: float = settings.DEPLOY_POLL_INTERVAL,
+        flush_interval: float = settings.DEPLOY_STATUS_FLUSH_INTERVAL,
+        lease_timeout: float = settings.DEPLOY_LEASE_TIMEOUT,
+    ):
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+        self.flush_interval = flush_interval
+        self.lease_timeout = lease_timeout
+        self.writer = StatusWriter()
+        self._inflight: Set[int] = set()
+        self._superseded: Set[int] = set()  # stopped/deleted while in flight
+        self._jobs: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._tasks = [
+            self._loop.create_task(self._dispatch()),
+            self._loop.create_task(self._flush_loop()),
+        ]
+
+    async def stop(self):
+        """Cancel the pipelines; in-flight deployments resume on next start"""
+        for task in self._tasks + list(self._jobs):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._jobs, return_exceptions=True)
+        self._tasks, self._jobs = [], set()
+        self._inflight.clear()
+        await self._flush()
+        self._loop = self._wake = None
+
+    def enqueue(self, deployment_id: int):
+        """Wake the dispatcher for a deployment just set PENDING; thread-safe"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "in_flight": sorted(self._inflight),
+            "max_concurrency": self.max_concurrency,
+            "pending_writes": len(self.writer),
+        }
+
+    async def _dispatch(self):
+        recovered_at = 0.0
+        while True:
+            if time.monotonic() - recovered_at >= self.lease_timeout / 2:
+                recovered_at = time.monotonic()
+                try:
+                    await run_in_threadpool(self._recover)
+                except Exception:
+                    logger.exception("Recovering interrupted deployments failed")
+            try:
+                free = self.max_concurrency - len(self._inflight)
+                if free > 0:
+                    for deployment_id in await run_in_threadpool(self._claim, free):
+                        self._inflight.add(deployment_id)
+                        job = asyncio.get_running_loop().create_task(self._deploy(deployment_id))
+                        self._jobs.add(job)
+                        job.add_done_callback(self._jobs.discard)
+            except Exception:
+                logger.exception("Claiming pending deployments failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _recover(self):
+        """Requeue in-flight deployments whose claiming process stopped renewing them"""
+        db = SessionLocal()
+        try:
+            lapsed = (
+                ModelDeployment.status.in_(IN_FLIGHT),
+                ModelDeployment.id.notin_(self._inflight),
+                or_(
+                    ModelDeployment.updated_at.is_(None),
+                    ModelDeployment.updated_at
+                    < datetime.utcnow() - timedelta(seconds=self.lease_timeout),
+                ),
+            )
+            interrupted = (
+                db.query(ModelDeployment.id, ModelDeployment.owner_id).filter(*lapsed).all()
+            )
+            if not interrupted:
+                return
+            for deployment_id, _ in interrupted:
+                db.add(
+                    DeploymentLog(
+                        deployment_id=deployment_id,
+                        log_level="WARNING",
+                        message="Deployment interrupted by a restart; requeued",
+                        component="deployer",
+                        log_metadata={},
+                    )
+                )
+            db.query(ModelDeployment).filter(
+                ModelDeployment.id.in_([i for i, _ in interrupted]), *lapsed
+            ).update(
+                {ModelDeployment.status: DeploymentStatus.PENDING},
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+        for deployment_id, owner_id in interrupted:
+            publish_change(owner_id, deployment_id, changes={"status": DeploymentStatus.PENDING})
+
+    def _claim(self, limit: int) -> List[int]:
+        """Move up to ``limit`` of the oldest PENDING deployments to BUILDING"""
+        db = SessionLocal()
+        try:
+            candidates = (
+                db.query(ModelDeployment.id, ModelDeployment.owner_id)
+                .filter(
+                    ModelDeployment.status == DeploymentStatus.PENDING,
+                    ModelDeployment.id.notin_(self._inflight),
+                )
+                .order_by(ModelDeployment.id)
+                .limit(limit)
+                .all()
+            )
+            claimed = []
+            for deployment_id, _ in candidates:
+                # Conditional, so a concurrent stop or another process wins cleanly
+                result = db.execute(
+                    update(ModelDeployment)
+                    .where(
+                        ModelDeployment.id == deployment_id,
+                        ModelDeployment.status == DeploymentStatus.PENDING,
+                    )
+                    .values(status=DeploymentStatus.BUILDING, error_message=None)
+                )
+                if result.rowcount:
+                    claimed.append(deployment_id)
+            db.commit()
+        finally:
+            db.close()
+        owners = dict(candidates)
+        for deployment_id in claimed:
+            publish_change(
+                owners[deployment_id],
+                deployment_id,
+                changes={"status": DeploymentStatus.BUILDING, "error_message": None},
+            )
+        return claimed
+
+    async def _deploy(self, deployment_id: int):
+        db = SessionLocal()
+        try:
+            await DeploymentService(db)._deploy_model(deployment_id, self.writer.report)
+        except Exception:
+            logger.exception(f"Deployment {deployment_id} pipeline failed")
+        finally:
+            db.close()
+            self._inflight.discard(deployment_id)
+            # Write the outcome before this slot is reused
+            await self._flush()
+            self._wake.set()
+
+    async def _flush_loop(self):
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+            if self._inflight and time.monotonic() - renewed_at >= self.lease_timeout / 4:
+                renewed_at = time.monotonic()
+                try:
+                    await run_in_threadpool(self._renew, list(self._inflight))
+                except Exception:
+                    logger.exception("Renewing deployment leases failed")
+
+    def _renew(self, deployment_ids: List[int]):
+        """Extend the lease on this process's in-flight deployments"""
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(ModelDeployment)
+                .where(
+                    ModelDeployment.id.in_(deployment_ids),
+                    ModelDeployment.status.in_(IN_FLIGHT),
+                )
+                .values(updated_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _flush(self):
+        try:
+            lost = await run_in_threadpool(self.writer.flush)
+        except Exception:
+            logger.exception("Writing deployment status failed")
+            return
+        self._superseded.update(lost)
+        for deployment_id in [d for d in self._superseded if d not in self._inflight]:
+            self._superseded.discard(deployment_id)
+            await run_in_threadpool(self._discard, deployment_id)
+
+    def _discard(self, deployment_id: int):
+        """Stop replicas of a deployment stopped or deleted mid-pipeline"""
+        db = SessionLocal()
+        try:
+            deployment = db.get(ModelDeployment, deployment_id)
+            if deployment is None or deployment.status in (
+                DeploymentStatus.STOPPED,
+                DeploymentStatus.FAILED,
+            ):
+                runtime_manager.stop(deployment_id)
+        finally:
+            db.close()
+
+
+deployment_orchestrator = DeploymentOrchestrator()
@@ -0,0 +1,251 @@
+"""
+shadow.py — Mirror live predictions to a candidate model version.
+
+While shadowing, a share (``fraction``) of the predictions a deployment's
+active version serves is copied to a shadow runtime running the candidate
+version (see RuntimeManager.start_shadow). The copy is sent from a
+background task after the response has gone out, so clients never wait
+for the candidate and never see its output. At most SHADOW_MAX_INFLIGHT
+copies are outstanding; beyond that requests are skipped, not queued.
+
+For every mirrored request the latency of both versions and whether
+their outputs agree (numbers within SHADOW_TOLERANCE) are recorded. The
+comparison is written every SHADOW_REPORT_INTERVAL seconds, and when
+shadowing ends, into the candidate's ``performance_metrics["shadow"]``
+keyed by deployment id, so a promotion can be judged on production
+traffic:
+
+    {"baseline_model_version_id": 3, "mirrored": 1200, "agreement_rate": 0.998,
+     "baseline": {"p50_ms": 4.1, ...}, "candidate": {"p50_ms": 3.2, ...},
+     "latency_delta_ms": {"p50": -0.9, "p99": -2.4}, ...}
+"""
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.model import ModelVersion
+from app.runtime.manager import DeploymentRuntime, runtime_manager
+from app.services.metrics import MetricsBucket
+
+logger = logging.getLogger(__name__)
+
+
+def outputs_agree(a: Any, b: Any, tolerance: float = settings.SHADOW_TOLERANCE) -> bool:
+    """Structural equality, with numbers compared to a relative tolerance"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return math.isclose(a, b, rel_tol=tolerance, abs_tol=tolerance)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(outputs_agree(x, y, tolerance) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(outputs_agree(a[k], b[k], tolerance) for k in a)
+    return a == b
+
+
+class ShadowSession:
+    """Comparison of one deployment's active version with a shadow version"""
+
+    def __init__(
+        self,
+        deployment_id: int,
+        baseline_model_version_id: int,
+        runtime: DeploymentRuntime,
+        fraction: float,
+    ):
+        self.deployment_id = deployment_id
+        self.baseline_model_version_id = baseline_model_version_id
+        self.runtime = runtime
+        self.fraction = fraction
+        self.started_at = datetime.utcnow()
+        self.baseline = MetricsBucket()  # active version, mirrored requests only
+        self.candidate = MetricsBucket()
+        self.agreements = 0
+        self.skipped = 0
+        self.inflight = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    @property
+    def model_version_id(self) -> int:
+        return self.runtime.model_version_id
+
+    def add(self, baseline_ms: float, candidate_ms: float, error: bool, agreed: bool):
+        with self._lock:
+            self.baseline.add(baseline_ms)
+            self.candidate.add(candidate_ms, error)
+            self.agreements += agreed
+            self.dirty = True
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            baseline = self.baseline.summary()
+            candidate = self.candidate.summary()
+            compared = self.candidate.requests - self.candidate.errors
+            skipped = self.skipped
+        return {
+            "deployment_id": self.deployment_id,
+            "model_version_id": self.model_version_id,
+            "baseline_model_version_id": self.baseline_model_version_id,
+            "fraction": self.fraction,
+            "started_at": self.started_at.isoformat(),
+            "updated_at": datetime.utcnow().isoformat(),
+            "mirrored": candidate["requests"],
+            "skipped": skipped,
+            "errors": candidate["errors"],
+            "agreements": self.agreements,
+            "agreement_rate": self.agreements / compared if compared else None,
+            "baseline": baseline,
+            "candidate": candidate,
+            "latency_delta_ms": {
+                q: (
+                    candidate[f"{q}_ms"] - baseline[f"{q}_ms"]
+                    if candidate[f"{q}_ms"] is not None and baseline[f"{q}_ms"] is not None
+                    else None
+                )
+                for q in ("p50", "p90", "p99")
+            },
+        }
+
+
+class ShadowMirror:
+    """Active shadow sessions, the mirroring tasks and the report writer"""
+
+    def __init__(
+        self,
+        max_inflight: int = settings.SHADOW_MAX_INFLIGHT,
+        report_interval: float = settings.SHADOW_REPORT_INTERVAL,
+    ):
+        self.max_inflight = max_inflight
+        self.report_interval = report_interval
+        self._sessions: Dict[int, ShadowSession] = {}
+        self._mirrors: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, deployment_id: int) -> Optional[ShadowSession]:
+        return self._sessions.get(deployment_id)
+
+    def attach(
+        self, deployment_id: int, baseline_model_version_id: int, runtime: DeploymentRuntime, fraction: float
+    ) -> ShadowSession:
+        """Start mirroring to a shadow runtime that is up and warm"""
+        session = ShadowSession(deployment_id, baseline_model_version_id, runtime, fraction)
+        self._sessions[deployment_id] = session
+        return session
+
+    def detach(self, deployment_id: int) -> Optional[Dict[str, Any]]:
+        """Stop mirroring, write the final report and stop the shadow runtime"""
+        session = self._sessions.pop(deployment_id, None)
+        runtime_manager.stop_shadow(deployment_id)
+        if session is None:
+            return None
+        report = session.report()
+        self._write(session.model_version_id, deployment_id, report)
+        return report
+
+    def mirror(
+        self,
+        deployment_id: int,
+        runtime: DeploymentRuntime,
+        payload: Dict[str, Any],
+        result: Dict[str, Any],
+        latency_ms: float,
+    ):
+        """Maybe copy a served request to the shadow version; never blocks"""
+        session = self._sessions.get(deployment_id)
+        # Only compare against the version the session started from (not a
+        # rollout candidate or a version swapped in since)
+        if session is None or runtime.model_version_id != session.baseline_model_version_id:
+            return
+        if random.random() >= session.fraction:
+            return
+        if session.inflight >= self.max_inflight:
+            session.skipped += 1
+            return
+        session.inflight += 1
+        task = asyncio.get_running_loop().create_task(
+            self._mirror(session, payload, result, latency_ms)
+        )
+        self._mirrors.add(task)
+        task.add_done_callback(self._mirrors.discard)
+
+    async def _mirror(
+        self, session: ShadowSession, payload: Dict[str, Any], result: Dict[str, Any], latency_ms: float
+    ):
+        started = time.perf_counter()
+        try:
+            shadow_result = await session.runtime.predict(payload)
+        except Exception as e:
+            logger.debug(f"Deployment {session.deployment_id}: shadow prediction failed: {e}")
+            session.add(latency_ms, (time.perf_counter() - started) * 1000.0, True, False)
+            return
+        finally:
+            session.inflight -= 1
+        session.add(
+            latency_ms,
+            (time.perf_counter() - started) * 1000.0,
+            False,
+            outputs_agree(result.get("prediction"), shadow_result.get("prediction")),
+        )
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer and write the reports of running sessions"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._mirrors):
+            task.cancel()
+        await run_in_threadpool(self.flush)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                logger.exception("Writing shadow reports failed")
+
+    def flush(self):
+        """Write changed reports; drop sessions whose shadow runtime is gone"""
+        for deployment_id, session in list(self._sessions.items()):
+            if runtime_manager.shadow(deployment_id) is not session.runtime:
+                # Deployment stopped or deleted: its replicas went with it
+                self._sessions.pop(deployment_id, None)
+            elif not session.dirty:
+                continue
+            session.dirty = False
+            self._write(session.model_version_id, deployment_id, session.report())
+
+    def _write(self, model_version_id: int, deployment_id: int, report: Dict[str, Any]):
+        db = SessionLocal()
+        try:
+            version = (
+                db.query(ModelVersion)
+                .filter(ModelVersion.id == model_version_id)
+                .with_for_update()
+                .first()
+            )
+            if version is None:
+                return
+            metrics = dict(version.performance_metrics or {})
+            metrics["shadow"] = {**(metrics.get("shadow") or {}), str(deployment_id): report}
+            version.performance_metrics = metrics
+            db.commit()
+        finally:
+            db.close()
+
+
+shadow_mirror = ShadowMirror()
@@ -0,0 +1,201 @@
+"""
+tiering.py — Moves rarely used blobs to a compressed archive tier.
+
+A blob is HOT while its original bytes are stored. It becomes ARCHIVED
+when only its compressed variants remain (see services/variants.py), so
+archiving costs nothing to build and reclaims the original size minus
+the smallest variant. Every load or download goes through
+storage.artifact_path / download_response. Those record the access and,
+for an archived blob, decompress the variant back into place ("promote")
+before returning, after checking the content hash.
+
+Accesses are kept in memory (storage.access_log) and written to
+``ModelBlob.last_accessed_at`` on every run, every TIERING_INTERVAL
+seconds. When HOT blobs take more than TIERING_HOT_HIGH_BYTES, the least
+recently used ones are archived until they are under
+TIERING_HOT_LOW_BYTES. A blob is only archived when all of these hold:
+
+  - it has been idle for TIERING_MIN_IDLE seconds
+  - it has a stored variant
+  - no deployment that isn't STOPPED or FAILED uses one of its versions
+
+``stats()`` (in /health) sets the space reclaimed against the
+promotion latency that is its cost.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, func
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.deployment import DeploymentStatus, ModelDeployment
+from app.models.model import ModelBlob, ModelVersion, StorageTier
+from app.runtime.sketch import LatencySketch
+from app.utils.storage import access_log, archive_blob, blob_key
+
+logger = logging.getLogger(__name__)
+
+
+class TieringJob:
+    """Writes blob accesses and archives cold blobs above the capacity target"""
+
+    def __init__(
+        self,
+        interval: float = settings.TIERING_INTERVAL,
+        high_bytes: int = settings.TIERING_HOT_HIGH_BYTES,
+        low_bytes: int = settings.TIERING_HOT_LOW_BYTES,
+        min_idle: float = settings.TIERING_MIN_IDLE,
+        batch_size: int = settings.TIERING_BATCH_SIZE,
+    ):
+        self.interval = interval
+        self.high_bytes = high_bytes
+        self.low_bytes = low_bytes
+        self.min_idle = min_idle
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.promotion_ms = LatencySketch()
+        self.promotions = 0
+        self.archived = 0  # by this process
+        self.hot_bytes = 0
+        self.archived_bytes = 0  # original size of archived blobs
+        self.bytes_reclaimed = 0  # of those, not taken up by their variant
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hot_bytes": self.hot_bytes,
+            "archived_bytes": self.archived_bytes,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "high_bytes": self.high_bytes,
+            "low_bytes": self.low_bytes,
+            "archived": self.archived,
+            "promotions": self.promotions,
+            "promotion_ms": self.promotion_ms.percentiles(),
+        }
+
+    def start(self):
+        if self._task is None and settings.TIERING_ENABLED:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the job and write the accesses recorded since its last run"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await run_in_threadpool(self.flush_accesses)
+
+    async def _run(self):
+        while True:
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception:
+                logger.exception("Storage tiering run failed")
+            await asyncio.sleep(self.interval)
+
+    def run_once(self):
+        self.flush_accesses()
+        db = SessionLocal()
+        try:
+            self._totals(db)
+            if self.hot_bytes > self.high_bytes:
+                self._archive(db, self.hot_bytes - self.low_bytes)
+                self._totals(db)
+        finally:
+            db.close()
+
+    def flush_accesses(self):
+        touched, promotions = access_log.drain()
+        if not touched and not promotions:
+            return
+        db = SessionLocal()
+        try:
+            if touched:
+                # One executemany; blobs deleted meanwhile just match no row
+                blobs = ModelBlob.__table__
+                db.execute(
+                    blobs.update()
+                    .where(blobs.c.sha256 == bindparam("blob_sha256"))
+                    .values(last_accessed_at=bindparam("accessed_at")),
+                    [{"blob_sha256": sha, "accessed_at": at} for sha, at in touched.items()],
+                )
+            if promotions:
+                db.query(ModelBlob).filter(
+                    ModelBlob.sha256.in_({sha256 for sha256, _ in promotions})
+                ).update({"tier": StorageTier.HOT}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        for sha256, seconds in promotions:
+            self.promotion_ms.add(seconds * 1000.0)
+            logger.info(f"Blob {sha256[:12]} promoted from archive in {seconds * 1000.0:.0f} ms")
+        self.promotions += len(promotions)
+
+    def _totals(self, db):
+        sizes = dict(
+            db.query(ModelBlob.tier, func.sum(ModelBlob.size_bytes))
+            .filter(ModelBlob.ref_count > 0)
+            .group_by(ModelBlob.tier)
+            .all()
+        )
+        self.hot_bytes = int(sizes.get(StorageTier.HOT) or 0)
+        self.archived_bytes = int(sizes.get(StorageTier.ARCHIVED) or 0)
+        archived = db.query(ModelBlob.size_bytes, ModelBlob.variants).filter(
+            ModelBlob.tier == StorageTier.ARCHIVED, ModelBlob.ref_count > 0
+        )
+        self.bytes_reclaimed = sum(
+            size - min((variants or {}).values(), default=size)
+            for size, variants in archived.yield_per(1000)
+        )
+
+    def _archive(self, db, excess: int):
+        """Archive least recently used blobs until ``excess`` bytes are freed"""
+        in_use = (
+            db.query(ModelVersion.content_hash)
+            .join(ModelDeployment, ModelDeployment.model_version_id == ModelVersion.id)
+            .filter(
+                ModelDeployment.status.notin_([DeploymentStatus.STOPPED, DeploymentStatus.FAILED]),
+                ModelVersion.content_hash.isnot(None),
+            )
+        )
+        last_used = func.coalesce(ModelBlob.last_accessed_at, ModelBlob.created_at)
+        candidates = (
+            db.query(ModelBlob.sha256, ModelBlob.size_bytes, ModelBlob.variants)
+            .filter(
+                ModelBlob.tier == StorageTier.HOT,
+                ModelBlob.ref_count > 0,
+                ModelBlob.variants.isnot(None),
+                last_used < datetime.utcnow() - timedelta(seconds=self.min_idle),
+                ModelBlob.sha256.notin_(in_use.scalar_subquery()),
+            )
+            .order_by(last_used, ModelBlob.sha256)
+        )
+        archived = skipped = 0
+        while excess > 0 and archived < self.batch_size:
+            # Archived rows leave the result, so the next page starts after the skipped ones
+            page = candidates.offset(skipped).limit(100).all()
+            if not page:
+                break
+            for sha256, size, variants in page:
+                if excess <= 0 or archived >= self.batch_size:
+                    break
+                # Incompressible ({}: archiving frees nothing), accessed meanwhile,
+                # or its variant is missing
+                if not variants or not archive_blob(blob_key(sha256)):
+                    skipped += 1
+                    continue
+                db.query(ModelBlob).filter(ModelBlob.sha256 == sha256).update(
+                    {"tier": StorageTier.ARCHIVED}, synchronize_session=False
+                )
+                db.commit()
+                excess -= size
+                archived += 1
+                logger.info(
+                    f"Blob {sha256[:12]} archived ({size} bytes, variant {min(variants.values())})"
+                )
+        self.archived += archived
+
+
+tiering_job = TieringJob()
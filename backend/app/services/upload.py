@@ -0,0 +1,361 @@
+"""
+upload.py — Resumable chunked uploads of model artifacts.
+
+Large artifacts are uploaded in three steps instead of one multipart
+request:
+
+    POST /models/uploads                       -> session (id, chunk_size)
+    PUT  /models/uploads/{id}?offset=<n>       -> one chunk; any order, in parallel
+    POST /models/uploads/{id}/complete         -> the new ModelVersion
+
+The session row records the model and version to create. A part file of
+the full size is allocated under blobs/tmp, and each chunk is written in
+place at its offset, so completing needs no assembly step. Every chunk
+is ``chunk_size`` bytes except the last. Written chunks are recorded in
+upload_chunks. After an interruption, GET /models/uploads/{id} lists the
+missing chunks, and only those are sent again.
+
+The SHA-256 is computed while chunks stream in. A chunk that arrives at
+the hashed prefix's end is hashed on the fly. Chunks that arrived ahead
+of it are read back (they were just written, so usually from page cache)
+once the gap closes. Only a process restart, a chunk landing on another
+worker, or a chunk rewritten after it was hashed makes completion hash
+from disk. Completion hands the file to the storage backend under its
+content hash and creates the version through create_model_version (or
+create_model_with_version for a new model). A complete request first
+claims the session (a conditional update of ``completing_at``), so of
+two concurrent completes only one stores the file and creates the
+version; the other gets 409, and chunks or aborts meanwhile are refused.
+Sessions not completed within UPLOAD_SESSION_TTL of their last chunk
+(or of their claim) are purged.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiofiles
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.model import ModelVersion, UploadChunk, UploadSession
+from app.schemas.model import ModelCreate, ModelVersionCreate
+from app.services.model import (
+    create_model_version,
+    create_model_with_version,
+    get_model,
+    get_model_by_name,
+    get_model_version,
+)
+from app.utils.storage import CHUNK_SIZE, blob_key, storage, temp_dir
+
+_COMPLETING = "Upload is being completed"
+
+
+class _Digest:
+    """SHA-256 of an upload's contiguous prefix, in this process"""
+
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.offset = 0  # bytes hashed so far
+        self.busy = False  # a chunk at ``offset`` is being hashed while it streams
+        self.valid = True  # False once hashed bytes may have been rewritten
+        self.lock = threading.Lock()
+
+
+_digests: Dict[str, _Digest] = {}
+_digests_lock = threading.Lock()
+
+
+def _digest(session_id: str) -> _Digest:
+    with _digests_lock:
+        digest = _digests.get(session_id)
+        if digest is None:
+            digest = _digests[session_id] = _Digest()
+        return digest
+
+
+def part_path(session_id: str) -> str:
+    return os.path.join(temp_dir(), f"upload-{session_id}.part")
+
+
+def chunk_count(session: UploadSession) -> int:
+    return -(-session.size_bytes // session.chunk_size)
+
+
+def chunk_length(session: UploadSession, index: int) -> int:
+    return min(session.chunk_size, session.size_bytes - index * session.chunk_size)
+
+
+def received_chunks(db: Session, session_id: str, start: int = 0) -> List[int]:
+    return [
+        i
+        for (i,) in db.query(UploadChunk.chunk_index)
+        .filter(UploadChunk.session_id == session_id, UploadChunk.chunk_index >= start)
+        .order_by(UploadChunk.chunk_index)
+    ]
+
+
+def missing_chunks(db: Session, session: UploadSession) -> List[int]:
+    received = set(received_chunks(db, session.id))
+    return [i for i in range(chunk_count(session)) if i not in received]
+
+
+def get_upload_session(db: Session, session_id: str) -> Optional[UploadSession]:
+    """An unexpired upload session"""
+    return (
+        db.query(UploadSession)
+        .filter(UploadSession.id == session_id, UploadSession.expires_at > datetime.utcnow())
+        .first()
+    )
+
+
+def create_upload_session(
+    db: Session,
+    owner_id: int,
+    size_bytes: int,
+    version_in: ModelVersionCreate,
+    model_id: Optional[int] = None,
+    model_in: Optional[ModelCreate] = None,
+    chunk_size: Optional[int] = None,
+    sha256: Optional[str] = None,
+) -> UploadSession:
+    """Open an upload; fails now on conflicts completion would hit"""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    if not 0 < size_bytes <= settings.UPLOAD_MAX_SIZE:
+        raise HTTPException(
+            status_code=400, detail=f"size_bytes must be 1..{settings.UPLOAD_MAX_SIZE}"
+        )
+    if not 0 < chunk_size <= settings.UPLOAD_MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=400, detail=f"chunk_size must be 1..{settings.UPLOAD_MAX_CHUNK_SIZE}"
+        )
+    if model_id is not None:
+        if not get_model(db, model_id):
+            raise HTTPException(status_code=404, detail="Model not found")
+        if get_model_version(db, model_id, version_in.version):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Version {version_in.version} already exists for this model",
+            )
+    elif model_in is None:
+        raise HTTPException(status_code=400, detail="Either model_id or model is required")
+    elif get_model_by_name(db, model_in.name):
+        raise HTTPException(status_code=400, detail="Model with this name already exists")
+
+    purge_expired_uploads(db)
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        owner_id=owner_id,
+        model_id=model_id,
+        model_fields=model_in.model_dump() if model_id is None else None,
+        version_fields=version_in.model_dump(),
+        size_bytes=size_bytes,
+        chunk_size=chunk_size,
+        sha256=sha256.lower() if sha256 else None,
+        expires_at=datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL),
+    )
+    os.makedirs(temp_dir(), exist_ok=True)
+    with open(part_path(session.id), "wb") as f:
+        f.truncate(size_bytes)  # sparse; chunks fill it in place
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+
+async def write_chunk(
+    db: Session, session: UploadSession, offset: int, body: AsyncIterator[bytes]
+):
+    """Write the chunk starting at ``offset`` from a streamed request body"""
+    if session.completing_at is not None:
+        raise HTTPException(status_code=409, detail=_COMPLETING)
+    if offset < 0 or offset % session.chunk_size or offset >= session.size_bytes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"offset must be a multiple of chunk_size ({session.chunk_size}) below size_bytes",
+        )
+    index = offset // session.chunk_size
+    length = chunk_length(session, index)
+
+    digest = _digest(session.id)
+    with digest.lock:
+        feeding = digest.valid and not digest.busy and digest.offset == offset
+        if feeding:
+            digest.busy = True
+            saved = digest.sha.copy()
+        elif offset <= digest.offset:
+            # Re-sent chunk: the bytes hashed may not be the bytes kept
+            digest.valid = False
+
+    written = 0
+    try:
+        async with aiofiles.open(part_path(session.id), "r+b") as f:
+            await f.seek(offset)
+            async for piece in body:
+                written += len(piece)
+                if written > length:
+                    raise HTTPException(
+                        status_code=413, detail=f"Chunk {index} must be {length} bytes"
+                    )
+                if feeding:
+                    digest.sha.update(piece)
+                await f.write(piece)
+        if written != length:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} must be {length} bytes")
+    except BaseException:
+        if feeding:
+            with digest.lock:
+                digest.sha = saved
+                digest.busy = False
+        if written:
+            # Partly overwritten: the chunk has to be sent again
+            db.query(UploadChunk).filter(
+                UploadChunk.session_id == session.id, UploadChunk.chunk_index == index
+            ).delete()
+            db.commit()
+        raise
+
+    if feeding:
+        with digest.lock:
+            digest.offset += length
+            digest.busy = False
+
+    try:
+        with db.begin_nested():
+            db.add(UploadChunk(session_id=session.id, chunk_index=index))
+    except IntegrityError:
+        pass  # chunk sent again; already recorded
+    session.expires_at = datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    db.commit()
+
+    # Hash chunks that arrived ahead of the prefix, now that the gap may be closed
+    if digest.valid and digest.offset < session.size_bytes:
+        received = received_chunks(db, session.id, digest.offset // session.chunk_size)
+        await run_in_threadpool(_advance, digest, session, received)
+
+
+def _advance(digest: _Digest, session: UploadSession, received: List[int]):
+    with digest.lock:
+        if digest.busy or not digest.valid:
+            return
+        with open(part_path(session.id), "rb") as f:
+            for index in received:
+                if index * session.chunk_size != digest.offset:
+                    break
+                f.seek(digest.offset)
+                remaining = chunk_length(session, index)
+                while remaining:
+                    data = f.read(min(CHUNK_SIZE, remaining))
+                    digest.sha.update(data)
+                    remaining -= len(data)
+                digest.offset += chunk_length(session, index)
+
+
+def _finish_digest(session: UploadSession) -> str:
+    with _digests_lock:
+        digest = _digests.pop(session.id, None)
+    if digest is None or digest.busy or not digest.valid:
+        digest = _Digest()  # hash everything from disk
+    with open(part_path(session.id), "rb") as f:
+        f.seek(digest.offset)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.sha.update(chunk)
+    return digest.sha.hexdigest()
+
+
+async def complete_upload(db: Session, session: UploadSession) -> ModelVersion:
+    """Store the assembled file by content and create its ModelVersion"""
+    missing = missing_chunks(db, session)
+    if missing:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload is incomplete", "missing_chunks": missing},
+        )
+
+    now = datetime.utcnow()
+    claimed = (
+        db.query(UploadSession)
+        .filter(UploadSession.id == session.id, UploadSession.completing_at.is_(None))
+        .update(
+            {
+                UploadSession.completing_at: now,
+                UploadSession.expires_at: now + timedelta(seconds=settings.UPLOAD_SESSION_TTL),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if not claimed:
+        # Another request completes it (or completed it: the row is gone)
+        raise HTTPException(status_code=409, detail=_COMPLETING)
+
+    try:
+        sha256 = await run_in_threadpool(_finish_digest, session)
+        if session.sha256 and sha256 != session.sha256:
+            abort_upload(db, session)
+            raise HTTPException(
+                status_code=422, detail=f"Upload has SHA-256 {sha256}, expected {session.sha256}"
+            )
+
+        s3_path = blob_key(sha256)
+        size_mb = session.size_bytes / (1024 * 1024)
+        model_id, model_fields = session.model_id, session.model_fields
+        version_in = ModelVersionCreate(**session.version_fields)
+        owner_id = session.owner_id
+        await run_in_threadpool(storage.put_file, part_path(session.id), s3_path)
+    except BaseException:
+        # Release the claim so the client can retry, unless the session is gone
+        db.rollback()
+        db.query(UploadSession).filter(UploadSession.id == session.id).update(
+            {UploadSession.completing_at: None}, synchronize_session=False
+        )
+        db.commit()
+        raise
+    abort_upload(db, session)
+
+    if model_id is not None:
+        return create_model_version(
+            db=db,
+            model_id=model_id,
+            version_in=version_in,
+            s3_path=s3_path,
+            size_mb=size_mb,
+            content_hash=sha256,
+        )
+    db_model = create_model_with_version(
+        db=db,
+        model_in=ModelCreate(**model_fields),
+        version_in=version_in,
+        owner_id=owner_id,
+        s3_path=s3_path,
+        size_mb=size_mb,
+        content_hash=sha256,
+    )
+    return db_model.versions[0]
+
+
+def abort_upload(db: Session, session: UploadSession):
+    """Drop a session, its chunk records and its part file"""
+    with _digests_lock:
+        _digests.pop(session.id, None)
+    try:
+        os.remove(part_path(session.id))
+    except FileNotFoundError:
+        pass
+    db.delete(session)
+    db.commit()
+
+
+def purge_expired_uploads(db: Session) -> int:
+    """Drop sessions past their expiry; returns how many"""
+    expired = db.query(UploadSession).filter(UploadSession.expires_at <= datetime.utcnow()).all()
+    for session in expired:
+        abort_upload(db, session)
+    return len(expired)
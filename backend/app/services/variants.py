@@ -0,0 +1,154 @@
+"""
+variants.py — Builds pre-compressed variants of stored blobs.
+
+After an upload, the builder is woken (``notify``). It compresses every
+referenced blob whose ``ModelBlob.variants`` is still NULL, one at a time
+in a worker thread, with each encoding of utils/compression.py. It
+stores the results next to the blob, and records the compressed sizes:
+
+    ModelBlob.variants = {"zstd": 18234, "gzip": 24410}
+
+``size_bytes`` stays the decompressed size, which downloads of a variant
+send as X-Decompressed-Size. A variant no smaller than
+COMPRESSION_MAX_RATIO of the original isn't kept, so ``{}`` means
+"built, nothing worth serving". The NULL rows are the queue: a scan
+every COMPRESSION_POLL_INTERVAL seconds also picks up blobs that were
+uploaded while the builder was down. Variants are content-addressed like
+their blob, so two processes building the same one do redundant work
+but store the same bytes.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from typing import Any, Dict, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.model import ModelBlob
+from app.utils.compression import available_encodings, compress_file, variant_key
+from app.utils.storage import blob_key, storage, temp_dir
+
+logger = logging.getLogger(__name__)
+
+LEVELS = {
+    "gzip": settings.COMPRESSION_GZIP_LEVEL,
+    "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+}
+
+
+def build_variants(sha256: str) -> Dict[str, int]:
+    """Compress one blob with every available encoding; returns those kept"""
+    key = blob_key(sha256)
+    source = storage.local_path(key)
+    size = os.path.getsize(source)
+    os.makedirs(temp_dir(), exist_ok=True)
+    variants = {}
+    for encoding in available_encodings():
+        partial = os.path.join(temp_dir(), f"{uuid.uuid4().hex}.part")
+        try:
+            compressed = compress_file(source, partial, encoding, LEVELS[encoding])
+            if compressed <= size * settings.COMPRESSION_MAX_RATIO:
+                storage.put_file(partial, variant_key(key, encoding))
+                variants[encoding] = compressed
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+    return variants
+
+
+class VariantBuilder:
+    """Background task compressing blobs that have no variants yet"""
+
+    def __init__(self, poll_interval: float = settings.COMPRESSION_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._failed: Set[str] = set()  # not retried until restart
+        self.built = 0
+        self.bytes_in = 0
+        self.bytes_out = 0  # smallest kept variant of each blob
+
+    def notify(self):
+        """Wake the builder after a blob was stored; thread-safe"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "built": self.built,
+            "failed": len(self._failed),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "encodings": available_encodings(),
+        }
+
+    def start(self):
+        if self._task is None and settings.COMPRESSION_ENABLED:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the builder; an unfinished blob is built again next start"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._loop = self._wake = None
+
+    async def _run(self):
+        while True:
+            try:
+                while True:
+                    sha256 = await run_in_threadpool(self._next)
+                    if sha256 is None:
+                        break
+                    await run_in_threadpool(self._build, sha256)
+            except Exception:
+                logger.exception("Scanning for blobs to compress failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _next(self) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            query = db.query(ModelBlob.sha256).filter(
+                ModelBlob.variants.is_(None), ModelBlob.ref_count > 0
+            )
+            if self._failed:
+                query = query.filter(ModelBlob.sha256.notin_(list(self._failed)))
+            row = query.order_by(ModelBlob.created_at).first()
+            return row[0] if row else None
+        finally:
+            db.close()
+
+    def _build(self, sha256: str):
+        try:
+            variants = build_variants(sha256)
+        except Exception:
+            logger.exception(f"Compressing blob {sha256[:12]} failed")
+            self._failed.add(sha256)
+            return
+
+        db = SessionLocal()
+        try:
+            blob = db.query(ModelBlob).filter(ModelBlob.sha256 == sha256).first()
+            if blob is None:
+                return
+            blob.variants = variants
+            db.commit()
+            self.built += 1
+            self.bytes_in += blob.size_bytes
+            self.bytes_out += min(variants.values(), default=blob.size_bytes)
+            logger.info(f"Blob {sha256[:12]}: {blob.size_bytes} bytes -> {variants}")
+        finally:
+            db.close()
+
+
+variant_builder = VariantBuilder()
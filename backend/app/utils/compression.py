@@ -0,0 +1,109 @@
+"""
+compression.py — Content codings for pre-compressed artifact variants.
+
+Each blob may have compressed copies stored next to it under
+``<blob key>.zst`` / ``<blob key>.gz`` (see services/variants.py). A
+download picks one with ``negotiate_encoding`` from the client's
+Accept-Encoding and sends it with ``Content-Encoding`` set, so a client
+that decodes it (curl --compressed, browsers, requests/httpx for gzip)
+ends up with the original bytes.
+
+zstd needs the optional ``zstandard`` package; without it only gzip
+variants are built and offered.
+"""
+import gzip
+import hashlib
+import shutil
+from typing import Dict, List, Optional
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Content-Coding -> key suffix of the stored variant
+ENCODINGS = {"zstd": "zst", "gzip": "gz"}
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available_encodings() -> List[str]:
+    """Encodings variants can be built in here"""
+    return [e for e in ENCODINGS if e != "zstd" or _zstandard() is not None]
+
+
+def variant_key(key: str, encoding: str) -> str:
+    return f"{key}.{ENCODINGS[encoding]}"
+
+
+def compress_file(src: str, dest: str, encoding: str, level: int) -> int:
+    """Write ``src`` compressed to ``dest``; returns the compressed size"""
+    with open(src, "rb") as fin, open(dest, "wb") as fout:
+        if encoding == "gzip":
+            # mtime=0: the same content always compresses to the same bytes
+            with gzip.GzipFile(fileobj=fout, mode="wb", compresslevel=level, mtime=0) as gz:
+                shutil.copyfileobj(fin, gz, CHUNK_SIZE)
+        elif encoding == "zstd":
+            compressor = _zstandard().ZstdCompressor(level=level, threads=-1)
+            compressor.copy_stream(fin, fout, read_size=CHUNK_SIZE, write_size=CHUNK_SIZE)
+        else:
+            raise ValueError(f"Unknown encoding {encoding}")
+        return fout.tell()
+
+
+class _HashingWriter:
+    def __init__(self, f, digest):
+        self.f = f
+        self.digest = digest
+
+    def write(self, data) -> int:
+        self.digest.update(data)
+        return self.f.write(data)
+
+
+def decompress_file(src: str, dest: str, encoding: str) -> str:
+    """Write the original bytes of a variant to ``dest``; returns their SHA-256"""
+    digest = hashlib.sha256()
+    with open(src, "rb") as fin, open(dest, "wb") as raw:
+        fout = _HashingWriter(raw, digest)
+        if encoding == "gzip":
+            with gzip.GzipFile(fileobj=fin, mode="rb") as gz:
+                shutil.copyfileobj(gz, fout, CHUNK_SIZE)
+        elif encoding == "zstd":
+            decompressor = _zstandard().ZstdDecompressor()
+            decompressor.copy_stream(fin, fout, read_size=CHUNK_SIZE, write_size=CHUNK_SIZE)
+        else:
+            raise ValueError(f"Unknown encoding {encoding}")
+    return digest.hexdigest()
+
+
+def negotiate_encoding(header: Optional[str], available: Dict[str, int]) -> Optional[str]:
+    """
+    The stored encoding the client prefers (highest q, then smallest
+    variant), or None for the original bytes
+    """
+    if not header or not available:
+        return None
+    weights: Dict[str, float] = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    candidates = [
+        (weights.get(encoding, wildcard), -size, encoding)
+        for encoding, size in available.items()
+        if encoding in ENCODINGS
+    ]
+    candidates = [c for c in candidates if c[0] > 0]
+    return max(candidates)[2] if candidates else None
@@ -0,0 +1,210 @@
+"""
+disk_cache.py — Bounded local disk cache in front of remote artifact storage.
+
+Remote backends (see storage.py) hand model loading a local file from
+this cache. A miss fetches the object into ``<path>.<id>.part``,
+verifies it and renames it into place, so readers only ever see
+complete files. Blob keys end in the content's SHA-256, which the
+fetched bytes must match. Concurrent misses for the same key share one
+fetch (single flight); the followers wait for the leader's result.
+
+The cache holds at most ``max_bytes``. When an insert would exceed that,
+the least recently used files are evicted first. Recency survives
+restarts through file mtimes, which every hit refreshes. A replica
+whose file was evicted fetches it again at its next start (see
+DeploymentRuntime.spawn_replica).
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+STALE_PART_AGE = 24 * 3600  # seconds; older .part files are abandoned fetches
+
+
+class CacheVerificationError(Exception):
+    """Raised when fetched bytes do not match the content hash in their key"""
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Flight:
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class DiskCache:
+    """LRU-by-bytes file cache keyed by storage key"""
+
+    def __init__(self, root: str, max_bytes: int, expected_hash: Callable[[str], Optional[str]]):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.expected_hash = expected_hash  # key -> SHA-256 to verify, or None
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, LRU first
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0  # served from disk instead of fetched again
+        self.bytes_fetched = 0
+        self.evictions = 0
+        self.verify_failures = 0
+        self._load_index()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _load_index(self):
+        """Index files left by earlier processes, oldest use first"""
+        found = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                if name.endswith(".part"):
+                    # In flight in another process, or left by an interrupted one
+                    if time.time() - stat.st_mtime > STALE_PART_AGE:
+                        os.remove(path)
+                    continue
+                found.append((stat.st_mtime, os.path.relpath(path, self.root), stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key.replace(os.sep, "/")] = size
+            self._size += size
+        with self._lock:
+            self._evict(0)
+
+    def get(self, key: str, fetch: Callable[[str], None]) -> str:
+        """
+        Local path of ``key``; on a miss ``fetch(dest)`` writes the object
+        to ``dest``. Raises whatever fetch raises (e.g. FileNotFoundError).
+        """
+        while True:
+            with self._lock:
+                size = self._entries.get(key)
+                if size is not None and os.path.exists(self.path(key)):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.bytes_saved += size
+                    self._touch(key)
+                    return self.path(key)
+                if size is not None:
+                    # Removed behind our back
+                    self._forget(key)
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.misses += 1
+
+            if not leader:
+                flight.done.wait()
+                if flight.error is not None:
+                    raise flight.error
+                continue  # now a hit (unless evicted already; then fetch again)
+
+            try:
+                self._fetch(key, fetch)
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+                flight.done.set()
+            return self.path(key)
+
+    def _fetch(self, key: str, fetch: Callable[[str], None]):
+        final_path = self.path(key)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        partial = f"{final_path}.{uuid.uuid4().hex}.part"
+        try:
+            fetch(partial)
+            expected = self.expected_hash(key)
+            if expected and _file_sha256(partial) != expected:
+                self.verify_failures += 1
+                raise CacheVerificationError(f"Content of {key} does not match its hash")
+            size = os.path.getsize(partial)
+            with self._lock:
+                self._evict(size)
+                os.replace(partial, final_path)
+                self._entries[key] = size
+                self._size += size
+                self.bytes_fetched += size
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def put(self, key: str, local_path: str):
+        """Adopt a local file (e.g. a just-uploaded blob) as the cached copy"""
+        size = os.path.getsize(local_path)
+        final_path = self.path(key)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        with self._lock:
+            if key in self._entries:
+                self._forget(key)
+            self._evict(size)
+            os.replace(local_path, final_path)
+            self._entries[key] = size
+            self._size += size
+
+    def discard(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._forget(key)
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def _touch(self, key: str):
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+
+    def _forget(self, key: str):
+        self._size -= self._entries.pop(key)
+
+    def _evict(self, incoming: int):
+        """Drop least recently used files until ``incoming`` more bytes fit"""
+        while self._entries and self._size + incoming > self.max_bytes:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            logger.info(f"Artifact cache evicted {key} ({size} bytes)")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes_cached": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "bytes_fetched": self.bytes_fetched,
+            "evictions": self.evictions,
+            "verify_failures": self.verify_failures,
+        }
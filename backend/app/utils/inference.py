@@ -10,29 +10,30 @@ in the base install — add them separately if needed.
 """
 import os
 import pickle
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
 from fastapi import HTTPException
 
 
 def get_model_file_path(s3_path: str, upload_dir: str) -> str:
     """
-    Convert the DB-stored s3_path (e.g. 'models/3/uuid.joblib')
-    to the actual local file path.
+    Convert the DB-stored s3_path (e.g. 'blobs/ab/cd/abcd...' or the
+    older 'models/3/uuid.joblib') to the actual local file path.
     """
-    # s3_path is stored as "models/{user_id}/{filename}"
+    # s3_path is a blob key (see utils/storage.py) or "models/{user_id}/{filename}"
     # upload_dir is the root (e.g. "uploads/")
     relative = s3_path.replace("models/", "", 1)
     return os.path.join(upload_dir, relative)
 
 
-def load_model(file_path: str, fmt: str) -> Any:
+def load_model(file_path: str, fmt: str, threads: Optional[int] = None) -> Any:
     """
     Load a model file from disk.
 
     Args:
         file_path: Absolute path to the model file
         fmt: Format string from DB (joblib, pkl, pickle, onnx)
+        threads: Intra-op thread count for ONNX sessions (default: all cores)
 
     Returns:
         Loaded model object
@@ -58,7 +59,11 @@ def load_model(file_path: str, fmt: str) -> Any:
             import onnxruntime as ort
         except ImportError:
             raise HTTPException(status_code=500, detail="onnxruntime not installed on server")
-        return ort.InferenceSession(file_path)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        return ort.InferenceSession(file_path, sess_options=options)
 
     else:
         raise HTTPException(
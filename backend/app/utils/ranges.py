@@ -0,0 +1,178 @@
+"""
+ranges.py — Conditional and byte-range responses for file downloads.
+
+``file_response`` answers a GET or HEAD for a local file following
+RFC 9110:
+
+  - ``If-None-Match`` naming the file's ETag -> 304 Not Modified
+  - ``Range: bytes=a-b | a- | -n`` -> 206 with Content-Range (one range;
+    multiple ranges or malformed ones get the whole file)
+  - ``If-Range`` -> the Range is honoured only while the strong ETag
+    still matches, otherwise the whole (changed) file is sent
+  - a range starting past the end -> 416 with ``Content-Range: bytes */size``
+
+Content-addressed artifacts use their SHA-256 as a strong ETag, which
+stays valid across servers and restarts. Files without a known hash get
+a weak ETag from mtime and size; weak ETags never satisfy If-Range.
+"""
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def strong_etag(sha256: str, encoding: Optional[str] = None) -> str:
+    """Each content coding of the same bytes is its own representation"""
+    return f'"{sha256}+{encoding}"' if encoding else f'"{sha256}"'
+
+
+def weak_etag(stat_result: os.stat_result) -> str:
+    return f'W/"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match semantics: weak comparison against a list or ``*``"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (first, last) byte of a single-range Range header, or None to send the
+    whole file. Raises RangeNotSatisfiable when no byte of it exists.
+    """
+    if not header:
+        return None
+    match = _RANGE.fullmatch(header.strip())
+    if match is None:
+        return None  # malformed or several ranges: ignore
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable()  # no last N bytes to send
+        return max(size - suffix, 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable()
+    return first, (min(int(last), size - 1) if last else size - 1)
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse sending bytes ``start``..``end`` (inclusive) of the file"""
+
+    def __init__(self, path: str, start: int, end: int, stat_result: os.stat_result, **kwargs):
+        self.start = start
+        self.end = end
+        super().__init__(path, stat_result=stat_result, **kwargs)
+        self.headers["content-length"] = str(end - start + 1)
+        self.headers["accept-ranges"] = "bytes"
+        if self.status_code == 206:
+            self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.start)
+                remaining = self.end - self.start + 1
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break  # truncated underneath us
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
+
+
+def not_modified(
+    request: Request, etag: str, headers: Optional[Dict[str, str]] = None
+) -> Optional[Response]:
+    """304 when the client already holds this representation"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={**(headers or {}), "ETag": etag})
+    return None
+
+
+def file_response(
+    request: Request,
+    path: str,
+    filename: str,
+    sha256: Optional[str] = None,
+    encoding: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Full, partial (206) or not-modified (304) response for a local file.
+    ``path`` holds the ``encoding``-coded bytes of content ``sha256``.
+    """
+    stat_result = os.stat(path)
+    size = stat_result.st_size
+    etag = strong_etag(sha256, encoding) if sha256 else weak_etag(stat_result)
+
+    cached = not_modified(request, etag, headers)
+    if cached is not None:
+        return cached
+
+    first, last, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # Ranges apply to GET only; If-Range requires an exact strong match
+    if request.method == "GET" and range_header and (
+        if_range is None or (sha256 and if_range.strip() == etag)
+    ):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=416,
+                headers={"Content-Range": f"bytes */{size}", "ETag": etag},
+            )
+        if byte_range is not None:
+            (first, last), status_code = byte_range, 206
+
+    return RangeFileResponse(
+        path,
+        first,
+        last,
+        stat_result,
+        status_code=status_code,
+        filename=filename,
+        media_type="application/octet-stream",
+        headers={**(headers or {}), "ETag": etag},
+        method=request.method,
+    )
@@ -0,0 +1,76 @@
+"""
+sse.py — Server-Sent Events streaming of EventHub topics.
+
+Each event is sent as
+
+    id: <cursor>
+    event: <name>
+    data: <json>
+
+so a reconnecting EventSource resumes from ``Last-Event-ID``. When the
+requested cursor cannot be resumed exactly (another process, or older
+than the ring buffer) a ``reset`` event comes first, telling the client
+to reload the full state over REST before applying what follows.
+A comment line is sent every SSE_HEARTBEAT_INTERVAL seconds to keep
+proxies from closing idle streams.
+"""
+import json
+from typing import Any, AsyncIterator, Hashable, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.events import EventHub
+
+
+def format_event(name: str, data: Any, cursor: Optional[str] = None) -> str:
+    lines = []
+    if cursor:
+        lines.append(f"id: {cursor}")
+    lines.append(f"event: {name}")
+    lines.append(f"data: {json.dumps(jsonable_encoder(data), separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_topic(
+    request: Request,
+    hub: EventHub,
+    topic: Hashable,
+    name: str,
+    since: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Backlog after ``since``, then live events, until the client leaves"""
+    cursor = since
+    while True:
+        subscription, backlog, complete = await hub.subscribe(topic, cursor)
+        try:
+            if not complete:
+                yield format_event("reset", {"cursor": cursor})
+            for cursor, data in backlog:
+                yield format_event(name, data, cursor)
+
+            while True:
+                event = await subscription.get(settings.SSE_HEARTBEAT_INTERVAL)
+                if subscription.closed:
+                    return
+                if subscription.lagged:
+                    break  # resubscribe from the last cursor sent
+                if event is None:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                cursor, data = event
+                yield format_event(name, data, cursor)
+        finally:
+            hub.unsubscribe(subscription)
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,57 +1,498 @@
+"""
+storage.py — Content-addressed storage for model artifacts.
+
+An upload is streamed to a temporary file while its SHA-256 is computed
+in the same pass, then handed to the storage backend under the key
+
+    blobs/<h[0:2]>/<h[2:4]>/<h>
+
+Identical content is stored once: when that blob already exists the
+temporary copy is dropped. ModelVersion.s3_path holds the blob key and
+ModelVersion.content_hash the hash, which also serves as cache key and
+ETag. Reference counts shared by the versions pointing at a blob live in
+model_blobs (see services/model.py).
+
+Backends (STORAGE_BACKEND):
+  - local : blobs under UPLOAD_DIR; files are served and loaded in place
+  - s3    : blobs in S3_BUCKET (or any S3-compatible store at
+            S3_ENDPOINT_URL, e.g. MinIO). Large files go up as parallel
+            multipart uploads and come down as parallel ranged GETs; model
+            loading reads through a bounded disk cache under
+            STORAGE_CACHE_DIR (see disk_cache.py), and downloads redirect
+            to pre-signed URLs. Requires boto3.
+
+Versions uploaded before this layout keep their "models/<user>/<uuid>"
+keys; get_model_file_path resolves both on local disk.
+"""
+import hashlib
+import logging
 import os
-import shutil
-from fastapi import UploadFile
-from typing import Tuple
+import re
+import threading
+import time
 import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
 import aiofiles
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, Response
 
 from app.core.config import settings
+from app.models.model import ModelBlob, StorageTier
+from app.utils.compression import (
+    available_encodings,
+    decompress_file,
+    negotiate_encoding,
+    variant_key,
+)
+from app.utils.disk_cache import DiskCache
+from app.utils.inference import get_model_file_path
+from app.utils.ranges import RangeFileResponse, file_response, not_modified, strong_etag
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blobs"
+CHUNK_SIZE = 1024 * 1024  # 1MB
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+
+def is_sha256(value: str) -> bool:
+    return bool(_SHA256.fullmatch(value))
+
+
+def blob_key(sha256: str) -> str:
+    """Storage key of a blob, sharded by hash prefix"""
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def blob_hash(key: str) -> Optional[str]:
+    """Content hash a key is addressed by (None for pre-blob keys)"""
+    name = key.rsplit("/", 1)[-1]
+    return name if key.startswith(f"{BLOB_PREFIX}/") and is_sha256(name) else None
+
+
+def temp_dir() -> str:
+    """Where uploads are written before their hash is known"""
+    return os.path.join(settings.UPLOAD_DIR, BLOB_PREFIX, "tmp")
+
+
+class StorageBackend:
+    """Where blobs live, addressed by key"""
+
+    remote = False
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def put_file(self, local_path: str, key: str):
+        """Store a finished local file under ``key`` (consumes the file)"""
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> str:
+        """Path of a local copy, fetching it first if needed"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def iter_keys(self) -> Iterator[Tuple[str, int, float]]:
+        """Every stored (key, size, mtime), listed lazily"""
+        raise NotImplementedError
+
+    def modified(self, key: str) -> Optional[float]:
+        """Last modification time of a key (epoch seconds), None if missing"""
+        raise NotImplementedError
+
+    def url(self, key: str, filename: Optional[str] = None, encoding: Optional[str] = None) -> str:
+        """URL a client can download the blob from"""
+        return f"{settings.API_V1_STR}/downloads/{key}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "local"}
+
+
+class LocalStorage(StorageBackend):
+    """Blobs as files under a root directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return get_model_file_path(key, self.root)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def put_file(self, local_path: str, key: str):
+        final_path = self.path(key)
+        if os.path.exists(final_path):
+            try:
+                os.utime(final_path)  # restarts its garbage-collection grace period
+                os.remove(local_path)  # duplicate content
+                return
+            except FileNotFoundError:
+                pass  # collected just now: store this copy instead
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(local_path, final_path)
+
+    def local_path(self, key: str) -> str:
+        path = self.path(key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(key)
+        return path
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def modified(self, key: str) -> Optional[float]:
+        try:
+            return os.stat(self.path(key)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def iter_keys(self) -> Iterator[Tuple[str, int, float]]:
+        """Files under the root, except temporary files and the download cache"""
+        skip = {os.path.realpath(temp_dir()), os.path.realpath(settings.STORAGE_CACHE_DIR)}
+        yield from self._walk(self.root, "", skip)
+
+    def _walk(self, directory: str, relative: str, skip: set) -> Iterator[Tuple[str, int, float]]:
+        # Depth first with one open scandir per level, so memory doesn't grow
+        # with the number of files
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            return
+        with entries:
+            for entry in entries:
+                name = relative + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if os.path.realpath(entry.path) not in skip:
+                            yield from self._walk(entry.path, f"{name}/", skip)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat_result = entry.stat(follow_symlinks=False)
+                        # Inverse of get_model_file_path
+                        key = name if name.startswith(f"{BLOB_PREFIX}/") else f"models/{name}"
+                        yield key, stat_result.st_size, stat_result.st_mtime
+                except FileNotFoundError:
+                    continue  # removed while walking
+
+
+class S3Storage(StorageBackend):
+    """Blobs as objects in an S3 (or S3-compatible) bucket"""
+
+    remote = True
+
+    def __init__(self, bucket: str, cache: DiskCache, endpoint_url: Optional[str] = None):
+        self.bucket = bucket
+        self.cache = cache
+        self.endpoint_url = endpoint_url
+        self._client = None
+        self._transfer = None
+
+    @property
+    def client(self):
+        """boto3 client, created on first use (boto3 is optional)"""
+        if self._client is None:
+            try:
+                import boto3
+                from boto3.s3.transfer import TransferConfig
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package")
+
+            self._transfer = TransferConfig(
+                multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+                multipart_chunksize=settings.S3_PART_SIZE,
+                max_concurrency=settings.S3_MAX_CONCURRENCY,
+                use_threads=True,
+            )
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=self.endpoint_url,
+                region_name=settings.AWS_REGION,
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            )
+        return self._client
+
+    def exists(self, key: str) -> bool:
+        client = self.client
+        from botocore.exceptions import ClientError
+
+        try:
+            client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if _not_found(e):
+                return False
+            raise
 
-# For now, this is a simple file storage implementation
-# In production, you would use S3 or similar cloud storage
+    def put_file(self, local_path: str, key: str):
+        if not self.exists(key):  # also creates the client and transfer config
+            # Parallel multipart above S3_MULTIPART_THRESHOLD
+            self.client.upload_file(local_path, self.bucket, key, Config=self._transfer)
+        else:
+            # Server-side copy onto itself: refreshes LastModified, which
+            # restarts the object's garbage-collection grace period
+            self.client.copy(
+                {"Bucket": self.bucket, "Key": key},
+                self.bucket,
+                key,
+                ExtraArgs={"MetadataDirective": "REPLACE"},
+                Config=self._transfer,
+            )
+        # Keep the bytes as the cached copy, so a first deploy needn't fetch them
+        self.cache.put(key, local_path)
 
+    def local_path(self, key: str) -> str:
+        return self.cache.get(key, lambda dest: self._download(key, dest))
 
-async def save_uploaded_file(file: UploadFile, user_id: int) -> Tuple[str, float]:
+    def _download(self, key: str, dest: str):
+        client = self.client
+        from botocore.exceptions import ClientError
+
+        try:
+            # Parallel ranged GETs above S3_MULTIPART_THRESHOLD
+            client.download_file(self.bucket, key, dest, Config=self._transfer)
+        except ClientError as e:
+            if _not_found(e):
+                raise FileNotFoundError(key)
+            raise
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        self.cache.discard(key)
+
+    def modified(self, key: str) -> Optional[float]:
+        client = self.client
+        from botocore.exceptions import ClientError
+
+        try:
+            return client.head_object(Bucket=self.bucket, Key=key)["LastModified"].timestamp()
+        except ClientError as e:
+            if _not_found(e):
+                return None
+            raise
+
+    def iter_keys(self) -> Iterator[Tuple[str, int, float]]:
+        """Objects under the blob and legacy prefixes, a listing page at a time"""
+        paginator = self.client.get_paginator("list_objects_v2")
+        for prefix in (f"{BLOB_PREFIX}/", "models/"):
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    yield obj["Key"], obj["Size"], obj["LastModified"].timestamp()
+
+    def url(self, key: str, filename: Optional[str] = None, encoding: Optional[str] = None) -> str:
+        params = {"Bucket": self.bucket, "Key": key}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        if encoding:
+            params["ResponseContentEncoding"] = encoding
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=settings.S3_URL_EXPIRY
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "s3", "cache": self.cache.stats()}
+
+
+def _not_found(error) -> bool:
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+def _build_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        cache = DiskCache(settings.STORAGE_CACHE_DIR, settings.STORAGE_CACHE_MAX_BYTES, blob_hash)
+        return S3Storage(settings.S3_BUCKET, cache, settings.S3_ENDPOINT_URL)
+    return LocalStorage(settings.UPLOAD_DIR)
+
+
+storage = _build_storage()
+
+
+class AccessLog:
+    """Blob accesses and promotions not yet written by the tiering job"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._touched: Dict[str, datetime] = {}
+        self._promotions: List[Tuple[str, float]] = []  # (sha256, seconds)
+
+    def touch(self, key: str):
+        sha256 = blob_hash(key)
+        if sha256:
+            with self._lock:
+                self._touched[sha256] = datetime.utcnow()
+
+    def touched(self, sha256: str) -> bool:
+        with self._lock:
+            return sha256 in self._touched
+
+    def promoted(self, sha256: str, seconds: float):
+        with self._lock:
+            self._promotions.append((sha256, seconds))
+
+    def drain(self) -> Tuple[Dict[str, datetime], List[Tuple[str, float]]]:
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            promotions, self._promotions = self._promotions, []
+        return touched, promotions
+
+
+access_log = AccessLog()
+_tier_locks: Dict[str, threading.Lock] = {}
+_tier_locks_lock = threading.Lock()
+
+
+def _tier_lock(key: str) -> threading.Lock:
+    with _tier_locks_lock:
+        return _tier_locks.setdefault(key, threading.Lock())
+
+
+def archived_variant(key: str) -> Optional[str]:
+    """Encoding of a stored compressed copy of ``key``, if any"""
+    for encoding in available_encodings():
+        if storage.exists(variant_key(key, encoding)):
+            return encoding
+    return None
+
+
+def archive_blob(key: str) -> bool:
+    """Drop a blob's original bytes, keeping its compressed variant"""
+    with _tier_lock(key):
+        if access_log.touched(blob_hash(key)) or archived_variant(key) is None:
+            return False
+        storage.delete(key)
+        return True
+
+
+def promote_blob(key: str) -> bool:
+    """Restore an archived blob's original bytes from its compressed variant"""
+    sha256 = blob_hash(key)
+    if sha256 is None:
+        return False
+    with _tier_lock(key):
+        if storage.exists(key):
+            return True  # promoted by a concurrent access
+        encoding = archived_variant(key)
+        if encoding is None:
+            return False
+        started = time.perf_counter()
+        os.makedirs(temp_dir(), exist_ok=True)
+        partial = os.path.join(temp_dir(), f"{uuid.uuid4().hex}.part")
+        try:
+            source = storage.local_path(variant_key(key, encoding))
+            if decompress_file(source, partial, encoding) != sha256:
+                logger.error(f"Archived variant of {key} does not match its hash")
+                return False
+            storage.put_file(partial, key)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        access_log.promoted(sha256, time.perf_counter() - started)
+        return True
+
+
+def artifact_path(key: str) -> str:
+    """
+    Local path of an artifact for loading or serving; an archived blob is
+    promoted first. Counts as an access for tiering.
+    """
+    access_log.touch(key)
+    try:
+        return storage.local_path(key)
+    except FileNotFoundError:
+        if not promote_blob(key):
+            raise
+    return storage.local_path(key)
+
+
+def artifact_exists(key: str) -> bool:
+    """Whether an artifact is stored, possibly only in the archive tier"""
+    return storage.exists(key) or (blob_hash(key) is not None and archived_variant(key) is not None)
+
+
+async def save_uploaded_file(file: UploadFile) -> Tuple[str, float, str]:
     """
-    Asynchronously save an uploaded file to local storage (mock S3)
+    Store an upload by content, hashing it while it is written
 
     Returns:
-        Tuple[str, float]: (file path, size in MB)
+        Tuple[str, float, str]: (blob key, size in MB, SHA-256 hex digest)
     """
-    # Create a unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    os.makedirs(temp_dir(), exist_ok=True)
+    temp_path = os.path.join(temp_dir(), f"{uuid.uuid4().hex}.part")
 
-    # Create user directory if it doesn't exist
-    storage_dir = os.path.join(settings.UPLOAD_DIR, str(user_id))
-    os.makedirs(storage_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                await buffer.write(chunk)
+        sha256 = digest.hexdigest()
+        await run_in_threadpool(storage.put_file, temp_path, blob_key(sha256))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
-    # Save file path
-    file_path = os.path.join(storage_dir, unique_filename)
+    return blob_key(sha256), size / (1024 * 1024), sha256
 
-    # Save the file asynchronously
-    async with aiofiles.open(file_path, "wb") as buffer:
-        # Read and write in chunks to avoid loading entire file into memory
-        chunk_size = 1024 * 1024  # 1MB chunks
-        while True:
-            chunk = await file.read(chunk_size)
-            if not chunk:
-                break
-            await buffer.write(chunk)
 
-    # Get file size in MB
-    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+def download_response(
+    request: Request, key: str, filename: str, blob: Optional[ModelBlob] = None
+) -> Response:
+    """
+    Serve a stored file with Range / conditional GET support (see
+    ranges.py), or redirect to it when the backend is remote. A blob's
+    hash is its strong ETag, and its compressed variants are offered by
+    Accept-Encoding (see compression.py). Those are kept in the archive
+    tier too, so only a download of the original bytes promotes a blob.
+    """
+    sha256 = blob.sha256 if blob is not None else None
+    encoding = negotiate_encoding(
+        request.headers.get("accept-encoding"), blob.variants if blob is not None else None
+    )
+    headers = {"Vary": "Accept-Encoding"} if blob is not None and blob.variants else {}
+    served_key = variant_key(key, encoding) if encoding else key
+    access_log.touch(key)
 
-    # Return the S3-style path and size
-    s3_style_path = f"models/{user_id}/{unique_filename}"
+    if storage.remote:
+        # The object store handles ranges (and sets Content-Encoding from the
+        # signed URL); a client holding this content needn't go there
+        cached = not_modified(request, strong_etag(sha256, encoding), headers) if sha256 else None
+        if cached is not None:
+            return cached
+        if not encoding and blob is not None and blob.tier == StorageTier.ARCHIVED:
+            if not storage.exists(key) and not promote_blob(key):
+                raise HTTPException(status_code=404, detail="Model file not found on server")
+        return RedirectResponse(storage.url(served_key, filename, encoding), headers=headers)
 
-    return s3_style_path, size_mb
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        headers["X-Decompressed-Size"] = str(blob.size_bytes)
+    try:
+        path = storage.local_path(served_key) if encoding else artifact_path(key)
+        return file_response(request, path, filename, sha256, encoding, headers)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Model file not found on server")
 
 
-def get_download_url(s3_path: str) -> str:
-    """
-    Get a download URL for a file
+def starts_download(response: Response) -> bool:
+    """Whether a download response sends (or leads to) the file from byte 0"""
+    if isinstance(response, RangeFileResponse):
+        return response.start == 0
+    return isinstance(response, RedirectResponse)
 
-    In a real implementation, this would generate a pre-signed S3 URL
-    """
-    return f"{settings.API_V1_STR}/downloads/{s3_path}"
\ No newline at end of file
+
+def get_download_url(s3_path: str) -> str:
+    """Get a download URL for a file (pre-signed when the backend is remote)"""
+    return storage.url(s3_path)
@@ -0,0 +1,101 @@
+"""
+Cold-start benchmark for local deployment replicas.
+
+Measures, for a freshly spawned replica of a small scikit-learn model:
+
+  ready_ms        : spawn -> socket visible (interpreter start, imports, model load)
+  first_call_ms   : latency of the first prediction after ready
+  steady_call_ms  : median latency of the following predictions
+
+Replicas are spawned as fresh interpreters (RUNTIME_USE_ZYGOTE off); see
+bench_zygote.py for the forked path.
+
+Variants:
+  baseline        : plain spawn
+  warmup_input    : replica predicts once on a sample input before going live
+                    (deployment_config["warmup_input"])
+
+Usage (from backend/):
+    python benchmarks/bench_cold_start.py [--trials 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_ROOT)
+
+SAMPLE_INPUT = [[5.1, 3.5, 1.4, 0.2]]
+
+
+def build_model(workdir: str) -> str:
+    try:
+        import joblib
+        from sklearn.datasets import load_iris
+        from sklearn.ensemble import RandomForestClassifier
+    except ImportError:
+        raise SystemExit("This benchmark needs scikit-learn and joblib installed")
+
+    X, y = load_iris(return_X_y=True)
+    path = os.path.join(workdir, "iris_rf.joblib")
+    joblib.dump(RandomForestClassifier(n_estimators=100).fit(X, y), path)
+    return path
+
+
+async def measure_calls(runtime, calls: int):
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await runtime.predict({"input": SAMPLE_INPUT})
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return timings[0], statistics.median(timings[1:])
+
+
+def run_variant(model_path: str, warmup_input, trials: int):
+    from app.core.config import settings
+    from app.runtime.manager import DeploymentRuntime
+
+    settings.RUNTIME_USE_ZYGOTE = False
+    ready, first, steady = [], [], []
+    for _ in range(trials):
+        runtime = DeploymentRuntime(
+            deployment_id=0,
+            model_version_id=0,
+            model_path=model_path,
+            model_format="joblib",
+        )
+        runtime.warmup_input = warmup_input
+        started = time.perf_counter()
+        runtime.scale_to(1)
+        ready.append((time.perf_counter() - started) * 1000.0)
+        try:
+            first_ms, steady_ms = asyncio.run(measure_calls(runtime, 20))
+        finally:
+            runtime.stop()
+        first.append(first_ms)
+        steady.append(steady_ms)
+    return statistics.median(ready), statistics.median(first), statistics.median(steady)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--trials", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="modelhub-bench-")
+    os.environ.setdefault("RUNTIME_SOCKET_DIR", os.path.join(workdir, "sock"))
+    os.chdir(workdir)  # keep the app's sqlite_db directory out of the tree
+    model_path = build_model(workdir)
+
+    print(f"{'variant':<14}{'ready_ms':>12}{'first_call_ms':>16}{'steady_call_ms':>16}")
+    for name, warmup_input in (("baseline", None), ("warmup_input", SAMPLE_INPUT)):
+        ready, first, steady = run_variant(model_path, warmup_input, args.trials)
+        print(f"{name:<14}{ready:>12.1f}{first:>16.2f}{steady:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Download-size benchmark for pre-compressed artifact variants.
+
+For each sample model and each encoding the variant builder produces
+(app/utils/compression.py), reports:
+
+  size_kb         : size of the variant (identity = original file)
+  ratio           : variant size / original size
+  compress_ms     : one-time cost of building the variant
+  decompress_ms   : client-side cost of decoding it
+  <N>Mbit_ms      : time-to-download at N Mbit/s = transfer + decode
+                    (transfer computed from size; decode measured)
+
+Sample models:
+  iris_rf         : test_models/iris_rf.joblib (RandomForest, 100 trees)
+  rf_large        : RandomForest, 300 trees on 20k synthetic rows
+  logreg          : LogisticRegression (small, mostly float64 weights)
+  onnx            : iris_rf converted to ONNX (needs skl2onnx)
+
+zstd rows need the zstandard package.
+
+Usage (from backend/):
+    python benchmarks/bench_compression.py [--trials 3] [--bandwidth 10 100 1000]
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_ROOT)
+
+
+def build_models(workdir: str):
+    try:
+        import joblib
+        from sklearn.datasets import load_iris, make_classification
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression
+    except ImportError:
+        raise SystemExit("This benchmark needs scikit-learn and joblib installed")
+
+    models = {}
+    sample = os.path.join(BACKEND_ROOT, "test_models", "iris_rf.joblib")
+    X, y = load_iris(return_X_y=True)
+    if os.path.exists(sample):
+        models["iris_rf"] = sample
+    else:
+        models["iris_rf"] = os.path.join(workdir, "iris_rf.joblib")
+        joblib.dump(RandomForestClassifier(n_estimators=100).fit(X, y), models["iris_rf"])
+
+    Xl, yl = make_classification(n_samples=20000, n_features=20, random_state=0)
+    models["rf_large"] = os.path.join(workdir, "rf_large.joblib")
+    joblib.dump(
+        RandomForestClassifier(n_estimators=300, random_state=0).fit(Xl, yl), models["rf_large"]
+    )
+    models["logreg"] = os.path.join(workdir, "logreg.joblib")
+    joblib.dump(LogisticRegression(max_iter=1000).fit(Xl, yl), models["logreg"])
+
+    try:
+        from skl2onnx import to_onnx
+
+        models["onnx"] = os.path.join(workdir, "iris_rf.onnx")
+        forest = RandomForestClassifier(n_estimators=100).fit(X, y)
+        with open(models["onnx"], "wb") as f:
+            f.write(to_onnx(forest, X[:1].astype("float32")).SerializeToString())
+    except ImportError:
+        print("skl2onnx not installed; skipping the ONNX model\n")
+    return models
+
+
+def decompress(path: str, encoding: str):
+    with open(path, "rb") as f:
+        if encoding == "gzip":
+            with gzip.GzipFile(fileobj=f) as gz:
+                while gz.read(1024 * 1024):
+                    pass
+        elif encoding == "zstd":
+            import zstandard
+
+            reader = zstandard.ZstdDecompressor().stream_reader(f)
+            while reader.read(1024 * 1024):
+                pass
+
+
+def measure(path: str, encoding: str, workdir: str, trials: int):
+    """(size, compress_ms, decompress_ms) of one variant"""
+    from app.services.variants import LEVELS
+    from app.utils.compression import compress_file
+
+    if encoding == "identity":
+        return os.path.getsize(path), 0.0, 0.0
+    dest = os.path.join(workdir, f"variant.{encoding}")
+    compress, decode = [], []
+    for _ in range(trials):
+        started = time.perf_counter()
+        size = compress_file(path, dest, encoding, LEVELS[encoding])
+        compress.append((time.perf_counter() - started) * 1000.0)
+        started = time.perf_counter()
+        decompress(dest, encoding)
+        decode.append((time.perf_counter() - started) * 1000.0)
+    return size, statistics.median(compress), statistics.median(decode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument("--bandwidth", type=float, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="modelhub-bench-")
+    os.chdir(workdir)  # keep the app's sqlite_db directory out of the tree
+    from app.utils.compression import available_encodings
+
+    models = build_models(workdir)
+    encodings = ["identity"] + available_encodings()
+
+    header = f"{'model':<10}{'encoding':<10}{'size_kb':>10}{'ratio':>8}{'compress_ms':>13}{'decompress_ms':>15}"
+    header += "".join(f"{f'{bw:g}Mbit_ms':>13}" for bw in args.bandwidth)
+    print(header)
+    for name, path in models.items():
+        original = os.path.getsize(path)
+        for encoding in encodings:
+            size, compress_ms, decode_ms = measure(path, encoding, workdir, args.trials)
+            row = f"{name:<10}{encoding:<10}{size / 1024:>10.1f}{size / original:>8.3f}"
+            row += f"{compress_ms:>13.1f}{decode_ms:>15.1f}"
+            for bw in args.bandwidth:
+                transfer_ms = size * 8 / (bw * 1e6) * 1000.0
+                row += f"{transfer_ms + decode_ms:>13.1f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
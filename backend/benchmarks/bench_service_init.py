@@ -0,0 +1,101 @@
+"""
+Per-request overhead of constructing DeploymentService.
+
+Every deployments route builds a DeploymentService. Previously its
+constructor called ``docker.from_env()`` (probing the daemon socket), or
+logged a warning when the docker package was missing, on every request.
+The service now uses the process-wide ``container_runtime`` client.
+
+Variants:
+  per_request     : the old constructor body, run once per request
+  shared          : DeploymentService(db) with the shared client
+
+Reported per variant: median and p99 microseconds per construction, and
+log records emitted over all iterations.
+
+Usage (from backend/):
+    python benchmarks/bench_service_init.py [--iterations 2000]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_ROOT)
+
+
+class CountingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = 0
+
+    def emit(self, record):
+        self.records += 1
+
+
+def legacy_init():
+    """The constructor body DeploymentService used to run per request"""
+    logger = logging.getLogger("app.services.deployment")
+    try:
+        import docker
+    except ImportError:
+        logger.warning("Docker module not available. Deployment functionality will be limited.")
+        return None
+    try:
+        return docker.from_env()
+    except Exception as e:
+        logger.warning(f"Docker client not available: {e}")
+        return None
+
+
+def measure(construct, iterations: int):
+    handler = CountingHandler()
+    root = logging.getLogger()
+    root.addHandler(handler)
+    timings = []
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            construct()
+            timings.append((time.perf_counter() - started) * 1e6)
+    finally:
+        root.removeHandler(handler)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)], handler.records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="modelhub-bench-")
+    os.chdir(workdir)  # keep the app's sqlite_db directory out of the tree
+    # Discard log output; CountingHandler still sees every record
+    logging.basicConfig(level=logging.WARNING, stream=open(os.devnull, "w"))
+
+    from app.core.database import SessionLocal
+    from app.runtime.container import container_runtime
+    from app.services.deployment import DeploymentService
+
+    db = SessionLocal()
+    try:
+        container_runtime.check()  # first use connects once, outside the timing
+        print(f"container daemon available: {container_runtime.available}")
+        print(f"{'variant':<14}{'median_us':>12}{'p99_us':>12}{'log_records':>14}")
+        for name, construct in (
+            ("per_request", legacy_init),
+            ("shared", lambda: DeploymentService(db)),
+        ):
+            median, p99, records = measure(construct, args.iterations)
+            print(f"{name:<14}{median:>12.2f}{p99:>12.2f}{records:>14}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Replica spawn benchmark: cold interpreter vs zygote fork.
+
+Scales a runtime for a small scikit-learn model up to N replicas and
+reports, for each spawn path:
+
+  first_ms     : spawn -> ready for the first replica (includes zygote start)
+  spawn_ms     : median spawn -> ready for the remaining replicas
+  rss_mb       : mean resident set size per replica
+  pss_mb       : mean proportional set size per replica (shared pages split)
+  uss_mb       : mean private memory per replica
+  call_ms      : median prediction latency across the replica set
+
+Usage (from backend/):
+    python benchmarks/bench_zygote.py [--replicas 4] [--calls 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_ROOT)
+
+SAMPLE_INPUT = [[5.1, 3.5, 1.4, 0.2]]
+
+
+def build_model(workdir: str) -> str:
+    try:
+        import joblib
+        from sklearn.datasets import load_iris
+        from sklearn.ensemble import RandomForestClassifier
+    except ImportError:
+        raise SystemExit("This benchmark needs scikit-learn and joblib installed")
+
+    X, y = load_iris(return_X_y=True)
+    path = os.path.join(workdir, "iris_rf.joblib")
+    joblib.dump(RandomForestClassifier(n_estimators=200).fit(X, y), path)
+    return path
+
+
+async def measure_calls(runtime, calls: int) -> float:
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await runtime.predict({"input": SAMPLE_INPUT})
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(timings)
+
+
+def run_variant(model_path: str, use_zygote: bool, replicas: int, calls: int):
+    from app.core.config import settings
+    from app.runtime.manager import DeploymentRuntime
+    from app.runtime.procfs import read_memory_breakdown
+    from app.runtime.zygote import zygote_pool
+
+    settings.RUNTIME_USE_ZYGOTE = use_zygote
+    runtime = DeploymentRuntime(
+        deployment_id=0,
+        model_version_id=0,
+        model_path=model_path,
+        model_format="joblib",
+    )
+    spawns = []
+    try:
+        for count in range(1, replicas + 1):
+            started = time.perf_counter()
+            runtime.scale_to(count)
+            spawns.append((time.perf_counter() - started) * 1000.0)
+        call_ms = asyncio.run(measure_calls(runtime, calls))
+
+        memory = [read_memory_breakdown(r.pid) for r in runtime.live_replicas()]
+        memory = [m for m in memory if m]
+    finally:
+        runtime.stop()
+        zygote_pool.shutdown()
+
+    def mean_mb(key):
+        return statistics.mean(m[key] for m in memory) / 2**20 if memory else 0.0
+
+    return {
+        "first_ms": spawns[0],
+        "spawn_ms": statistics.median(spawns[1:]) if len(spawns) > 1 else spawns[0],
+        "rss_mb": mean_mb("rss"),
+        "pss_mb": mean_mb("pss"),
+        "uss_mb": mean_mb("uss"),
+        "call_ms": call_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="modelhub-bench-")
+    os.environ.setdefault("RUNTIME_SOCKET_DIR", os.path.join(workdir, "sock"))
+    os.chdir(workdir)  # keep the app's sqlite_db directory out of the tree
+    model_path = build_model(workdir)
+
+    columns = ("first_ms", "spawn_ms", "rss_mb", "pss_mb", "uss_mb", "call_ms")
+    print(f"{'variant':<10}" + "".join(f"{c:>11}" for c in columns))
+    for name, use_zygote in (("cold", False), ("zygote", True)):
+        result = run_variant(model_path, use_zygote, args.replicas, args.calls)
+        print(f"{name:<10}" + "".join(f"{result[c]:>11.1f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""
+Tests import the app from backend/. Importing it creates the SQLite
+database directory in the working directory, so run from a scratch one.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix="modelhub-tests-"))
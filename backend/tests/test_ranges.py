@@ -0,0 +1,36 @@
+"""Range header parsing (app/utils/ranges.py)"""
+import pytest
+
+from app.utils.ranges import RangeNotSatisfiable, parse_range
+
+
+@pytest.mark.parametrize(
+    "header, size, expected",
+    [
+        ("bytes=0-99", 1000, (0, 99)),
+        ("bytes=900-", 1000, (900, 999)),
+        ("bytes=990-2000", 1000, (990, 999)),
+        ("bytes=-100", 1000, (900, 999)),
+        ("bytes=-5000", 1000, (0, 999)),
+        (None, 1000, None),
+        ("bytes=5-3", 1000, None),  # invalid: ignored
+        ("bytes=0-1,5-6", 1000, None),  # several ranges: whole file
+        ("items=0-1", 1000, None),
+    ],
+)
+def test_parse_range(header, size, expected):
+    assert parse_range(header, size) == expected
+
+
+@pytest.mark.parametrize(
+    "header, size",
+    [
+        ("bytes=1000-", 1000),
+        ("bytes=-0", 1000),
+        ("bytes=-10", 0),  # empty file: no suffix to send
+        ("bytes=0-", 0),
+    ],
+)
+def test_unsatisfiable(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
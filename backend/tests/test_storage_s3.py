@@ -0,0 +1,120 @@
+"""
+S3Storage against moto's in-process S3 stand-in (pip install "moto[s3]").
+
+Run from backend/:
+    python -m pytest tests/test_storage_s3.py
+"""
+import hashlib
+import os
+import time
+
+import pytest
+
+pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from app.core.config import settings  # noqa: E402
+from app.utils.disk_cache import DiskCache  # noqa: E402
+from app.utils.storage import S3Storage, blob_hash, blob_key  # noqa: E402
+
+BUCKET = "modelhub-test"
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setattr(settings, name, "testing")
+    monkeypatch.setattr(settings, "AWS_REGION", "us-east-1")
+    # S3's minimum part size, so a small file already goes up in parts
+    monkeypatch.setattr(settings, "S3_MULTIPART_THRESHOLD", 5 * MB)
+    monkeypatch.setattr(settings, "S3_PART_SIZE", 5 * MB)
+    with moto.mock_aws():
+        storage = S3Storage(BUCKET, DiskCache(str(tmp_path / "cache"), 100 * MB, blob_hash))
+        storage.client.create_bucket(Bucket=BUCKET)
+        yield storage
+
+
+def _file(tmp_path, data: bytes):
+    """A local file holding ``data`` and the blob key it is stored under"""
+    path = tmp_path / f"{hashlib.sha256(data).hexdigest()}.part"
+    path.write_bytes(data)
+    return str(path), blob_key(hashlib.sha256(data).hexdigest())
+
+
+def test_put_seeds_cache_and_roundtrips(s3, tmp_path):
+    path, key = _file(tmp_path, b"model bytes")
+    s3.put_file(path, key)
+
+    assert s3.exists(key)
+    assert not os.path.exists(path)  # consumed into the cache
+    with open(s3.local_path(key), "rb") as f:
+        assert f.read() == b"model bytes"
+    stats = s3.cache.stats()
+    assert stats["hits"] == 1 and stats["bytes_fetched"] == 0
+
+
+def test_missing_key(s3):
+    key = blob_key("0" * 64)
+    assert not s3.exists(key)
+    assert s3.modified(key) is None
+    with pytest.raises(FileNotFoundError):
+        s3.local_path(key)
+
+
+def test_multipart_upload_and_ranged_download(s3, tmp_path):
+    data = os.urandom(11 * MB)
+    path, key = _file(tmp_path, data)
+    s3.put_file(path, key)
+
+    head = s3.client.head_object(Bucket=BUCKET, Key=key)
+    assert head["ContentLength"] == len(data)
+    assert head["ETag"].strip('"').endswith("-3")  # three parts
+
+    s3.cache.discard(key)  # force a fetch from the bucket
+    with open(s3.local_path(key), "rb") as f:
+        assert f.read() == data
+    assert s3.cache.stats()["bytes_fetched"] == len(data)
+
+
+def test_duplicate_put_refreshes_last_modified(s3, tmp_path):
+    path, key = _file(tmp_path, b"same content")
+    s3.put_file(path, key)
+    first = s3.modified(key)
+    time.sleep(1.1)  # LastModified has one-second resolution
+
+    path, _ = _file(tmp_path, b"same content")
+    s3.put_file(path, key)  # deduplicated: nothing uploaded
+    assert s3.modified(key) > first
+    assert not os.path.exists(path)
+
+
+def test_delete_discards_cached_copy(s3, tmp_path):
+    path, key = _file(tmp_path, b"to be deleted")
+    s3.put_file(path, key)
+    cached = s3.local_path(key)
+
+    s3.delete(key)
+    assert not s3.exists(key)
+    assert not os.path.exists(cached)
+    with pytest.raises(FileNotFoundError):
+        s3.local_path(key)
+
+
+def test_iter_keys_pages_through_blob_and_legacy_prefixes(s3):
+    keys = {blob_key(hashlib.sha256(str(i).encode()).hexdigest()) for i in range(1005)}
+    keys |= {"models/3/legacy.joblib"}
+    for key in keys | {"other/unrelated.txt"}:
+        s3.client.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+
+    listed = list(s3.iter_keys())  # more than one 1000-key page
+    assert {key for key, _, _ in listed} == keys
+    assert all(size == 1 and modified > 0 for _, size, modified in listed)
+
+
+def test_presigned_url(s3):
+    key = blob_key("a" * 64)
+    url = s3.url(key, filename="iris.joblib", encoding="gzip")
+    assert url.startswith(f"https://{BUCKET}.s3.amazonaws.com/{key}?")
+    assert "response-content-disposition=attachment" in url
+    assert "response-content-encoding=gzip" in url